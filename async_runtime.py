@@ -0,0 +1,331 @@
+"""async_runtime.py
+Runtime asyncio opsional untuk ProfessionalBot (hybrid_bot_v7_patched.py).
+
+Aktifkan dengan ASYNC_RUNTIME=True. Semua request exchange memakai
+ccxt.async_support dan dibatasi oleh:
+- BoundedSemaphore (ASYNC_MAX_CONCURRENCY) -> jumlah request bersamaan,
+- RATE_LIMITER bersama (rate_limiter.py), sama dengan client sync & UI.
+
+Job scan peluang, cek BTC, manajemen posisi dan laporan status dijadwalkan
+oleh CandleScheduler yang sama dengan run() sinkron (scan tepat setelah close
+bar 15m) dan berjalan sebagai task terpisah sehingga saling tumpang tindih;
+job yang sama tidak pernah berjalan dua kali bersamaan. Dengan
+USE_CANDLE_SCHEDULER=False dipakai siklus 60 detik lama, di mana ketiga job
+juga berjalan bersamaan. Keputusan trading tetap memakai helper yang sama dengan
+run() sinkron (_is_trending, _h1_trend_ok, _evaluate_m15_signal,
+_can_open_position, _manage_position), dan semua perubahan state (order,
+active_positions, record jurnal posisi) dijalankan berurutan di bawah satu lock;
+journal.sync (fsync) berjalan di thread terpisah, di luar event loop.
+"""
+
+import asyncio
+import sys
+import time
+
+import ccxt.async_support as ccxt_async
+
+from market_data import resample_limit, resample_ohlcv
+from metrics import METRICS, instrument_exchange, observe_job
+from rate_limiter import install_rate_limiter
+from scheduler import CandleScheduler, timeframe_seconds
+
+
+class AsyncBotRuntime:
+    def __init__(self, bot, max_concurrency=8):
+        self.bot = bot
+        # Modul bot bisa berjalan sebagai __main__, jadi konstanta diambil dari modul kelasnya
+        self.settings = sys.modules[type(bot).__module__]
+        self.exchange = ccxt_async.indodax(self.settings.indodax_client_config(enableRateLimit=True))
+        install_rate_limiter(self.exchange, self.settings.RATE_LIMITER, self.settings.ENDPOINT_WEIGHTS)
+        instrument_exchange(self.exchange)
+        sync_exchange = getattr(bot, 'indodax', None)
+        if getattr(sync_exchange, 'markets', None):
+            self.exchange.set_markets(sync_exchange.markets, sync_exchange.currencies)
+        self.semaphore = asyncio.BoundedSemaphore(max_concurrency)
+        self.state_lock = asyncio.Lock()
+        self._tasks = {}
+
+    async def run(self):
+        try:
+            if not self.exchange.markets:
+                await self.exchange.load_markets()
+            if self.settings.FAST_STARTUP:
+                # Laporan awal berjalan bersamaan dengan siklus pertama (cek posisi tidak menunggu)
+                self._tasks['startup_reports'] = asyncio.create_task(self.send_startup_reports())
+            else:
+                await self.send_startup_reports()
+            if self.settings.USE_CANDLE_SCHEDULER:
+                await self.run_scheduled()
+                return
+            while True:
+                started = time.perf_counter()
+                try:
+                    await self.run_cycle()
+                except Exception as e:
+                    await asyncio.to_thread(self.bot.handle_error, f"Error di loop async: {e}")
+                observe_job('cycle', time.perf_counter() - started, budget=60)
+                print(f"[{time.strftime('%H:%M:%S')}] Siklus {self.bot.cycle_counter} selesai (async). Menunggu 60 detik...", end="\r")
+                await asyncio.sleep(60)
+        finally:
+            await self.exchange.close()
+
+    async def run_scheduled(self):
+        s = self.settings
+        scheduler = CandleScheduler(self.bot.indodax)
+        await asyncio.to_thread(scheduler.sync_clock)
+        m15_seconds = timeframe_seconds(s.M15_TIMEFRAME)
+        scheduler.add_job('clock_sync', lambda: asyncio.to_thread(scheduler.sync_clock), s.CLOCK_SYNC_INTERVAL)
+        if s.ENABLE_BTC_FILTER:
+            scheduler.add_job('btc_health', self._update_market_health, m15_seconds,
+                              align=True, delay=s.SCHEDULER_CANDLE_DELAY, run_now=True)
+        scheduler.add_job('scan', self._scheduled_scan, m15_seconds, align=True, delay=s.SCHEDULER_CANDLE_DELAY)
+        if getattr(self.bot, 'position_monitor', None) is not None:
+            scheduler.add_job('positions', self._monitor_positions_job, 1, run_now=True)
+        else:
+            scheduler.add_job('positions', self._positions_job, s.POSITION_CHECK_INTERVAL, run_now=True)
+        scheduler.add_job('status', self._report_job, s.STATUS_UPDATE_INTERVAL * s.POSITION_CHECK_INTERVAL)
+        print(f"[ok] Scheduler async aktif (offset jam exchange {scheduler.offset:+.2f} detik).")
+
+        while True:
+            for job in scheduler.due_jobs():
+                running = self._tasks.get(job.name)
+                if running is not None and not running.done():
+                    continue  # job sebelumnya belum selesai, jangan ditumpuk
+                self._tasks[job.name] = asyncio.ensure_future(self._run_job(job))
+            await asyncio.sleep(min(scheduler.seconds_until_next(), 60))
+
+    async def _run_job(self, job):
+        started = time.perf_counter()
+        try:
+            await job.fn()
+        except Exception as e:
+            await asyncio.to_thread(self.bot.handle_error, f"Error di job async '{job.name}': {e}")
+        finally:
+            observe_job(job.name, time.perf_counter() - started, budget=job.interval)
+
+    async def _update_market_health(self):
+        self.bot.market_is_healthy = await self._is_market_healthy()
+        if not self.bot.market_is_healthy:
+            print(f"\n[{time.strftime('%H:%M:%S')}] Pasar BTC tidak sehat. Mode Aman Aktif.")
+
+    async def _scheduled_scan(self):
+        # Pada close bar yang sama, tunggu hasil cek BTC terbaru dulu
+        health = self._tasks.get('btc_health')
+        if health is not None and not health.done():
+            await asyncio.shield(health)
+        if self.settings.ENABLE_BTC_FILTER and not self.bot.market_is_healthy:
+            return
+        await self._scan(check_health=False, check_interval=False)
+
+    async def _positions_job(self):
+        self.bot.cycle_counter += 1
+        if getattr(self.bot, 'ticker_cache', None) is not None:
+            self.bot.ticker_cache.new_cycle()
+        positions = list(self.bot.active_positions)
+        await self._manage_job(positions, self._fetch_tickers([p['pair'] for p in positions]))
+        print(f"[{time.strftime('%H:%M:%S')}] Siklus {self.bot.cycle_counter} selesai (async).", end="\r")
+
+    async def _monitor_positions_job(self):
+        # Hanya posisi yang jatuh tempo menurut PositionMonitor; harga diambil segar, paralel
+        positions = self.bot.position_monitor.due(list(self.bot.active_positions))
+        if not positions:
+            return
+        await self._manage_job(positions, self._fetch_fresh_tickers([p['pair'] for p in positions]))
+
+    async def _fetch_fresh_tickers(self, pairs):
+        results = await asyncio.gather(*(self._call('fetch_ticker', p) for p in pairs), return_exceptions=True)
+        tickers = dict(zip(pairs, results))
+        if getattr(self.bot, 'ticker_cache', None) is not None:
+            self.bot.ticker_cache.update(tickers)
+        return tickers
+
+    async def run_cycle(self):
+        s = self.settings
+        self.bot.cycle_counter += 1
+        if getattr(self.bot, 'ticker_cache', None) is not None:
+            self.bot.ticker_cache.new_cycle()
+        positions = list(self.bot.active_positions)
+
+        # Snapshot ticker posisi diambil sekali dan dipakai bersama oleh manajemen posisi & laporan
+        tickers_task = asyncio.ensure_future(self._fetch_tickers([p['pair'] for p in positions]))
+        jobs = [self._scan(), self._manage_job(positions, tickers_task)]
+        if self.bot.cycle_counter % s.STATUS_UPDATE_INTERVAL == 0:
+            jobs.append(self._report_job(tickers_task))
+        await asyncio.gather(*jobs)
+
+    # ------------------------------------------------------------------ exchange
+
+    async def _call(self, method, *args, **kwargs):
+        async with self.semaphore:
+            return await getattr(self.exchange, method)(*args, **kwargs)
+
+    async def _fetch_tickers(self, pairs):
+        # Pair yang masih segar di ticker_cache bot tidak diambil ulang
+        cache = getattr(self.bot, 'ticker_cache', None)
+        snapshot, missing = {}, []
+        for pair in dict.fromkeys(pairs):
+            ticker = cache.peek(pair) if cache is not None else None
+            if ticker is not None:
+                cache.stats['hits'] += 1
+                snapshot[pair] = ticker
+            else:
+                missing.append(pair)
+        results = await asyncio.gather(*(self._call('fetch_ticker', p) for p in missing), return_exceptions=True)
+        fetched = dict(zip(missing, results))
+        if cache is not None:
+            cache.stats['misses'] += len(missing)
+            cache.update(fetched)
+        snapshot.update(fetched)
+        return snapshot
+
+    async def _fetch_balance(self):
+        cache = getattr(self.bot, 'balance_cache', None)
+        balance = cache.peek() if cache is not None else None
+        if balance is not None:
+            cache.stats['hits'] += 1
+            return balance
+        balance = await self._call('fetch_balance')
+        if cache is not None:
+            cache.stats['misses'] += 1
+            cache.put(balance)
+        return balance
+
+    async def _candles(self, pair, timeframe, limit=100):
+        s = self.settings
+        resample = self.bot._resample_seconds(timeframe)
+        if resample:
+            candles = await self._candles(pair, s.M15_TIMEFRAME, resample_limit(limit, *resample))
+            return resample_ohlcv(candles, *resample, limit=limit)
+        store = getattr(self.bot, 'candle_store', None)
+        async with self.semaphore:
+            if store is not None:
+                return await store.aget(pair, timeframe, limit, exchange=self.exchange,
+                                        max_age=s.CANDLE_REUSE_SECONDS if s.RESAMPLE_TIMEFRAMES else 0.0)
+            candles = await self.exchange.fetch_ohlcv(pair, timeframe, limit=limit)
+        recorder = getattr(self.bot, 'recorder', None)
+        if recorder is not None and candles:
+            recorder.record_candles(pair, timeframe, candles[:-1])
+        return candles
+
+    # ------------------------------------------------------------------ jobs
+
+    async def _scan(self, check_health=True, check_interval=True):
+        s = self.settings
+        if check_health and s.ENABLE_BTC_FILTER and not await self._is_market_healthy():
+            print(f"\n[{time.strftime('%H:%M:%S')}] Pasar BTC tidak sehat. Mode Aman Aktif.")
+            return
+        if check_interval and self.bot.cycle_counter % s.SCAN_OPPORTUNITIES_INTERVAL != 0:
+            return
+        if len(self.bot.active_positions) >= s.MAX_OPEN_POSITIONS:
+            return
+
+        print(f"\n[{time.strftime('%H:%M:%S')}] Menjalankan pemindaian peluang (async)...")
+        candidates = await self._momentum_engine()
+        signals = await asyncio.gather(*(self._analyze(pair) for pair in candidates))
+
+        # Eksekusi mengikuti urutan kandidat, sama seperti process_candidates() sinkron
+        for pair, signal in zip(candidates, signals):
+            if not signal:
+                continue
+            async with self.state_lock:
+                if self.bot._can_open_position(pair):
+                    await asyncio.to_thread(self.bot.execute_trade, pair, "Momentum", *signal)
+
+    @METRICS.timed('cuanbot_engine_seconds', engine='btc_health')
+    async def _is_market_healthy(self):
+        s = self.settings
+        try:
+            candles = await self._candles('BTC/IDR', '4h')
+            return self.bot._btc_healthy(self.bot._indicator_rows('BTC/IDR', '4h', candles, s.BTC_HEALTH_PLAN))
+        except Exception:
+            return False
+
+    @METRICS.timed('cuanbot_engine_seconds', engine='momentum')
+    async def _momentum_engine(self):
+        s = self.settings
+        print(f"  - Mesin Momentum: Memindai {len(self.bot.idr_markets)} koin...")
+        if s.BULK_TICKER_SCAN:
+            try:
+                tickers = await self._call('fetch_tickers')
+                tickers = {sym: t for sym, t in (tickers or {}).items() if sym.endswith('/IDR')}
+                if not tickers:
+                    raise ValueError('fetch_tickers mengembalikan data kosong')
+                if any(t.get('percentage') is None for t in tickers.values()):
+                    self.bot._fill_24h_change(tickers, await self._call('publicGetApiSummaries'))
+                if getattr(self.bot, 'ticker_cache', None) is not None:
+                    self.bot.ticker_cache.update(tickers)
+                return [pair for pair in self.bot.idr_markets if self.bot._is_trending(tickers.get(pair))]
+            except Exception as e:
+                s._log_event('BULK_SCAN_ERROR', '', f'fallback ke scan per-pair: {e}')
+
+        tickers = await self._fetch_tickers(self.bot.idr_markets)
+        return [pair for pair in self.bot.idr_markets
+                if not isinstance(tickers.get(pair), Exception) and self.bot._is_trending(tickers.get(pair))]
+
+    @METRICS.timed('cuanbot_engine_seconds', engine='analyze')
+    async def _analyze(self, pair):
+        s = self.settings
+        try:
+            h1_candles = await self._candles(pair, s.H1_TIMEFRAME)
+            h1_data = self.bot._indicator_rows(pair, s.H1_TIMEFRAME, h1_candles, s.H1_TREND_PLAN)
+            if not self.bot._h1_trend_ok(h1_data):
+                return None
+            m15_candles = await self._candles(pair, s.M15_TIMEFRAME)
+        except Exception:
+            return None
+        m15_data = self.bot._indicator_rows(pair, s.M15_TIMEFRAME, m15_candles, s.M15_SIGNAL_PLAN)
+        return self.bot._evaluate_m15_signal(m15_data)
+
+    @METRICS.timed('cuanbot_engine_seconds', engine='positions')
+    async def _manage_job(self, positions, tickers_awaitable):
+        s = self.settings
+        tickers = await tickers_awaitable
+        async with self.state_lock:
+            for position in positions:
+                if position not in self.bot.active_positions:
+                    continue
+                try:
+                    ticker = tickers.get(position['pair'])
+                    if isinstance(ticker, Exception):
+                        raise ticker
+                    await asyncio.to_thread(self.bot._manage_position, position, ticker['last'])
+                except Exception as e:
+                    if getattr(self.bot, 'position_monitor', None) is not None:
+                        self.bot.position_monitor.retry_soon(position.get('pair', ''))
+                    s._log_event('MANAGE_ERROR', position.get('pair', ''), str(e))
+                    continue
+                self.bot._reschedule_position(position, ticker['last'])
+            # fsync jurnal bisa lambat (disk), jangan di event loop
+            await asyncio.to_thread(self.bot.journal.sync)
+
+    async def _report_job(self, tickers_task=None):
+        s = self.settings
+        if tickers_task is None:
+            tickers_task = self._fetch_tickers([p['pair'] for p in list(self.bot.active_positions)])
+        tickers = await tickers_task
+        balance = None
+        if not s.SIMULATION_MODE:
+            try:
+                balance = await self._fetch_balance()
+            except Exception:
+                balance = None  # send_status_update akan mencoba fetch_balance sendiri
+        # Laporan membaca active_positions / virtual_idr: tahan lock agar tidak bersamaan dengan
+        # _manage_job atau eksekusi scan. Ticker dan saldo sudah diambil di luar lock.
+        async with self.state_lock:
+            await asyncio.to_thread(self.bot.send_status_update, tickers, balance)
+
+    async def send_startup_reports(self):
+        s = self.settings
+        try:
+            balances = await self._fetch_balance()
+        except Exception as e:
+            await asyncio.to_thread(self.bot.handle_error, f"Gagal mengirim laporan portfolio manual: {e}")
+            balances = None
+
+        if balances is not None:
+            pairs = [f"{asset}/IDR" for asset, amount in (balances.get('total') or {}).items()
+                     if asset != 'IDR' and (amount or 0) > 0
+                     and (self.bot.all_markets.get(f"{asset}/IDR") or {}).get('active')]
+            tickers = await self._fetch_tickers(pairs)
+            await asyncio.to_thread(self.bot.send_manual_portfolio_update, balances, tickers)
+        await asyncio.to_thread(self.bot.send_account_status_line)
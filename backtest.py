@@ -0,0 +1,340 @@
+"""backtest.py
+Backtest historis strategi hybrid_bot_v7_patched.py (EMA cross + volume + StochRSI).
+
+Alur per pair:
+1. Indikator dihitung sebagai array NumPy untuk seluruh riwayat sekaligus
+   (rumus sama dengan indicators.py / pandas_ta).
+2. Sinyal entry = syarat `_evaluate_m15_signal` pada bar closed i (cross EMA,
+   volume > SMA volume, cross StochRSI) + syarat `_h1_trend_ok` + filter
+   momentum 24h `_is_trending` (close bar i vs close 24 jam sebelumnya, harus
+   > batas). Entry di harga open bar i+1, sama seperti bot yang scan
+   beberapa detik setelah bar close dan membeli di harga bar berjalan.
+3. Exit disimulasikan bar per bar hanya selama posisi terbuka, mengikuti
+   `_manage_position`: TP1 jual 50% + SL ke breakeven, trailing stop dari
+   harga tertinggi, lalu SL/trailing menutup sisa posisi.
+
+Asumsi simulasi:
+- Urutan harga dalam satu bar: open -> low -> high (bar naik) atau
+  open -> high -> low (bar turun). Trigger di dalam bar terisi di level
+  trigger, trigger yang sudah terlewati saat open terisi di harga open.
+- Tren H1 memakai bar H1 hasil resample data 15m. Karena close bar H1 yang
+  masih berjalan = harga entry, `close >= EMA(forming)` setara dengan
+  `harga entry >= EMA H1 bar closed terakhir`.
+- Batas MAX_OPEN_POSITIONS / sektor diterapkan setelah simulasi per pair
+  (`apply_portfolio_limits`), urut waktu entry.
+
+Data candle: dict {pair: array (n, 6) [timestamp_ms, open, high, low, close, volume]},
+dari load_ohlcv_csv() atau rekaman MarketRecorder (`--recorded`).
+
+Pemakaian:
+    python backtest.py data_ohlcv/ --timeframe 15m --trades-csv trades.csv
+"""
+
+import argparse
+import glob
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from strategy_params import EPS, StrategyParams
+
+BacktestParams = StrategyParams  # alias untuk optimize.py
+
+
+@dataclass
+class Trade:
+    pair: str
+    entry_time: int
+    exit_time: int
+    entry_price: float
+    exit_price: float
+    atr: float
+    tp1_hit: bool
+    reason: str
+    return_pct: float
+    bars_held: int
+
+
+@dataclass
+class BacktestResult:
+    params: BacktestParams
+    trades: List[Trade] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, float]:
+        returns = np.array([t.return_pct for t in self.trades], dtype=float)
+        pnl = returns / 100.0 * self.params.modal_per_coin_idr
+        equity = np.cumsum(pnl)
+        gains, losses = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+        return {
+            'trades': int(len(returns)),
+            'win_rate': float((returns > 0).mean() * 100) if len(returns) else 0.0,
+            'avg_return_pct': float(returns.mean()) if len(returns) else 0.0,
+            'total_pnl_idr': float(pnl.sum()),
+            'profit_factor': float(gains / losses) if losses > 0 else (math.inf if gains > 0 else 0.0),
+            'max_drawdown_idr': float((np.maximum.accumulate(np.maximum(equity, 0)) - equity).max()) if len(equity) else 0.0,
+            'tp1_rate': float(np.mean([t.tp1_hit for t in self.trades]) * 100) if self.trades else 0.0,
+            'avg_bars_held': float(np.mean([t.bars_held for t in self.trades])) if self.trades else 0.0,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([t.__dict__ for t in self.trades])
+
+
+# ==============================================================================
+# --- INDIKATOR ARRAY (setara indicators.py / pandas_ta) ---
+# ==============================================================================
+
+def ema_array(values: np.ndarray, length: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) < length:
+        return out
+    seeded = np.concatenate(([values[:length].mean()], values[length:]))
+    out[length - 1:] = pd.Series(seeded).ewm(span=length, adjust=False).mean().to_numpy()
+    return out
+
+
+def rma_array(values: np.ndarray, length: int) -> np.ndarray:
+    return pd.Series(values).ewm(alpha=1.0 / length, adjust=True, min_periods=length).mean().to_numpy()
+
+
+def sma_array(values: np.ndarray, length: int) -> np.ndarray:
+    return pd.Series(values).rolling(length, min_periods=length).mean().to_numpy()
+
+
+def atr_array(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr[0] = np.nan
+    return rma_array(tr, length)
+
+
+def stoch_rsi_array(close: np.ndarray, length: int = 14, rsi_length: int = 14, k: int = 3, d: int = 3):
+    diff = np.diff(close, prepend=np.nan)
+    gain = rma_array(np.where(np.isnan(diff), np.nan, np.maximum(diff, 0.0)), rsi_length)
+    loss = np.abs(rma_array(np.where(np.isnan(diff), np.nan, np.minimum(diff, 0.0)), rsi_length))
+    total = gain + loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = np.where(total != 0, 100.0 * gain / total, np.nan)
+    rolling = pd.Series(rsi).rolling(length, min_periods=length)
+    lowest, highest = rolling.min().to_numpy(), rolling.max().to_numpy()
+    span = highest - lowest
+    stoch = 100.0 * (rsi - lowest) / np.where(span == 0, EPS, span)
+    stoch_k = sma_array(stoch, k)
+    return stoch_k, sma_array(stoch_k, d)
+
+
+# ==============================================================================
+# --- SINYAL ---
+# ==============================================================================
+
+def _crossed_up(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(fast), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        out[1:] = (fast[:-1] < slow[:-1]) & (fast[1:] > slow[1:])
+    return out
+
+
+def h1_trend_array(ts: np.ndarray, close: np.ndarray, price: np.ndarray, ema_length: int) -> np.ndarray:
+    """Untuk tiap bar: harga (bar H1 berjalan) >= EMA H1 bar closed terakhir, dari resample close."""
+    hour = ts // 3_600_000
+    last_in_hour = np.flatnonzero(np.diff(hour, append=hour[-1] + 1) != 0)
+    h1_ema = ema_array(close[last_in_hour], ema_length)
+    # Bar H1 closed terakhir sebelum jam bar ini = bucket sebelum bucket berjalan
+    idx = np.searchsorted(hour[last_in_hour], hour, side='left') - 1
+    prev_ema = np.where(idx >= 0, h1_ema[np.maximum(idx, 0)], np.nan)
+    with np.errstate(invalid='ignore'):
+        return price >= prev_ema
+
+
+def entry_signals(candles: np.ndarray, params: BacktestParams, timeframe: str = '15m'):
+    """Kembalikan (mask entry per bar, ATR saat sinyal per bar). Entry di open bar tersebut."""
+    ts = candles[:, 0].astype(np.int64)
+    o, h, l, c, v = (candles[:, i].astype(float) for i in range(1, 6))
+    n = len(c)
+
+    fast = ema_array(c, params.m15_ema_fast)
+    slow = ema_array(c, params.m15_ema_slow)
+    with np.errstate(invalid='ignore'):
+        volume_ok = v > sma_array(v, params.volume_avg_period)
+    stoch_k, stoch_d = stoch_rsi_array(c, params.stoch_rsi_period, 14, 3, 3)
+    atr = atr_array(h, l, c, params.atr_period)
+
+    closed_signal = _crossed_up(fast, slow) & volume_ok & _crossed_up(stoch_k, stoch_d) & np.isfinite(atr)
+    signal = np.zeros(n, dtype=bool)
+    signal[1:] = closed_signal[:-1]  # sinyal bar i -> entry di open bar i+1
+    signal_atr = np.full(n, np.nan)
+    signal_atr[1:] = atr[:-1]
+
+    signal &= h1_trend_array(ts, c, o, params.h1_ema_period)
+    if params.momentum_min_percentage > 0:
+        # Sama dengan `_is_trending`: harga terakhir saat scan (close bar keputusan i-1) vs harga
+        # 24 jam sebelumnya, lolos hanya bila perubahan > batas (strict)
+        bars_per_day = 86400 // _timeframe_seconds(timeframe)
+        change = np.full(n, np.nan)
+        change[bars_per_day + 1:] = (c[bars_per_day:-1] / c[:-bars_per_day - 1] - 1.0) * 100.0
+        with np.errstate(invalid='ignore'):
+            signal &= change > params.momentum_min_percentage
+    return signal, signal_atr
+
+
+# ==============================================================================
+# --- SIMULASI EXIT ---
+# ==============================================================================
+
+def simulate_pair(pair: str, candles: np.ndarray, params: BacktestParams, timeframe: str = '15m') -> List[Trade]:
+    if len(candles) < 3:
+        return []
+    signal, signal_atr = entry_signals(candles, params, timeframe)
+    ts = candles[:, 0].astype(np.int64).tolist()
+    o, h, l, c = (candles[:, i].astype(float).tolist() for i in range(1, 5))
+    fee = params.fee_percent / 100.0
+    n = len(o)
+
+    trades = []
+    next_free = 0
+    for j in np.flatnonzero(signal).tolist():
+        if j < next_free:
+            continue
+        entry, atr = o[j], float(signal_atr[j])
+        sl = entry - params.atr_multiplier_for_sl * atr
+        tp1 = entry + params.take_profit_1_rr * (entry - sl)
+        highest, tp1_hit, exit_price, reason = entry, False, None, None
+
+        k = j
+        while k < n:
+            path = (l[k], h[k]) if c[k] >= o[k] else (h[k], l[k])
+            points = path if k == j else (o[k],) + path
+            for i, p in enumerate(points):
+                at_open = k != j and i == 0
+                if not tp1_hit and p >= tp1:
+                    # TP1: jual 50%, SL ke breakeven (tanpa cek SL pada tick yang sama)
+                    tp1_fill = p if at_open else tp1
+                    tp1_hit, sl = True, entry
+                    continue
+                if p > highest:
+                    highest = p
+                    sl = max(sl, p * (1 - params.trailing_stop_percent))
+                if p <= sl:
+                    exit_price = p if at_open else sl
+                    reason = 'Trailing Stop' if tp1_hit else 'Stop Loss'
+                    break
+            if exit_price is not None:
+                break
+            k += 1
+
+        if exit_price is None:
+            k, exit_price, reason = n - 1, c[-1], 'End of Data'
+        if tp1_hit:
+            proceeds = 0.5 * tp1_fill + 0.5 * exit_price
+        else:
+            proceeds = exit_price
+        return_pct = (proceeds * (1 - fee) / (entry * (1 + fee)) - 1.0) * 100.0
+        trades.append(Trade(pair, ts[j], ts[k], entry, exit_price, atr, tp1_hit, reason, return_pct, k - j + 1))
+        next_free = k + 1
+    return trades
+
+
+def apply_portfolio_limits(trades: Sequence[Trade], max_open_positions: int = 5,
+                           sector_mapping: Optional[Dict[str, str]] = None,
+                           max_positions_per_sector: Optional[Dict[str, int]] = None) -> List[Trade]:
+    """Buang trade yang tidak akan dibuka karena batas posisi total / per sektor (`_can_open_position`)."""
+    sector_mapping = sector_mapping or {}
+    max_positions_per_sector = max_positions_per_sector or {}
+    accepted, open_trades = [], []
+    for trade in sorted(trades, key=lambda t: (t.entry_time, t.pair)):
+        open_trades = [t for t in open_trades if t.exit_time >= trade.entry_time]
+        if len(open_trades) >= max_open_positions:
+            continue
+        sector = sector_mapping.get(trade.pair, 'DEFAULT')
+        limit = max_positions_per_sector.get(sector, max_open_positions)
+        if sum(1 for t in open_trades if sector_mapping.get(t.pair, 'DEFAULT') == sector) >= limit:
+            continue
+        accepted.append(trade)
+        open_trades.append(trade)
+    return accepted
+
+
+def run_backtest(data: Dict[str, np.ndarray], params: Optional[BacktestParams] = None,
+                 timeframe: str = '15m', portfolio: Optional[dict] = None) -> BacktestResult:
+    """Backtest semua pair. `portfolio` = kwargs apply_portfolio_limits, None = tanpa batas portfolio."""
+    params = params or BacktestParams()
+    trades = []
+    for pair, candles in data.items():
+        trades.extend(simulate_pair(pair, np.asarray(candles, dtype=float), params, timeframe))
+    if portfolio is not None:
+        trades = apply_portfolio_limits(trades, **portfolio)
+    trades.sort(key=lambda t: (t.entry_time, t.pair))
+    return BacktestResult(params, trades)
+
+
+# ==============================================================================
+# --- DATA ---
+# ==============================================================================
+
+def load_ohlcv_csv(directory: str, timeframe: str = '15m', pairs: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """Baca file `<BASE>_<QUOTE>_<timeframe>.csv` (timestamp,open,high,low,close,volume)."""
+    data = {}
+    for path in sorted(glob.glob(os.path.join(directory, f'*_{timeframe}.csv'))):
+        name = os.path.basename(path)[:-len(f'_{timeframe}.csv')]
+        pair = name.replace('_', '/', 1)
+        if pairs and pair not in pairs:
+            continue
+        frame = pd.read_csv(path, usecols=range(6))
+        candles = frame.to_numpy(dtype=float)
+        candles = candles[np.argsort(candles[:, 0], kind='stable')]
+        keep = np.concatenate(([True], np.diff(candles[:, 0]) > 0))
+        data[pair] = candles[keep]
+    return data
+
+
+def load_ohlcv(data_dir: str, timeframe: str = '15m', pairs: Optional[Sequence[str]] = None,
+               recorded: bool = False) -> Dict[str, np.ndarray]:
+    """CSV per pair, atau store MarketRecorder (`recorded=True`, data_dir = MARKET_DATA_DIR)."""
+    if recorded:
+        from market_recorder import MarketRecorder
+        return MarketRecorder(data_dir).load_ohlcv(timeframe, pairs)
+    return load_ohlcv_csv(data_dir, timeframe, pairs)
+
+
+def _timeframe_seconds(timeframe: str) -> int:
+    units = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtest strategi hybrid_bot_v7 dari data OHLCV tersimpan.')
+    parser.add_argument('data_dir', help='folder berisi <BASE>_<QUOTE>_<timeframe>.csv')
+    parser.add_argument('--recorded', action='store_true', help='data_dir adalah folder rekaman MarketRecorder')
+    parser.add_argument('--timeframe', default='15m')
+    parser.add_argument('--pairs', default='', help='daftar pair dipisah koma (default semua file)')
+    parser.add_argument('--fee-percent', type=float, default=0.0)
+    parser.add_argument('--no-portfolio-limits', action='store_true')
+    parser.add_argument('--trades-csv', default='', help='simpan daftar trade ke CSV')
+    args = parser.parse_args(argv)
+
+    # Parameter strategi & batas portfolio dari konfigurasi bot (.env)
+    from hybrid_bot_v7_patched import CONFIG
+    params = BacktestParams.from_config(CONFIG, fee_percent=args.fee_percent)
+    portfolio = None if args.no_portfolio_limits else {
+        'max_open_positions': CONFIG.max_open_positions,
+        'sector_mapping': CONFIG.sector_mapping,
+        'max_positions_per_sector': CONFIG.max_positions_per_sector,
+    }
+
+    pairs = [p.strip() for p in args.pairs.split(',') if p.strip()]
+    data = load_ohlcv(args.data_dir, args.timeframe, pairs or None, args.recorded)
+    result = run_backtest(data, params, args.timeframe, portfolio)
+    print(f"Pair: {len(data)} | Bar: {sum(len(c) for c in data.values()):,}")
+    for key, value in result.summary().items():
+        print(f"  {key:<18} {value:,.2f}")
+    if args.trades_csv:
+        result.to_frame().to_csv(args.trades_csv, index=False)
+        print(f"Trade disimpan ke {args.trades_csv}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""batch_signals.py
+Evaluasi sinyal banyak pair sekaligus untuk hybrid_bot_v7_patched.py.
+
+Candle N pair ditumpuk menjadi satu array (pairs, bars, fields) dengan fields
+[timestamp, open, high, low, close, volume]. Pair dengan riwayat lebih pendek
+diisi NaN di depan (rata kanan), sehingga kolom -1 selalu bar berjalan dan
+kolom -2 bar closed terakhir untuk semua pair.
+
+Indikator dihitung untuk semua pair dalam satu pass: rekursi EMA/RMA berjalan
+per bar atas vektor pair, rolling window sebagai `length` operasi geser. Rumusnya
+sama seperti indicators.py / backtest.py:
+- EMA      : seed SMA dari `length` bar valid pertama, lalu ewm(adjust=False).
+- ATR      : RMA dari True Range (bar valid pertama tanpa TR).
+- SMA      : rolling mean dengan min_periods=n.
+- StochRSI : RSI (RMA) -> stoch rolling min/max -> SMA k -> SMA d.
+
+Keputusan sama dengan `_h1_trend_ok` / `_evaluate_m15_signal` yang dihitung
+dari candle yang sama: pandas_ta maupun IndicatorEngine (hangat atau tidak)
+menghitung indikator atas jendela fetch yang sama (100 bar), jadi tidak ada
+state di luar jendela yang perlu dibawa ke sini. Diperiksa oleh
+`python indicator_parity.py` (bagian `batch ...`).
+
+Pemakaian:
+    pairs, h1 = stack_candles({pair: candles_h1, ...})
+    trend = h1_trend(h1, params)
+    pairs, m15 = stack_candles({pair: candles_m15 for pair yang trend-nya ok})
+    result = m15_signals(pairs, m15, params)
+    result.signals()  # [(pair, (entry_price, atr) atau None)]
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from strategy_params import EPS, StrategyParams
+
+FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+TIMESTAMP, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(FIELDS))
+MIN_BARS = 10  # sama dengan syarat `bars < 10` di _evaluate_m15_signal
+
+
+def stack_candles(candles: Dict[str, Optional[Sequence[Sequence[float]]]],
+                  bars: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+    """Tumpuk {pair: candles} menjadi (pairs, array (pairs, bars, 6)), rata kanan dengan padding NaN.
+
+    Pair tanpa candle tetap ikut (baris NaN penuh) agar urutan sama dengan input.
+    `bars` default = riwayat terpanjang; riwayat yang lebih panjang dipotong dari depan.
+    """
+    pairs = list(candles)
+    if bars is None:
+        bars = max((len(data) for data in candles.values() if data), default=0)
+    out = np.full((len(pairs), bars, len(FIELDS)), np.nan)
+    if not bars:
+        return pairs, out
+    for i, pair in enumerate(pairs):
+        data = candles[pair]
+        if not data:
+            continue
+        rows = np.asarray(data[-bars:], dtype=float)[:, :len(FIELDS)]
+        out[i, bars - len(rows):] = rows
+    out[..., VOLUME] = np.where(np.isnan(out[..., VOLUME]) & ~np.isnan(out[..., CLOSE]), 0.0, out[..., VOLUME])
+    return pairs, out
+
+
+# ==============================================================================
+# --- INDIKATOR 2-D (pairs, bars) ---
+# ==============================================================================
+
+def _rolling(values: np.ndarray, length: int, combine) -> np.ndarray:
+    # Gabungkan `length` jendela bergeser elemen demi elemen (dari bar tertua, urutan sama
+    # dengan sum(window) di indicators.py); NaN di jendela menghasilkan NaN = min_periods=length
+    n = values.shape[1]
+    out = np.full(values.shape, np.nan)
+    if n >= length:
+        acc = values[:, :n - length + 1]
+        for j in range(1, length):
+            acc = combine(acc, values[:, j:n - length + 1 + j])
+        out[:, length - 1:] = acc
+    return out
+
+
+def sma_2d(values: np.ndarray, length: int, tail: Optional[int] = None) -> np.ndarray:
+    """SMA per pair; dengan `tail` hanya `tail` kolom terakhir yang dihitung dan dikembalikan."""
+    if tail:
+        return (_rolling(values[:, -(tail + length - 1):], length, np.add) / length)[:, -tail:]
+    return _rolling(values, length, np.add) / length
+
+
+def rma_2d(values: np.ndarray, length: int) -> np.ndarray:
+    # ewm(alpha=1/n, adjust=True, min_periods=n): rekursi per bar untuk semua pair sekaligus.
+    # NaN hanya ada di depan (padding / bar pertama), jadi cukup dihitung sebagai bobot 0
+    decay = 1.0 - 1.0 / length
+    valid = ~np.isnan(values.T)
+    bars = np.where(valid, values.T, 0.0)
+    weights = valid.astype(float)
+    num, den = np.zeros(len(values)), np.zeros(len(values))
+    out_num, out_den = np.empty(bars.shape), np.empty(bars.shape)
+    for t in range(len(bars)):
+        num = num * decay + bars[t]
+        den = den * decay + weights[t]
+        out_num[t], out_den[t] = num, den
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(np.cumsum(valid, axis=0) >= length, out_num / out_den, np.nan).T
+
+
+def ema_2d(values: np.ndarray, length: int) -> np.ndarray:
+    # Seed = SMA `length` bar valid pertama (pair rata kanan, jadi posisinya beda per pair)
+    alpha = 2.0 / (length + 1)
+    n = values.shape[1]
+    first = np.argmax(~np.isnan(values), axis=1)
+    seed = first + length - 1
+    window = np.take_along_axis(values, np.minimum(first[:, None] + np.arange(length), n - 1), axis=1)
+    seed_value = window[:, 0]
+    for j in range(1, length):
+        seed_value = seed_value + window[:, j]
+    seed_value = seed_value / length
+    bars = np.ascontiguousarray(values.T)
+    ema = np.full(len(values), np.nan)
+    out = np.empty(bars.shape)
+    for t, x in enumerate(bars):
+        ema = np.where(seed == t, seed_value, alpha * x + (1 - alpha) * ema)
+        out[t] = ema
+    return out.T
+
+
+def atr_2d(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    prev_close = np.concatenate((np.full((len(close), 1), np.nan), close[:, :-1]), axis=1)
+    # Bar valid pertama punya prev_close NaN sehingga TR-nya NaN, sama seperti atr_array
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return rma_2d(tr, length)
+
+
+def stoch_rsi_2d(close: np.ndarray, length: int = 14, rsi_length: int = 14, k: int = 3, d: int = 3,
+                 tail: Optional[int] = None):
+    """(StochRSI k, d) per pair; dengan `tail` hanya `tail` kolom terakhir yang dihitung."""
+    diff = np.diff(close, axis=1, prepend=np.nan)
+    gain = rma_2d(np.where(np.isnan(diff), np.nan, np.maximum(diff, 0.0)), rsi_length)
+    loss = np.abs(rma_2d(np.where(np.isnan(diff), np.nan, np.minimum(diff, 0.0)), rsi_length))
+    total = gain + loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = np.where(total != 0, 100.0 * gain / total, np.nan)
+    if tail:
+        rsi = rsi[:, -(tail + length + k + d - 3):]
+    lowest, highest = _rolling(rsi, length, np.minimum), _rolling(rsi, length, np.maximum)
+    span = highest - lowest
+    stoch = 100.0 * (rsi - lowest) / np.where(span == 0, EPS, span)
+    stoch_k = sma_2d(stoch, k)
+    stoch_d = sma_2d(stoch_k, d)
+    return (stoch_k[:, -tail:], stoch_d[:, -tail:]) if tail else (stoch_k, stoch_d)
+
+
+# ==============================================================================
+# --- SINYAL ---
+# ==============================================================================
+
+@dataclass
+class BatchSignals:
+    pairs: List[str]
+    signal: np.ndarray        # bool (pairs,)
+    entry_price: np.ndarray   # close bar berjalan
+    atr: np.ndarray           # ATR bar closed terakhir
+
+    def signals(self) -> List[Tuple[str, Optional[Tuple[float, float]]]]:
+        """[(pair, (entry_price, atr) atau None)], format sama dengan ParallelAnalyzer.analyze."""
+        return [(pair, (float(self.entry_price[i]), float(self.atr[i])) if self.signal[i] else None)
+                for i, pair in enumerate(self.pairs)]
+
+
+def h1_trend(stack: np.ndarray, params: StrategyParams) -> np.ndarray:
+    """Setara `_h1_trend_ok` per pair: close bar berjalan tidak di bawah EMA H1 (EMA NaN dianggap lolos)."""
+    if not stack.shape[1]:
+        return np.zeros(len(stack), dtype=bool)
+    close = stack[..., CLOSE]
+    ema = ema_2d(close, params.h1_ema_period)[:, -1]
+    with np.errstate(invalid='ignore'):
+        return ~np.isnan(close[:, -1]) & ~(close[:, -1] < ema)
+
+
+def m15_signals(pairs: Sequence[str], stack: np.ndarray, params: StrategyParams) -> BatchSignals:
+    """Setara `_evaluate_m15_signal` per pair: cross EMA, volume > SMA volume dan cross StochRSI pada bar closed."""
+    pairs = list(pairs)
+    n = len(pairs)
+    if stack.shape[1] < 3:
+        return BatchSignals(pairs, np.zeros(n, dtype=bool), np.full(n, np.nan), np.full(n, np.nan))
+    # Bar berjalan (kolom -1) hanya dipakai sebagai harga entry; indikator cukup sampai bar closed.
+    # Kolom [0, 1] hasil di bawah = [prev, last] = iloc[-3], iloc[-2]
+    high, low, close, volume = (stack[:, :-1, f] for f in (HIGH, LOW, CLOSE, VOLUME))
+    fast = ema_2d(close, params.m15_ema_fast)[:, -2:]
+    slow = ema_2d(close, params.m15_ema_slow)[:, -2:]
+    volume_sma = sma_2d(volume, params.volume_avg_period, tail=1)[:, 0]
+    stoch_k, stoch_d = stoch_rsi_2d(close, params.stoch_rsi_period, 14, 3, 3, tail=2)
+    atr = atr_2d(high, low, close, params.atr_period)[:, -1]
+
+    with np.errstate(invalid='ignore'):
+        signal = ((np.count_nonzero(~np.isnan(stack[..., CLOSE]), axis=1) >= MIN_BARS)
+                  & (fast[:, 0] < slow[:, 0]) & (fast[:, 1] > slow[:, 1])
+                  & (volume[:, -1] > volume_sma)
+                  & (stoch_k[:, 0] < stoch_d[:, 0]) & (stoch_k[:, 1] > stoch_d[:, 1]))
+    return BatchSignals(pairs, signal, stack[:, -1, CLOSE].copy(), atr)
+
+
+def evaluate(h1: Dict[str, Optional[Sequence[Sequence[float]]]],
+             m15: Dict[str, Optional[Sequence[Sequence[float]]]],
+             params: StrategyParams) -> BatchSignals:
+    """Tren H1 + sinyal M15 untuk semua pair di `h1` (pair tanpa data M15 tidak bersinyal)."""
+    pairs, h1_stack = stack_candles(h1)
+    _, m15_stack = stack_candles({pair: m15.get(pair) for pair in pairs})
+    result = m15_signals(pairs, m15_stack, params)
+    result.signal &= h1_trend(h1_stack, params)
+    return result
@@ -0,0 +1,286 @@
+"""benchmark.py
+Benchmark per tahap siklus ProfessionalBot terhadap exchange palsu lokal.
+
+Untuk setiap ukuran universe (default 50, 500, 5000 pair) dijalankan
+FakeIndodaxServer (fake_indodax.py) dengan pasar beku (jam tetap + seed),
+lalu ProfessionalBot dalam mode simulasi memakai client ccxt asli yang
+diarahkan ke server tersebut (tanpa throttle, tanpa Telegram). Tahap yang
+diukur:
+
+    momentum_engine, process_candidates, analyze_and_trade,
+    get_latest_indicators, manage_active_positions, send_status_update,
+    journal_sync
+
+get_latest_indicators diukur dengan M15_SIGNAL_PLAN, jalur indikator yang
+dipakai analyze_and_trade untuk sinyal M15. journal_sync mengukur jalur
+simpan state per siklus posisi: journal.update (sl_price, highest_price) per
+posisi lalu satu journal.sync (fsync).
+
+Per tahap dicatat:
+- cold_ms  → run pertama (cache candle/indikator masih kosong)
+- wall_ms  → median run berikutnya (cache hangat, seperti siklus normal)
+- api_calls→ request HTTP per run (per endpoint di api_by_endpoint)
+- alloc_peak_kb / alloc_blocks → puncak memori & blok hidup yang dialokasikan
+  selama satu run tambahan di bawah tracemalloc (tidak ikut dihitung waktunya)
+
+Hasil ditulis sebagai JSON. Dengan --baseline, setiap tahap dibandingkan
+dengan hasil sebelumnya; proses keluar dengan kode 1 bila wall_ms naik lebih
+dari --max-regression (dan lebih dari --noise-ms) atau api_calls bertambah.
+
+Pemakaian:
+    python benchmark.py --pairs 50,500,5000 --output benchmark_results.json
+    python benchmark.py --baseline benchmark_baseline.json --max-regression 0.25
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import ccxt
+
+from fake_indodax import BAR_SECONDS, FakeIndodaxServer
+from log_pipeline import JsonLinesFormatter, QueueLogHandler, RotatingFileSink
+
+STAGES = ('momentum_engine', 'process_candidates', 'analyze_and_trade', 'get_latest_indicators',
+          'manage_active_positions', 'send_status_update', 'journal_sync')
+
+
+def _api_delta(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    skip = ('requests', 'errors', 'rate_limited')
+    return {k: v - before.get(k, 0) for k, v in after.items() if k not in skip and v - before.get(k, 0)}
+
+
+def measure(server: FakeIndodaxServer, fn: Callable[[], object], setup: Optional[Callable[[], None]] = None,
+            repeat: int = 5, allocations: bool = True) -> dict:
+    """Jalankan setup()+fn() `repeat` kali (run pertama = cold) dan satu kali lagi di bawah tracemalloc."""
+    times: List[float] = []
+    calls: Dict[str, int] = {}
+    for _ in range(max(2, repeat)):
+        if setup:
+            setup()
+        before = dict(server.stats)
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+        calls = _api_delta(before, server.stats)
+    result = {
+        'cold_ms': round(times[0], 3),
+        'wall_ms': round(statistics.median(times[1:]), 3),
+        'wall_ms_min': round(min(times[1:]), 3),
+        'api_calls': sum(calls.values()),
+        'api_by_endpoint': calls,
+    }
+    if allocations:
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            fn()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result['alloc_peak_kb'] = round(peak / 1024, 1)
+        result['alloc_blocks'] = sum(stat.count for stat in snapshot.statistics('filename'))
+    return result
+
+
+def _bench_positions(bot, pairs: List[str], count: int) -> List[dict]:
+    # Posisi sintetis dengan SL/TP1 jauh, jadi tahap posisi mengukur biaya pengecekan saja
+    tickers = bot.indodax.fetch_tickers(pairs[:count])
+    positions = []
+    for pair in pairs[:count]:
+        price = float(tickers[pair]['last'])
+        positions.append({
+            'pair': pair, 'entry_price': price, 'amount': 10500 / price,
+            'sl_price': price * 0.5, 'tp1_price': price * 1.5, 'highest_price': price,
+            'tp1_hit': False, 'type': 'Momentum', 'atr': price * 0.01,
+        })
+    return positions
+
+
+def run_universe(bot_module, pairs: int, repeat: int = 5, sample: int = 20,
+                 max_candidates: int = 100, positions: int = 10, latency_ms: float = 0.0,
+                 seed: int = 7, allocations: bool = True) -> Dict[str, dict]:
+    # Pasar dibekukan di tengah bar 15m: ticker & candle sama persis di setiap run
+    frozen = (int(time.time()) // BAR_SECONDS) * BAR_SECONDS + BAR_SECONDS / 2
+    with FakeIndodaxServer(pairs, seed=seed, latency_ms=latency_ms, clock=lambda: frozen) as server:
+        bot_module.INDODAX_API_URL = server.url
+
+        class BenchBot(bot_module.ProfessionalBot):
+            def _init_indodax(self):
+                # Tanpa throttle: yang diukur biaya bot, bukan jeda rate limit
+                exchange = ccxt.indodax(bot_module.indodax_client_config())
+                exchange.enableRateLimit = False
+                return exchange
+
+        bot = BenchBot(startup_reports=False)
+        markets = list(bot.idr_markets)
+        candidates: List[str] = []
+        held = _bench_positions(bot, markets, positions)
+        sample_pairs = markets[:sample]
+
+        def fresh_cycle():
+            bot.ticker_cache.new_cycle()
+
+        def no_positions():
+            bot.active_positions = []
+            bot.virtual_idr = bot_module.VIRTUAL_INITIAL_IDR
+
+        def with_positions():
+            bot.active_positions = [dict(p) for p in held]
+            bot.ticker_cache.new_cycle()
+
+        def scan():
+            candidates[:] = bot.momentum_engine()
+
+        def analyze_sample():
+            for pair in sample_pairs:
+                bot.analyze_and_trade(pair, 'Momentum')
+
+        def journal_cycle():
+            # Sama dengan _manage_position (trailing stop) + monitor_positions_job
+            for position in bot.active_positions:
+                bot.journal.update(position, 'sl_price', 'highest_price')
+            bot.journal.sync()
+
+        def indicators_sample():
+            for pair in sample_pairs:
+                bot.get_latest_indicators(pair, bot_module.M15_TIMEFRAME, bot_module.M15_SIGNAL_PLAN)
+
+        results = {}
+        results['momentum_engine'] = measure(server, scan, fresh_cycle, repeat, allocations)
+        results['momentum_engine']['items'] = len(bot.idr_markets)
+        batch = candidates[:max_candidates]
+        results['process_candidates'] = measure(
+            server, lambda: bot.process_candidates(batch, 'Momentum'), no_positions, repeat, allocations)
+        results['process_candidates']['items'] = len(batch)
+        results['analyze_and_trade'] = measure(server, analyze_sample, no_positions, repeat, allocations)
+        results['get_latest_indicators'] = measure(server, indicators_sample, None, repeat, allocations)
+        for name in ('analyze_and_trade', 'get_latest_indicators'):
+            results[name]['items'] = len(sample_pairs)
+        results['manage_active_positions'] = measure(
+            server, bot.manage_active_positions, with_positions, repeat, allocations)
+        results['send_status_update'] = measure(server, bot.send_status_update, with_positions, repeat, allocations)
+        results['journal_sync'] = measure(server, journal_cycle, with_positions, repeat, allocations)
+        for name in ('manage_active_positions', 'send_status_update', 'journal_sync'):
+            results[name]['items'] = len(held)
+    return {name: results[name] for name in STAGES}
+
+
+def compare(results: dict, baseline: dict, max_regression: float = 0.25, noise_ms: float = 5.0) -> List[str]:
+    """Daftar regresi tahap (wall_ms atau api_calls) dibanding baseline."""
+    regressions = []
+    for universe, stages in results.get('universes', {}).items():
+        base_stages = baseline.get('universes', {}).get(universe, {})
+        for stage, current in stages.items():
+            base = base_stages.get(stage)
+            if not base:
+                continue
+            limit = base['wall_ms'] * (1 + max_regression)
+            if current['wall_ms'] > limit and current['wall_ms'] - base['wall_ms'] > noise_ms:
+                regressions.append(f"{universe} pair / {stage}: wall_ms {base['wall_ms']:.1f} -> {current['wall_ms']:.1f}")
+            if current['api_calls'] > base['api_calls']:
+                regressions.append(f"{universe} pair / {stage}: api_calls {base['api_calls']} -> {current['api_calls']}")
+    return regressions
+
+
+def run_benchmark(universes: List[int], repeat: int = 5, sample: int = 20, max_candidates: int = 100,
+                  positions: int = 10, latency_ms: float = 0.0, seed: int = 7, allocations: bool = True,
+                  quiet: bool = True) -> dict:
+    import hybrid_bot_v7_patched as bot_module
+
+    workdir = tempfile.mkdtemp(prefix='cuanbot_bench_')
+    # Benchmark selalu simulasi, tanpa Telegram/rekaman, dengan state & log di folder sementara
+    for name, value in (('SIMULATION_MODE', True), ('STATE_FILE', os.path.join(workdir, 'positions.json')),
+                        ('RECORD_MARKET_DATA', False), ('EVENT_DB', os.path.join(workdir, 'events.db')),
+                        ('MARKETS_CACHE_FILE', ''), ('FAST_STARTUP', False),
+                        ('TELEGRAM_TOKEN', None), ('TELEGRAM_CHAT_ID', None),
+                        ('INDODAX_API_KEY', bot_module.INDODAX_API_KEY or 'bench'),
+                        ('INDODAX_API_SECRET', bot_module.INDODAX_API_SECRET or 'bench')):
+        setattr(bot_module, name, value)
+    logger = bot_module.logger
+    log_handler = QueueLogHandler(RotatingFileSink(os.path.join(workdir, 'bot_log.jsonl')), name='bench-log')
+    log_handler.setFormatter(JsonLinesFormatter())
+    saved_handlers, logger.handlers = logger.handlers, [log_handler]
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'settings': {'repeat': repeat, 'sample': sample, 'max_candidates': max_candidates,
+                     'positions': positions, 'latency_ms': latency_ms, 'seed': seed,
+                     'ohlcv_cache': bot_module.ENABLE_OHLCV_CACHE,
+                     'incremental_indicators': bot_module.USE_INCREMENTAL_INDICATORS},
+        'universes': {},
+    }
+    try:
+        with contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            stack.callback(bot_module.flush_logs)
+            for pairs in universes:
+                print(f"Benchmark {pairs} pair...", file=sys.stderr)
+                results['universes'][str(pairs)] = run_universe(
+                    bot_module, pairs, repeat, sample, max_candidates, positions, latency_ms, seed, allocations)
+    finally:
+        logger.handlers = saved_handlers
+        log_handler.close()
+    return results
+
+
+def _print_table(results: dict) -> None:
+    print(f"{'pairs':>6} {'stage':<26} {'cold ms':>10} {'wall ms':>10} {'api':>6} {'peak KB':>10} {'items':>6}")
+    for universe, stages in results['universes'].items():
+        for stage, r in stages.items():
+            print(f"{universe:>6} {stage:<26} {r['cold_ms']:>10.1f} {r['wall_ms']:>10.1f} {r['api_calls']:>6} "
+                  f"{r.get('alloc_peak_kb', float('nan')):>10.1f} {r.get('items', ''):>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark per tahap siklus ProfessionalBot (exchange palsu lokal).')
+    parser.add_argument('--pairs', default='50,500,5000', help='ukuran universe dipisah koma')
+    parser.add_argument('--repeat', type=int, default=5, help='run per tahap (run pertama = cold)')
+    parser.add_argument('--sample', type=int, default=20, help='jumlah pair untuk analyze_and_trade & get_latest_indicators')
+    parser.add_argument('--max-candidates', type=int, default=100, help='batas kandidat untuk process_candidates')
+    parser.add_argument('--positions', type=int, default=10, help='posisi aktif sintetis untuk tahap posisi')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='latensi tambahan per request di server palsu')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--no-alloc', action='store_true', help='lewati pengukuran alokasi (tracemalloc)')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default='', help='hasil sebelumnya (JSON) untuk cek regresi')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='kenaikan wall_ms maksimum (0.25 = 25%%)')
+    parser.add_argument('--noise-ms', type=float, default=5.0, help='selisih wall_ms di bawah ini tidak dianggap regresi')
+    parser.add_argument('--verbose', action='store_true', help='tampilkan output terminal bot')
+    args = parser.parse_args(argv)
+
+    universes = [int(p) for p in args.pairs.split(',') if p.strip()]
+    results = run_benchmark(universes, args.repeat, args.sample, args.max_candidates, args.positions,
+                            args.latency_ms, args.seed, not args.no_alloc, not args.verbose)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    _print_table(results)
+    print(f"\nHasil disimpan ke {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression, args.noise_ms)
+        if regressions:
+            print("\nREGRESI terdeteksi:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nTidak ada regresi dibanding baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""event_store.py
+Penyimpanan event trading (SQLite) untuk hybrid_bot_v7_patched.py.
+
+Event OPEN, TP1, CLOSE, SKIP_TRADE dan SIM_VIRTUAL_* dari `_log_event` ditulis
+ke tabel `events` sehingga riwayat trade dan PnL bisa di-query (UI, laporan)
+tanpa mem-parse log teks.
+
+Penulisan tidak membebani thread trading: record() hanya memasukkan tuple ke
+antrian; thread penulis menyusun kolom lalu meng-insert per batch (executemany dalam satu
+transaksi) setiap `batch_size` record atau `flush_interval` detik. Database
+memakai journal_mode=WAL, jadi pembaca di proses lain (UI) tidak terblokir
+oleh penulis.
+
+Kolom hasil ekstraksi dari data event:
+- price      : exit_price (TP1/CLOSE) atau entry_price
+- amount     : amount / amount_sold
+- pnl_idr    : (exit_price - entry_price) * amount untuk TP1/CLOSE
+- pnl_percent: dari data CLOSE
+Index: (pair, ts), (type, ts), (ts).
+
+Contoh query:
+    realized_pnl('bot_events.db', days=30)   # PnL realisasi per pair 30 hari
+    recent_events('bot_events.db', event_type='CLOSE', limit=20)
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+STORED_EVENTS = ('OPEN', 'TP1', 'CLOSE', 'SKIP_TRADE')
+STORED_PREFIXES = ('SIM_VIRTUAL_',)
+REALIZED_EVENTS = ('TP1', 'CLOSE')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    type TEXT NOT NULL,
+    pair TEXT NOT NULL DEFAULT '',
+    message TEXT,
+    price REAL,
+    amount REAL,
+    pnl_idr REAL,
+    pnl_percent REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_pair_ts ON events (pair, ts);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events (type, ts);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+"""
+
+
+def is_stored_event(event_type: str) -> bool:
+    return event_type in STORED_EVENTS or event_type.startswith(STORED_PREFIXES)
+
+
+def _number(data: Dict[str, Any], *keys: str) -> Optional[float]:
+    for key in keys:
+        value = data.get(key)
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def _row(ts: float, event_type: str, pair: str, message: str, data: Optional[Dict[str, Any]]) -> tuple:
+    data = data or {}
+    price = _number(data, 'exit_price', 'entry_price')
+    amount = _number(data, 'amount', 'amount_sold')
+    entry = _number(data, 'entry_price')
+    pnl_idr = None
+    if event_type in REALIZED_EVENTS and None not in (price, amount, entry):
+        pnl_idr = (price - entry) * amount
+    payload = json.dumps(data, ensure_ascii=False, default=str) if data else None
+    return (ts, event_type, pair or '', message, price, amount, pnl_idr, _number(data, 'pnl_percent'), payload)
+
+
+def connect(path: str, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class EventStore:
+    """Penulis event ke SQLite di thread latar (antrian terbatas, insert per batch)."""
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'dropped': 0, 'errors': 0}
+
+    def start(self) -> 'EventStore':
+        connect(self.path).close()  # skema dibuat di sini agar error path langsung terlihat
+        self._thread = threading.Thread(target=self._run, name='event-store', daemon=True)
+        self._thread.start()
+        return self
+
+    def record(self, event_type: str, pair: str = '', message: str = '',
+               data: Optional[Dict[str, Any]] = None, ts: Optional[float] = None) -> None:
+        # Ekstraksi kolom + json.dumps dikerjakan thread penulis; di sini cukup salinan dangkal data
+        row = (time.time() if ts is None else ts, event_type, pair, message, dict(data) if data else None)
+        with self._flushed:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._flushed:
+                self._pending -= 1
+            self.stats['dropped'] += 1
+            return
+        self.stats['queued'] += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Tunggu sampai semua record yang sudah di-queue tertulis."""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        conn = connect(self.path)
+        try:
+            stop = False
+            while not stop:
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if row is None:
+                        stop = True
+                        break
+                    batch.append(_row(*row))
+                if batch:
+                    self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        try:
+            with conn:
+                conn.executemany('INSERT INTO events (ts, type, pair, message, price, amount, pnl_idr, '
+                                 'pnl_percent, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        except sqlite3.Error:
+            self.stats['errors'] += 1
+        with self._flushed:
+            self._pending -= len(batch)
+            self._flushed.notify_all()
+
+    # Query lewat koneksi baca terpisah (aman dipanggil dari thread mana pun)
+    def realized_pnl(self, days: float = 30, pair: Optional[str] = None, now: Optional[float] = None):
+        return realized_pnl(self.path, days, pair, now)
+
+    def recent_events(self, event_type: Optional[str] = None, pair: Optional[str] = None, limit: int = 50):
+        return recent_events(self.path, event_type, pair, limit=limit)
+
+
+def realized_pnl(path: str, days: float = 30, pair: Optional[str] = None,
+                 now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """PnL realisasi (TP1 + CLOSE) per pair dalam `days` hari terakhir, urut PnL terbesar."""
+    since = (time.time() if now is None else now) - days * 86400
+    sql = ("SELECT pair, SUM(pnl_idr), SUM(type = 'CLOSE'), AVG(CASE WHEN type = 'CLOSE' THEN pnl_percent END), "
+           "SUM(type = 'CLOSE' AND pnl_percent > 0) FROM events WHERE type IN ('TP1', 'CLOSE') AND ts >= ?")
+    args: list = [since]
+    if pair:
+        sql += ' AND pair = ?'
+        args.append(pair)
+    sql += ' GROUP BY pair ORDER BY SUM(pnl_idr) DESC'
+    conn = connect(path, readonly=True)
+    try:
+        rows = conn.execute(sql, args).fetchall()
+    finally:
+        conn.close()
+    return [{'pair': p, 'pnl_idr': pnl or 0.0, 'closed': closed or 0, 'avg_pnl_percent': avg, 'wins': wins or 0}
+            for p, pnl, closed, avg, wins in rows]
+
+
+def recent_events(path: str, event_type: Optional[str] = None, pair: Optional[str] = None,
+                  since: Optional[float] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Event terbaru (opsional filter tipe/pair/waktu), terbaru dulu."""
+    where, args = [], []
+    for column, value in (('type', event_type), ('pair', pair)):
+        if value:
+            where.append(f'{column} = ?')
+            args.append(value)
+    if since is not None:
+        where.append('ts >= ?')
+        args.append(since)
+    sql = 'SELECT ts, type, pair, message, price, amount, pnl_idr, pnl_percent, data FROM events'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY ts DESC LIMIT ?'
+    args.append(int(limit))
+    conn = connect(path, readonly=True)
+    try:
+        rows = conn.execute(sql, args).fetchall()
+    finally:
+        conn.close()
+    keys = ('ts', 'type', 'pair', 'message', 'price', 'amount', 'pnl_idr', 'pnl_percent', 'data')
+    return [dict(zip(keys, row), data=json.loads(row[-1]) if row[-1] else None) for row in rows]
@@ -0,0 +1,344 @@
+"""fake_indodax.py
+Server HTTP lokal pengganti Indodax untuk benchmark bot & UI tanpa jaringan.
+
+Server menjawab endpoint yang dipakai ccxt.indodax dengan format respons
+yang sama (api/pairs, api/server_time, api/ticker/{pair}, api/ticker_all,
+api/summaries, tradingview/history_v2, tapi getInfo/trade), jadi client ccxt
+asli (sync maupun async_support, termasuk throttle & parser) ikut teruji.
+Arahkan bot/UI ke server ini lewat env INDODAX_API_URL.
+
+Pasar sintetis:
+- `pairs` market XXX/IDR (BTC/IDR selalu ada) dengan harga random walk
+  log-normal per bar 15m. Seluruh jalur harga ditentukan oleh `seed`
+  (dibangkitkan per blok kolom untuk semua pair sekaligus, vektor NumPy),
+  jadi hasilnya sama di setiap run.
+- Harga bar berjalan bergerak kontinu menuju close bar tersebut, sehingga
+  ticker dan candle selalu konsisten.
+- Timeframe lain (1m, 1h, 4h, 1d) di-resample dari bar 15m.
+
+Gangguan yang bisa diatur: latensi (+ jitter), error rate (HTTP 5xx) dan
+batas request per detik (HTTP 429 bila terlampaui).
+
+Pemakaian:
+    python fake_indodax.py --pairs 5000 --port 8765 --latency-ms 40 --error-rate 0.01 --rate-limit 20
+    INDODAX_API_URL=http://127.0.0.1:8765 SIMULATION_MODE=True python hybrid_bot_v7_patched.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+BAR_SECONDS = 900
+_BLOCK = 256  # kolom (bar) per blok random walk
+_TIMEFRAMES = {'1': 60, '15': 900, '30': 1800, '60': 3600, '240': 14400, '1D': 86400}
+
+
+class SyntheticMarket:
+    """Harga random walk deterministik untuk banyak pair, dibangkitkan per blok bar 15m."""
+
+    def __init__(self, pairs: int = 200, seed: int = 7, history_bars: int = 1000,
+                 sigma: float = 0.006, clock=None):
+        self.seed = seed
+        self.sigma = sigma
+        self.clock = clock or time.time
+        names = ['BTC', 'ETH', 'SOL', 'DOGE', 'SHIB', 'PEPE', 'ADA', 'POL', 'OP', 'FET']
+        names += [f'X{i:04d}' for i in range(max(0, pairs - len(names)))]
+        self.bases = names[:max(1, pairs)]
+        rng = np.random.default_rng(seed)
+        self.start_price = 10 ** rng.uniform(1, 9, len(self.bases))
+        self.drift = rng.normal(0, 0.0004, len(self.bases))
+        self.start_price[0], self.drift[0] = 1.5e9, 0.0  # BTC
+        self.t0 = (int(self.clock()) // BAR_SECONDS - history_bars) * BAR_SECONDS
+        self._close = np.empty((len(self.bases), 0))
+        self._shock = np.empty((len(self.bases), 0))
+        self._lock = threading.Lock()
+
+    def index(self, base: str) -> int:
+        return self.bases.index(base)
+
+    def _ensure(self, bars: int) -> None:
+        with self._lock:
+            while self._close.shape[1] < bars:
+                block = self._close.shape[1] // _BLOCK
+                z = np.random.default_rng((self.seed, block)).standard_normal((len(self.bases), _BLOCK))
+                prev = self._close[:, -1] if self._close.shape[1] else self.start_price
+                steps = self.drift[:, None] + self.sigma * z
+                closes = prev[:, None] * np.exp(np.cumsum(steps, axis=1))
+                self._close = np.concatenate([self._close, closes], axis=1)
+                self._shock = np.concatenate([self._shock, z], axis=1)
+
+    def _bar_now(self, now: float):
+        k = int((now - self.t0) // BAR_SECONDS)
+        frac = ((now - self.t0) % BAR_SECONDS) / BAR_SECONDS
+        self._ensure(k + 1)
+        return k, frac
+
+    def prices(self, now: Optional[float] = None) -> np.ndarray:
+        """Harga terakhir semua pair pada `now` (di dalam bar berjalan)."""
+        k, frac = self._bar_now(self.clock() if now is None else now)
+        prev = self._close[:, k - 1] if k > 0 else self.start_price
+        return prev * np.exp(frac * self.drift + self.sigma * np.sqrt(frac) * self._shock[:, k])
+
+    def candles(self, i: int, tf_seconds: int, start: float, end: float) -> List[list]:
+        """Candle [ts, o, h, l, c, v] pair ke-i dengan waktu buka di [start, end], bar terakhir berjalan."""
+        now = self.clock()
+        k_now, _ = self._bar_now(now)
+        end = min(end, now)
+        first = max(0, int((start - self.t0) // BAR_SECONDS))
+        closes = self._close[i, :k_now]
+        opens = np.concatenate(([self.start_price[i]], closes[:-1])) if k_now else np.empty(0)
+        wiggle = np.abs(self._shock[i, :k_now]) * self.sigma * 0.5
+        # Volume ikut besar gerakan bar (~Rp1 miliar per bar), supaya filter volume bisa terpicu
+        volume = 1e9 / np.maximum(opens, 1e-9) * (0.5 + np.abs(self._shock[i, :k_now]))
+        rows = []
+        tf_seconds = max(1, tf_seconds // BAR_SECONDS) * BAR_SECONDS
+        price_now = float(self.prices(now)[i])
+        # Bucket sejajar kelipatan timeframe sejak epoch (UTC), sama seperti candle exchange
+        ts = (self.t0 + first * BAR_SECONDS) // tf_seconds * tf_seconds
+        while ts <= end:
+            b = max(0, (ts - self.t0) // BAR_SECONDS)
+            stop = (ts + tf_seconds - self.t0) // BAR_SECONDS
+            if b > k_now:
+                break
+            upto = min(stop, k_now)
+            o = float(opens[b]) if b < k_now else float(closes[-1] if k_now else self.start_price[i])
+            if upto > b:
+                seg_o, seg_c, seg_w = opens[b:upto], closes[b:upto], wiggle[b:upto]
+                h = float(np.max(np.maximum(seg_o, seg_c) * (1 + seg_w)))
+                l = float(np.min(np.minimum(seg_o, seg_c) * (1 - seg_w)))
+                c = float(seg_c[-1])
+                v = float(np.sum(volume[b:upto]))
+            else:
+                h = l = c = o
+                v = 0.0
+            if stop > k_now:  # bar berjalan
+                c = price_now
+                h, l = max(h, c), min(l, c)
+            rows.append([int(ts), o, h, l, c, v])
+            ts += tf_seconds
+        return rows
+
+
+class FakeIndodaxServer:
+    """ThreadingHTTPServer di thread latar yang meniru REST API Indodax."""
+
+    def __init__(self, pairs: int = 200, host: str = '127.0.0.1', port: int = 0, seed: int = 7,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: float = 0.0, initial_idr: float = 10_000_000.0, history_bars: int = 1000,
+                 clock=None):
+        # `clock` tetap (mis. lambda: t) membekukan pasar: respons identik di setiap run benchmark
+        self.market = SyntheticMarket(pairs, seed=seed, history_bars=history_bars, clock=clock)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.balance: Dict[str, float] = {'idr': float(initial_idr)}
+        self.order_id = 0
+        self.stats: Dict[str, int] = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeIndodaxServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-indodax', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------ gangguan
+    def _disturb(self, path: str) -> Optional[tuple]:
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats[path] = self.stats.get(path, 0) + 1
+            delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self.random.random() < self.error_rate
+            if self.rate_limit > 0:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    self.stats['rate_limited'] += 1
+                    return 429, 'Too Many Requests'
+                self._recent.append(now)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.stats['errors'] += 1
+            return 503, 'Service Unavailable'
+        return None
+
+    # ------------------------------------------------------------------ endpoint publik
+    def _pair_id(self, base: str) -> str:
+        return f'{base.lower()}idr'
+
+    def _base_of(self, pair_id: str) -> str:
+        return pair_id.lower().replace('_', '')[:-3].upper()
+
+    def _raw_ticker(self, i: int, price: float, now: int) -> dict:
+        base = self.market.bases[i]
+        return {'high': f'{price * 1.02:.8f}', 'low': f'{price * 0.98:.8f}',
+                f'vol_{base.lower()}': f'{1e6 / price:.8f}', 'vol_idr': '1000000000',
+                'last': f'{price:.8f}', 'buy': f'{price * 0.999:.8f}', 'sell': f'{price * 1.001:.8f}',
+                'server_time': now}
+
+    def public(self, path: str, query: Dict[str, str]):
+        now = self.market.clock()
+        bases = self.market.bases
+        if path == 'api/server_time':
+            return {'timezone': 'UTC', 'server_time': int(now * 1000)}
+        if path == 'api/pairs':
+            return [{'id': self._pair_id(b), 'symbol': f'{b}IDR', 'base_currency': 'idr', 'traded_currency': b.lower(),
+                     'traded_currency_unit': b, 'description': f'{b}/IDR', 'ticker_id': f'{b.lower()}_idr',
+                     'volume_precision': 0, 'price_precision': 1, 'price_round': 8, 'pricescale': 1,
+                     'trade_min_base_currency': 10000, 'trade_min_traded_currency': 0.00000001,
+                     'trade_fee_percent': 0.3, 'is_maintenance': 0} for b in bases]
+        if path == 'api/ticker_all':
+            prices = self.market.prices(now)
+            return {'tickers': {f'{b.lower()}_idr': self._raw_ticker(i, float(prices[i]), int(now))
+                                for i, b in enumerate(bases)}}
+        if path == 'api/summaries':
+            prices, prices_24h = self.market.prices(now), self.market.prices(now - 86400)
+            return {'tickers': {f'{b.lower()}_idr': self._raw_ticker(i, float(prices[i]), int(now)) for i, b in enumerate(bases)},
+                    'prices_24h': {self._pair_id(b): f'{prices_24h[i]:.8f}' for i, b in enumerate(bases)},
+                    'prices_7d': {}}
+        if path.startswith('api/ticker/'):
+            i = self.market.index(self._base_of(path.rsplit('/', 1)[1]))
+            return {'ticker': self._raw_ticker(i, float(self.market.prices(now)[i]), int(now))}
+        if path == 'tradingview/history_v2':
+            i = self.market.index(self._base_of(query['symbol']))
+            tf = _TIMEFRAMES.get(query.get('tf', '15'), BAR_SECONDS)
+            rows = self.market.candles(i, tf, float(query.get('from', 0)), float(query.get('to', now)))
+            return [{'Time': r[0], 'Open': r[1], 'High': r[2], 'Low': r[3], 'Close': r[4], 'Volume': f'{r[5]:.8f}'}
+                    for r in rows]
+        raise KeyError(path)
+
+    # ------------------------------------------------------------------ endpoint privat
+    def private(self, form: Dict[str, str]):
+        method = form.get('method')
+        now = int(self.market.clock())
+        if method == 'getInfo':
+            with self._lock:
+                balance = {k: f'{v:.8f}' for k, v in self.balance.items()}
+            return {'success': 1, 'return': {'server_time': now, 'balance': balance,
+                                             'balance_hold': {k: '0' for k in balance}, 'user_id': '1'}}
+        if method == 'trade':
+            base = self._base_of(form['pair'])
+            price = float(self.market.prices()[self.market.index(base)])
+            coin = base.lower()
+            with self._lock:
+                self.order_id += 1
+                if form.get('type') == 'buy':
+                    cost = float(form.get('idr') or 0)
+                    fill = float(form.get('price') or price)
+                    self.balance['idr'] = self.balance.get('idr', 0.0) - cost
+                    self.balance[coin] = self.balance.get(coin, 0.0) + cost / fill
+                else:
+                    amount = float(form.get(coin) or 0)
+                    self.balance[coin] = self.balance.get(coin, 0.0) - amount
+                    self.balance['idr'] = self.balance.get('idr', 0.0) + amount * price
+                return {'success': 1, 'return': {'order_id': self.order_id, 'remain_idr': 0,
+                                                 'balance': {k: f'{v:.8f}' for k, v in self.balance.items()}}}
+        if method in ('openOrders', 'orderHistory', 'tradeHistory'):
+            return {'success': 1, 'return': {'orders': []}}
+        return {'success': 0, 'error': 'Invalid method'}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # header & body ditulis terpisah; tanpa ini +40 ms (delayed ACK)
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload) -> None:
+                # Gangguan dikirim sebagai teks polos (seperti halaman error CDN) agar ccxt
+                # memetakannya lewat kode HTTP: 429 -> RateLimitExceeded, 503 -> ExchangeNotAvailable
+                text = isinstance(payload, str)
+                body = payload.encode() if text else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain' if text else 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                path = parsed.path.strip('/')
+                disturbed = server._disturb('api/ticker' if path.startswith('api/ticker/') else path)
+                if disturbed:
+                    return self._send(*disturbed)
+                query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                try:
+                    return self._send(200, server.public(path, query))
+                except (KeyError, ValueError) as e:
+                    return self._send(404, {'error': f'unknown {e}'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = {k: v[-1] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                disturbed = server._disturb('tapi/' + form.get('method', ''))
+                if disturbed:
+                    return self._send(*disturbed)
+                try:
+                    return self._send(200, server.private(form))
+                except (KeyError, ValueError) as e:
+                    return self._send(200, {'success': 0, 'error': f'invalid request {e}'})
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Server Indodax palsu (lokal) untuk benchmark.')
+    parser.add_argument('--pairs', type=int, default=200)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='peluang HTTP 503 per request (0-1)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='request/detik sebelum HTTP 429 (0 = tanpa batas)')
+    parser.add_argument('--initial-idr', type=float, default=10_000_000.0)
+    args = parser.parse_args(argv)
+
+    server = FakeIndodaxServer(args.pairs, args.host, args.port, args.seed, args.latency_ms, args.jitter_ms,
+                               args.error_rate, args.rate_limit, args.initial_idr)
+    print(f"Fake Indodax ({args.pairs} pair) di {server.url} — set INDODAX_API_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
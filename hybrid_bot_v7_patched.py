@@ -12,15 +12,30 @@ import ccxt
 import pandas as pd
 import pandas_ta as ta
 import time
-import requests
 import json
 import os
+import atexit
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
+from event_store import EventStore, is_stored_event
+from indicators import IndicatorEngine, IndicatorPlan
+from log_pipeline import JsonLinesFormatter, QueueLogHandler, RotatingFileSink, StreamSink
+from market_data import BalanceCache, CandleStore, MarketsCache, TickerCache, resample_limit, resample_ohlcv
+from market_recorder import MarketRecorder
+from metrics import (METRICS, MetricsFileWriter, MetricsServer, instrument_exchange, observe_job,
+                     register_cache_metrics, register_rate_limit_metrics)
+from scheduler import CandleScheduler, timeframe_seconds
+from parallel_analysis import ParallelAnalyzer
+from position_journal import PositionJournal
+from position_monitor import PositionMonitor
+from rate_limiter import TokenBucket, install_rate_limiter, parse_endpoint_weights
+from telegram_outbox import TelegramOutbox
+
 load_dotenv()  # otomatis cari dan baca file .env di folder project
 
 # ==============================================================================
@@ -33,11 +48,15 @@ class BotConfig:
     # API Credentials
     indodax_api_key: Optional[str] = None
     indodax_api_secret: Optional[str] = None
+    indodax_api_url: Optional[str] = None     # base URL REST pengganti (mis. fake_indodax.py lokal)
     coinmarketcal_api_key: Optional[str] = None
 
     # Telegram Settings
     telegram_token: Optional[str] = None
     telegram_chat_id: Optional[str] = None
+    telegram_timeout: float = 10.0            # timeout read request Telegram (detik)
+    telegram_coalesce_seconds: float = 1.0    # pesan dalam jendela ini digabung jadi satu kiriman
+    telegram_queue_size: int = 1000           # antrian outbox; pesan dibuang bila penuh
 
     # Risk Management
     modal_per_coin_idr: float = 10500
@@ -62,14 +81,75 @@ class BotConfig:
     atr_period: int = 14
     stoch_rsi_period: int = 14
 
+    # Momentum Screening
+    momentum_min_percentage: float = 3.0
+    momentum_min_volume_idr: float = 0.0      # 0 = filter volume nonaktif
+    momentum_max_spread_percent: float = 0.0  # 0 = filter spread nonaktif
+    bulk_ticker_scan: bool = True             # False = selalu pakai scan per-pair
+
+    # Async Runtime (ccxt.async_support)
+    async_runtime: bool = False
+    async_max_concurrency: int = 8
+
+    # Analisa Paralel (process_candidates)
+    parallel_analysis: bool = False           # indikator & sinyal kandidat dihitung di ProcessPool
+    analysis_workers: int = 0                 # 0 = jumlah core CPU
+    analysis_fetch_concurrency: int = 8       # pengambilan candle kandidat bersamaan
+    batch_signals: bool = False               # sinyal semua kandidat dihitung sekaligus (batch_signals.py)
+
+    # Rate Limit (token bucket bersama bot & UI)
+    rate_limit_per_sec: float = 20.0          # unit bobot per detik (ccxt indodax: rateLimit 50 ms)
+    rate_limit_burst: float = 40.0
+    rate_limit_file: str = 'indodax_rate_limit.json'  # kosong = hanya dalam satu proses
+    endpoint_weights: Dict[str, float] = None  # override bobot per path API, default tabel cost ccxt
+
+    # Market Data Cache
+    enable_ohlcv_cache: bool = True
+    ohlcv_cache_max_candles: int = 500        # ring buffer per (pair, timeframe)
+    resample_timeframes: bool = False         # candle H1/4h dibangun dari bar M15 cache, bukan di-fetch
+    candle_reuse_seconds: float = 60.0        # saat resample: bar M15 yang lebih baru dari ini dipakai tanpa request
+    ticker_cache_ttl: float = 15.0            # detik; cache juga dikosongkan tiap awal siklus
+    balance_cache_ttl: float = 60.0           # detik; di-invalidate saat ada order
+    use_incremental_indicators: bool = True   # False = hitung ulang via pandas_ta tiap analisa
+    record_market_data: bool = False          # rekam ticker & candle closed ke market_data_dir
+    market_data_dir: str = 'market_data'
+
     # Operational Modes
     simulation_mode: bool = False
     virtual_initial_idr: float = 1000000.0
     enable_btc_filter: bool = False
     state_file: str = 'active_positions.json'
+    state_fsync_interval: float = 1.0         # detik; batas fsync jurnal untuk update trailing stop
+    state_snapshot_every: int = 1000          # record jurnal sebelum dikompaksi ke STATE_FILE
+
+    # Startup
+    fast_startup: bool = True                 # laporan awal di thread latar, cek posisi lebih dulu
+    markets_cache_file: str = 'indodax_markets.json'  # cache load_markets di disk; '' = nonaktif
+    markets_cache_ttl: float = 21600.0        # umur maksimum cache market (detik)
     status_update_interval: int = 3
     scan_opportunities_interval: int = 5
-    log_file: str = 'bot_v7_log.csv'
+    use_candle_scheduler: bool = True         # False = loop lama (sleep 60 detik per siklus)
+    position_check_interval: float = 60.0     # detik antar cek posisi (1 siklus)
+    scheduler_candle_delay: float = 5.0       # detik setelah close bar 15m sebelum scan
+    clock_sync_interval: float = 3600.0       # detik antar sinkronisasi fetch_time
+    adaptive_position_polling: bool = True    # cek posisi sesuai jarak ke SL/TP1 (satuan ATR)
+    position_min_check_interval: float = 3.0  # detik; posisi tepat di dekat trigger
+    position_max_check_interval: float = 120.0  # detik; posisi >= position_far_atr dari trigger
+    position_far_atr: float = 4.0
+    position_check_budget: float = 0.0        # total cek harga posisi per menit; 0 = max_open_positions * 60 / position_check_interval
+    position_yield_pairs: int = 32            # scan sinkron: cek posisi jatuh tempo tiap N pair (analisa paralel)
+    log_file: str = 'bot_v7_log.jsonl'       # JSON lines, ditulis thread latar
+    log_max_bytes: int = 10 * 1024 * 1024     # rotasi bila file log melewati ukuran ini
+    log_rotate_interval: float = 86400.0      # rotasi tiap N detik (sejajar UTC); 0 = hanya ukuran
+    log_backup_count: int = 14                # file rotasi (.gz) yang disimpan
+    log_queue_size: int = 10000               # antrian log; record dibuang bila penuh
+    event_db: str = 'bot_events.db'           # SQLite event trading (OPEN/TP1/CLOSE/...); '' = nonaktif
+
+    # Metrics (format Prometheus)
+    metrics_port: int = 0                     # 0 = endpoint HTTP /metrics nonaktif
+    metrics_host: str = '127.0.0.1'
+    metrics_file: str = ''                    # kosong = tidak menulis file metrik
+    metrics_file_interval: float = 15.0       # detik antar penulisan metrics_file
 
     def __post_init__(self):
         if self.sector_mapping is None:
@@ -81,40 +161,317 @@ class BotConfig:
             }
         if self.max_positions_per_sector is None:
             self.max_positions_per_sector = {'MEME': 2, 'DEFAULT': 3}
+        if self.endpoint_weights is None:
+            self.endpoint_weights = {}
 
 def load_config() -> BotConfig:
     """Load configuration from environment variables."""
     return BotConfig(
         indodax_api_key=os.environ.get("INDODAX_API_KEY"),
         indodax_api_secret=os.environ.get("INDODAX_API_SECRET"),
+        indodax_api_url=os.environ.get("INDODAX_API_URL") or None,
         coinmarketcal_api_key=os.environ.get('COINMARKETCAL_API_KEY'),
         telegram_token=os.environ.get("TELEGRAM_TOKEN"),
+        telegram_chat_id=os.environ.get("TELEGRAM_CHAT_ID"),
+        telegram_timeout=float(os.environ.get('TELEGRAM_TIMEOUT', '10') or 10),
+        telegram_coalesce_seconds=float(os.environ.get('TELEGRAM_COALESCE_SECONDS', '1') or 0),
+        telegram_queue_size=int(os.environ.get('TELEGRAM_QUEUE_SIZE', '1000') or 1000),
+        simulation_mode=os.environ.get('SIMULATION_MODE', 'False').lower() in ('true', '1', 't'),
+        virtual_initial_idr=float(os.environ.get('VIRTUAL_INITIAL_IDR', '1000000') or 1000000),
+        enable_btc_filter=os.environ.get('ENABLE_BTC_FILTER', 'False').lower() in ('true', '1', 't'),
+        state_fsync_interval=float(os.environ.get('STATE_FSYNC_INTERVAL', '1') or 1),
+        state_snapshot_every=int(os.environ.get('STATE_SNAPSHOT_EVERY', '1000') or 1000),
+        fast_startup=os.environ.get('FAST_STARTUP', 'True').lower() in ('true', '1', 't'),
+        markets_cache_file=os.environ.get('MARKETS_CACHE_FILE', 'indodax_markets.json'),
+        markets_cache_ttl=float(os.environ.get('MARKETS_CACHE_TTL', '21600') or 0),
+        use_candle_scheduler=os.environ.get('USE_CANDLE_SCHEDULER', 'True').lower() in ('true', '1', 't'),
+        position_check_interval=float(os.environ.get('POSITION_CHECK_INTERVAL', '60') or 60),
+        scheduler_candle_delay=float(os.environ.get('SCHEDULER_CANDLE_DELAY', '5') or 5),
+        adaptive_position_polling=os.environ.get('ADAPTIVE_POSITION_POLLING', 'True').lower() in ('true', '1', 't'),
+        position_min_check_interval=float(os.environ.get('POSITION_MIN_CHECK_INTERVAL', '3') or 3),
+        position_max_check_interval=float(os.environ.get('POSITION_MAX_CHECK_INTERVAL', '120') or 120),
+        position_far_atr=float(os.environ.get('POSITION_FAR_ATR', '4') or 4),
+        position_check_budget=float(os.environ.get('POSITION_CHECK_BUDGET', '0') or 0),
+        position_yield_pairs=int(os.environ.get('POSITION_YIELD_PAIRS', '32') or 32),
+        bulk_ticker_scan=os.environ.get('BULK_TICKER_SCAN', 'True').lower() in ('true', '1', 't'),
+        rate_limit_per_sec=float(os.environ.get('RATE_LIMIT_PER_SEC', '20') or 20),
+        rate_limit_burst=float(os.environ.get('RATE_LIMIT_BURST', '40') or 40),
+        rate_limit_file=os.environ.get('RATE_LIMIT_FILE', 'indodax_rate_limit.json'),
+        endpoint_weights=parse_endpoint_weights(os.environ.get('RATE_LIMIT_ENDPOINT_WEIGHTS', '')),
+        enable_ohlcv_cache=os.environ.get('ENABLE_OHLCV_CACHE', 'True').lower() in ('true', '1', 't'),
+        ohlcv_cache_max_candles=int(os.environ.get('OHLCV_CACHE_MAX_CANDLES', '500') or 500),
+        resample_timeframes=os.environ.get('RESAMPLE_TIMEFRAMES', 'False').lower() in ('true', '1', 't'),
+        candle_reuse_seconds=float(os.environ.get('CANDLE_REUSE_SECONDS', '60') or 60),
+        ticker_cache_ttl=float(os.environ.get('TICKER_CACHE_TTL', '15') or 15),
+        balance_cache_ttl=float(os.environ.get('BALANCE_CACHE_TTL', '60') or 60),
+        use_incremental_indicators=os.environ.get('USE_INCREMENTAL_INDICATORS', 'True').lower() in ('true', '1', 't'),
+        record_market_data=os.environ.get('RECORD_MARKET_DATA', 'False').lower() in ('true', '1', 't'),
+        market_data_dir=os.environ.get('MARKET_DATA_DIR', 'market_data') or 'market_data',
+        async_runtime=os.environ.get('ASYNC_RUNTIME', 'False').lower() in ('true', '1', 't'),
+        async_max_concurrency=int(os.environ.get('ASYNC_MAX_CONCURRENCY', '8') or 8),
+        parallel_analysis=os.environ.get('PARALLEL_ANALYSIS', 'False').lower() in ('true', '1', 't'),
+        analysis_workers=int(os.environ.get('ANALYSIS_WORKERS', '0') or 0),
+        analysis_fetch_concurrency=int(os.environ.get('ANALYSIS_FETCH_CONCURRENCY', '8') or 8),
+        batch_signals=os.environ.get('BATCH_SIGNALS', 'False').lower() in ('true', '1', 't'),
+        metrics_port=int(os.environ.get('METRICS_PORT', '0') or 0),
+        metrics_host=os.environ.get('METRICS_HOST', '127.0.0.1') or '127.0.0.1',
+        metrics_file=os.environ.get('METRICS_FILE', ''),
+        metrics_file_interval=float(os.environ.get('METRICS_FILE_INTERVAL', '15') or 15),
+        log_file=os.environ.get('LOG_FILE', 'bot_v7_log.jsonl') or 'bot_v7_log.jsonl',
+        log_max_bytes=int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)) or 0),
+        log_rotate_interval=float(os.environ.get('LOG_ROTATE_INTERVAL', '86400') or 0),
+        log_backup_count=int(os.environ.get('LOG_BACKUP_COUNT', '14') or 14),
+        log_queue_size=int(os.environ.get('LOG_QUEUE_SIZE', '10000') or 10000),
+        event_db=os.environ.get('EVENT_DB', 'bot_events.db'),
+        momentum_min_percentage=float(os.environ.get('MOMENTUM_MIN_PERCENTAGE', '3') or 3),
+        momentum_min_volume_idr=float(os.environ.get('MOMENTUM_MIN_VOLUME_IDR', '0') or 0),
+        momentum_max_spread_percent=float(os.environ.get('MOMENTUM_MAX_SPREAD_PERCENT', '0') or 0),
+    )
+
+
+CONFIG = load_config()
+
+# ==============================================================================
+# --- ALIAS GLOBAL (dipakai ProfessionalBot & ui_hybrid_bot.py) ---
+# ==============================================================================
+
+INDODAX_API_KEY = CONFIG.indodax_api_key
+INDODAX_API_SECRET = CONFIG.indodax_api_secret
+INDODAX_API_URL = CONFIG.indodax_api_url
+COINMARKETCAL_API_KEY = CONFIG.coinmarketcal_api_key
+TELEGRAM_TOKEN = CONFIG.telegram_token
+TELEGRAM_CHAT_ID = CONFIG.telegram_chat_id
+TELEGRAM_TIMEOUT = CONFIG.telegram_timeout
+TELEGRAM_COALESCE_SECONDS = CONFIG.telegram_coalesce_seconds
+TELEGRAM_QUEUE_SIZE = CONFIG.telegram_queue_size
+
+MODAL_PER_COIN_IDR = CONFIG.modal_per_coin_idr
+MAX_OPEN_POSITIONS = CONFIG.max_open_positions
+ATR_MULTIPLIER_FOR_SL = CONFIG.atr_multiplier_for_sl
+SECTOR_MAPPING = CONFIG.sector_mapping
+MAX_POSITIONS_PER_SECTOR = CONFIG.max_positions_per_sector
+TAKE_PROFIT_1_RR = CONFIG.take_profit_1_rr
+TRAILING_STOP_PERCENT = CONFIG.trailing_stop_percent
+
+H1_TIMEFRAME = CONFIG.h1_timeframe
+M15_TIMEFRAME = CONFIG.m15_timeframe
+H1_EMA_PERIOD = CONFIG.h1_ema_period
+M15_EMA_FAST = CONFIG.m15_ema_fast
+M15_EMA_SLOW = CONFIG.m15_ema_slow
+VOLUME_AVG_PERIOD = CONFIG.volume_avg_period
+ATR_PERIOD = CONFIG.atr_period
+STOCH_RSI_PERIOD = CONFIG.stoch_rsi_period
+
+MOMENTUM_MIN_PERCENTAGE = CONFIG.momentum_min_percentage
+MOMENTUM_MIN_VOLUME_IDR = CONFIG.momentum_min_volume_idr
+MOMENTUM_MAX_SPREAD_PERCENT = CONFIG.momentum_max_spread_percent
+BULK_TICKER_SCAN = CONFIG.bulk_ticker_scan
+ASYNC_RUNTIME = CONFIG.async_runtime
+ASYNC_MAX_CONCURRENCY = CONFIG.async_max_concurrency
+PARALLEL_ANALYSIS = CONFIG.parallel_analysis
+ANALYSIS_WORKERS = CONFIG.analysis_workers
+ANALYSIS_FETCH_CONCURRENCY = CONFIG.analysis_fetch_concurrency
+BATCH_SIGNALS = CONFIG.batch_signals
+
+RATE_LIMIT_PER_SEC = CONFIG.rate_limit_per_sec
+RATE_LIMIT_BURST = CONFIG.rate_limit_burst
+RATE_LIMIT_FILE = CONFIG.rate_limit_file
+ENDPOINT_WEIGHTS = CONFIG.endpoint_weights
+
+ENABLE_OHLCV_CACHE = CONFIG.enable_ohlcv_cache
+OHLCV_CACHE_MAX_CANDLES = CONFIG.ohlcv_cache_max_candles
+RESAMPLE_TIMEFRAMES = CONFIG.resample_timeframes
+CANDLE_REUSE_SECONDS = CONFIG.candle_reuse_seconds
+TICKER_CACHE_TTL = CONFIG.ticker_cache_ttl
+BALANCE_CACHE_TTL = CONFIG.balance_cache_ttl
+USE_INCREMENTAL_INDICATORS = CONFIG.use_incremental_indicators
+RECORD_MARKET_DATA = CONFIG.record_market_data
+MARKET_DATA_DIR = CONFIG.market_data_dir
+
+SIMULATION_MODE = CONFIG.simulation_mode
+VIRTUAL_INITIAL_IDR = CONFIG.virtual_initial_idr
+ENABLE_BTC_FILTER = CONFIG.enable_btc_filter
+STATE_FILE = CONFIG.state_file
+STATE_FSYNC_INTERVAL = CONFIG.state_fsync_interval
+STATE_SNAPSHOT_EVERY = CONFIG.state_snapshot_every
+FAST_STARTUP = CONFIG.fast_startup
+MARKETS_CACHE_FILE = CONFIG.markets_cache_file
+MARKETS_CACHE_TTL = CONFIG.markets_cache_ttl
+STATUS_UPDATE_INTERVAL = CONFIG.status_update_interval
+SCAN_OPPORTUNITIES_INTERVAL = CONFIG.scan_opportunities_interval
+USE_CANDLE_SCHEDULER = CONFIG.use_candle_scheduler
+POSITION_CHECK_INTERVAL = CONFIG.position_check_interval
+SCHEDULER_CANDLE_DELAY = CONFIG.scheduler_candle_delay
+CLOCK_SYNC_INTERVAL = CONFIG.clock_sync_interval
+ADAPTIVE_POSITION_POLLING = CONFIG.adaptive_position_polling
+POSITION_MIN_CHECK_INTERVAL = CONFIG.position_min_check_interval
+POSITION_MAX_CHECK_INTERVAL = CONFIG.position_max_check_interval
+POSITION_FAR_ATR = CONFIG.position_far_atr
+# Default: budget request sama dengan loop lama (satu fetch_ticker per posisi per POSITION_CHECK_INTERVAL)
+POSITION_CHECK_BUDGET = CONFIG.position_check_budget or MAX_OPEN_POSITIONS * 60.0 / POSITION_CHECK_INTERVAL
+POSITION_YIELD_PAIRS = CONFIG.position_yield_pairs
+LOG_FILE = CONFIG.log_file
+LOG_MAX_BYTES = CONFIG.log_max_bytes
+LOG_ROTATE_INTERVAL = CONFIG.log_rotate_interval
+LOG_BACKUP_COUNT = CONFIG.log_backup_count
+LOG_QUEUE_SIZE = CONFIG.log_queue_size
+EVENT_DB = CONFIG.event_db
+METRICS_PORT = CONFIG.metrics_port
+METRICS_HOST = CONFIG.metrics_host
+METRICS_FILE = CONFIG.metrics_file
+METRICS_FILE_INTERVAL = CONFIG.metrics_file_interval
+
+# Satu bucket per proses; file RATE_LIMIT_FILE membuat budget-nya dibagi dengan proses lain (UI)
+RATE_LIMITER = TokenBucket(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, path=RATE_LIMIT_FILE or None)
+
+
+def indodax_client_config(**extra) -> Dict[str, Any]:
+    """Opsi konstruktor ccxt.indodax (sync/async); INDODAX_API_URL mengganti base URL REST."""
+    options: Dict[str, Any] = {'apiKey': INDODAX_API_KEY, 'secret': INDODAX_API_SECRET, **extra}
+    if INDODAX_API_URL:
+        base = INDODAX_API_URL.rstrip('/')
+        options['urls'] = {'api': {'public': base, 'private': base + '/tapi'}}
+    return options
+
+
+_METRICS_EXPORTERS: List[Any] = []
+
+
+def start_metrics_export() -> None:
+    """Jalankan endpoint /metrics (METRICS_PORT) dan/atau penulis METRICS_FILE, sekali per proses."""
+    if _METRICS_EXPORTERS:
+        return
+    try:
+        if METRICS_PORT:
+            server = MetricsServer(METRICS, METRICS_HOST, METRICS_PORT).start()
+            _METRICS_EXPORTERS.append(server)
+            print(f"[ok] Metrics aktif di {server.url}")
+        if METRICS_FILE:
+            _METRICS_EXPORTERS.append(MetricsFileWriter(METRICS_FILE, METRICS, METRICS_FILE_INTERVAL).start())
+    except OSError as e:
+        print(f"WARNING: metrics tidak aktif: {e}")
+
+
+EVENT_STORE: Optional[EventStore] = None
+
+
+def start_event_store() -> None:
+    """Jalankan penulis EVENT_DB di thread latar, sekali per proses."""
+    global EVENT_STORE
+    if EVENT_STORE is not None or not EVENT_DB:
+        return
+    try:
+        EVENT_STORE = EventStore(EVENT_DB).start()
+        atexit.register(EVENT_STORE.close)
+    except Exception as e:
+        print(f"WARNING: event store tidak aktif: {e}")
+
+
+TELEGRAM_OUTBOX: Optional[TelegramOutbox] = None
+
+
+def start_telegram_outbox() -> Optional[TelegramOutbox]:
+    """Jalankan pengirim Telegram di thread latar, sekali per proses (None bila Telegram tidak diset)."""
+    global TELEGRAM_OUTBOX
+    if TELEGRAM_OUTBOX is None and TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
+        TELEGRAM_OUTBOX = TelegramOutbox(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, timeout=TELEGRAM_TIMEOUT,
+                                         coalesce_window=TELEGRAM_COALESCE_SECONDS,
+                                         max_queue=TELEGRAM_QUEUE_SIZE).start()
+        # Saat keluar, beri waktu pesan terakhir (mis. error fatal) terkirim
+        atexit.register(TELEGRAM_OUTBOX.close)
+    return TELEGRAM_OUTBOX
+
+# --- RENCANA INDIKATOR PER LOKASI PEMAKAIAN (hanya yang benar-benar dibaca) ---
+H1_TREND_PLAN = IndicatorPlan('h1_trend', ema_lengths=(H1_EMA_PERIOD,))
+M15_SIGNAL_PLAN = IndicatorPlan(
+    'm15_signal', ema_lengths=(M15_EMA_FAST, M15_EMA_SLOW), atr_length=ATR_PERIOD,
+    volume_length=VOLUME_AVG_PERIOD, stoch=(STOCH_RSI_PERIOD, 14, 3, 3),
+)
+BTC_HEALTH_PLAN = IndicatorPlan('btc_health', ema_lengths=(50,))
+FULL_PLAN = IndicatorPlan.full(
+    ema_lengths=(H1_EMA_PERIOD, M15_EMA_FAST, M15_EMA_SLOW), atr_length=ATR_PERIOD,
+    volume_length=VOLUME_AVG_PERIOD, stoch=(STOCH_RSI_PERIOD, 14, 3, 3),
+)
+
+# ==============================================================================
+# --- LOGGING ---
+# ==============================================================================
+
+# File log (JSON lines) dan echo konsol pesan Telegram ditulis thread latar; pemanggil hanya put ke antrian
+logger = logging.getLogger('hybrid_bot_v7')
+console = logging.getLogger('hybrid_bot_v7.console')
+LOG_HANDLER: Optional[QueueLogHandler] = None
+CONSOLE_HANDLER: Optional[QueueLogHandler] = None
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+    LOG_HANDLER = QueueLogHandler(RotatingFileSink(LOG_FILE, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT),
+                                  max_queue=LOG_QUEUE_SIZE, name='log-file')
+    LOG_HANDLER.setFormatter(JsonLinesFormatter())
+    logger.addHandler(LOG_HANDLER)
+    console.setLevel(logging.INFO)
+    console.propagate = False
+    CONSOLE_HANDLER = QueueLogHandler(StreamSink(), max_queue=LOG_QUEUE_SIZE, name='log-console')
+    console.addHandler(CONSOLE_HANDLER)
+    atexit.register(LOG_HANDLER.close)
+    atexit.register(CONSOLE_HANDLER.close)
+
+
+def flush_logs(timeout: float = 5.0) -> None:
+    """Tunggu antrian log file & konsol tertulis (mis. sebelum stdout dikembalikan)."""
+    for handler in logger.handlers + console.handlers:
+        if isinstance(handler, QueueLogHandler):
+            handler.flush(timeout)
+        else:
+            handler.flush()
+
+
 def _log_event(event_type: str, pair: str = '', message: str = '', data: Optional[Dict[str, Any]] = None) -> None:
-    """Log event with structured data."""
-    log_message = f"{event_type} - {pair} - {message}"
-    if data:
-        log_message += f" - {json.dumps(data, ensure_ascii=False)}"
-    logger.info(log_message)
+    """Log event with structured data (diformat JSON di thread penulis, bukan di sini)."""
+    logger.info('%s - %s - %s', event_type, pair, message,
+                # Salinan dangkal: dict posisi bisa berubah sebelum thread penulis memformatnya
+                extra={'event': event_type, 'pair': pair, 'event_message': message, 'data': dict(data) if data else None})
+    if EVENT_STORE is not None and is_stored_event(event_type):
+        EVENT_STORE.record(event_type, pair, message, data)
 
 
 class ProfessionalBot:
-    def __init__(self):        # Validasi environment (lebih fleksibel):
+    def __init__(self, startup_reports=True):        # Validasi environment (lebih fleksibel):
         # - LIVE butuh INDODAX_API_KEY/SECRET
         # - Telegram opsional (jika tidak di-set, bot tetap jalan tanpa notifikasi)
         if not SIMULATION_MODE and not all([INDODAX_API_KEY, INDODAX_API_SECRET]):
             print("ERROR: LIVE mode butuh INDODAX_API_KEY dan INDODAX_API_SECRET (env).")
             exit()
 
-        self.telegram_enabled = bool(TELEGRAM_TOKEN and TELEGRAM_CHAT_ID)
+        self.telegram_enabled = start_telegram_outbox() is not None
 
         self.indodax = self._init_indodax()
-        self.all_markets = self._fetch_all_markets()
+        # Daftar market (jaringan / cache disk) dan state posisi (disk) dimuat bersamaan
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='startup') as startup:
+            state = startup.submit(self._load_state)
+            self.all_markets = self._fetch_all_markets()
+            self.active_positions = state.result()
+        self.recorder = MarketRecorder(MARKET_DATA_DIR) if RECORD_MARKET_DATA else None
+        self.ticker_cache = TickerCache(self.indodax, ttl=TICKER_CACHE_TTL, recorder=self.recorder)
+        self.balance_cache = BalanceCache(self.indodax, ttl=BALANCE_CACHE_TTL)
+        self.candle_store = CandleStore(self.indodax, max_candles=OHLCV_CACHE_MAX_CANDLES,
+                                        recorder=self.recorder) if ENABLE_OHLCV_CACHE else None
+        self.indicator_engine = IndicatorEngine(default_plan=FULL_PLAN) if USE_INCREMENTAL_INDICATORS else None
         self.idr_markets = [m for m in self.all_markets if '/IDR' in m and self.all_markets.get(m, {}).get('active', False)]
-        self.active_positions = self._load_state()
+        self.position_monitor = PositionMonitor(
+            POSITION_MIN_CHECK_INTERVAL, POSITION_MAX_CHECK_INTERVAL,
+            far_atr=POSITION_FAR_ATR, budget_per_minute=POSITION_CHECK_BUDGET,
+        ) if ADAPTIVE_POSITION_POLLING else None
+        self.parallel_analyzer = ParallelAnalyzer(
+            self, ANALYSIS_WORKERS, ANALYSIS_FETCH_CONCURRENCY,
+            vectorized=BATCH_SIGNALS) if PARALLEL_ANALYSIS or BATCH_SIGNALS else None
         # --- SIMULASI: saldo virtual (hanya dipakai saat SIMULATION_MODE) ---
         self.virtual_idr = VIRTUAL_INITIAL_IDR if SIMULATION_MODE else None
+        self._register_metrics()
+        start_metrics_export()
+        start_event_store()
 
         self.cycle_counter = 0
+        self.market_is_healthy = True
         print("[ok] Bot Profesional v7.0 (Server Ready) berhasil diinisialisasi.")
         self.send_telegram_message(
             f"🚀 **Bot Profesional v7.0 (Server Ready) Dimulai**\n\n"
@@ -122,9 +479,41 @@ class ProfessionalBot:
             f"Filter BTC Aktif: `{'Ya' if ENABLE_BTC_FILTER else 'Tidak'}`\n"
             f"Modal per Trade: `Rp {MODAL_PER_COIN_IDR:,.0f}`"
         )
+        # Runtime async mengirim laporan awal sendiri (data diambil paralel)
+        self._startup_reports_pending = False
+        if startup_reports:
+            if FAST_STARTUP:
+                # Laporan (fetch_balance + ticker per aset) dikirim run() setelah cek posisi pertama,
+                # di thread yang sama: client ccxt sync, BalanceCache dan TickerCache tidak thread-safe
+                self._startup_reports_pending = True
+            else:
+                self.send_startup_reports()
+
+    def send_startup_reports(self):
         self.send_manual_portfolio_update()
         self.send_account_status_line()
 
+    def _send_pending_startup_reports(self):
+        if getattr(self, '_startup_reports_pending', False):
+            self._startup_reports_pending = False
+            self.send_startup_reports()
+
+    def _register_metrics(self):
+        # Nilai berikut dibaca saat scrape, jadi tidak menambah biaya di jalur panas
+        METRICS.set('cuanbot_start_time_seconds', time.time())
+        METRICS.collect('cuanbot_open_positions', lambda: len(self.active_positions))
+        METRICS.collect('cuanbot_virtual_idr', lambda: self.virtual_idr)
+        register_cache_metrics(ticker=self.ticker_cache, balance=self.balance_cache, ohlcv=self.candle_store)
+        register_rate_limit_metrics(RATE_LIMITER)
+        if TELEGRAM_OUTBOX is not None:
+            METRICS.collect('cuanbot_telegram_messages_total', lambda: {
+                (('result', result),): value for result, value in TELEGRAM_OUTBOX.stats.items()})
+            METRICS.collect('cuanbot_telegram_queue_length', TELEGRAM_OUTBOX.backlog)
+        METRICS.collect('cuanbot_log_records_total', lambda: {
+            (('sink', handler.get_name()), ('result', result)): handler.stats[result]
+            for handler in (LOG_HANDLER, CONSOLE_HANDLER) if handler is not None
+            for result in ('written', 'dropped', 'errors')})
+
     def _safe_amount(self, pair, amount):
         # Clamp amount to market precision and limits when possible
         try:
@@ -160,9 +549,99 @@ class ProfessionalBot:
             return True, ''
 
     def run(self):
+        if not USE_CANDLE_SCHEDULER:
+            return self.run_fixed_interval()
+
+        scheduler = self.build_scheduler()
+        print(f"[ok] Scheduler aktif (offset jam exchange {scheduler.offset:+.2f} detik).")
         while True:
+            for job in scheduler.due_jobs():
+                scheduler.run_job(job, on_error=self.handle_error)
+            time.sleep(min(scheduler.seconds_until_next(), 60))
+
+    def build_scheduler(self):
+        # Scan (dan cek BTC) tepat setelah bar 15m close menurut jam exchange;
+        # laporan status berjalan pada interval tetap. Cek posisi adaptif (PositionMonitor)
+        # dievaluasi tiap detik tetapi hanya mengambil harga posisi yang jatuh tempo.
+        scheduler = CandleScheduler(self.indodax)
+        scheduler.sync_clock()
+        m15_seconds = timeframe_seconds(M15_TIMEFRAME)
+        scheduler.add_job('clock_sync', scheduler.sync_clock, CLOCK_SYNC_INTERVAL)
+        # Job posisi didaftarkan lebih dulu: run_now-nya dijalankan sebelum cek BTC, jadi posisi
+        # yang dipulihkan setelah restart langsung dilindungi
+        if self.position_monitor is not None:
+            scheduler.add_job('positions', self.monitor_positions_job, 1, run_now=True)
+        else:
+            scheduler.add_job('positions', self.positions_job, POSITION_CHECK_INTERVAL, run_now=True)
+        if ENABLE_BTC_FILTER:
+            scheduler.add_job('btc_health', self.update_market_health, m15_seconds,
+                              align=True, delay=SCHEDULER_CANDLE_DELAY, run_now=True)
+        scheduler.add_job('scan', self.scan_job, m15_seconds, align=True, delay=SCHEDULER_CANDLE_DELAY)
+        scheduler.add_job('status', self.send_status_update, STATUS_UPDATE_INTERVAL * POSITION_CHECK_INTERVAL)
+        if getattr(self, '_startup_reports_pending', False):
+            # Prioritas rendah: didaftarkan terakhir, jadi berjalan sekali setelah cek posisi (dan BTC) pertama
+            scheduler.add_job('startup_reports', self._send_pending_startup_reports, 0, run_now=True, once=True)
+        return scheduler
+
+    def update_market_health(self):
+        self.market_is_healthy = self.is_market_healthy()
+        if not self.market_is_healthy:
+            print(f"\n[{time.strftime('%H:%M:%S')}] Pasar BTC tidak sehat. Mode Aman Aktif.")
+        return self.market_is_healthy
+
+    def scan_job(self):
+        if ENABLE_BTC_FILTER and not self.market_is_healthy:
+            return
+        if len(self.active_positions) < MAX_OPEN_POSITIONS:
+            print(f"\n[{time.strftime('%H:%M:%S')}] Menjalankan pemindaian peluang...")
+            candidates = self.momentum_engine()
+            self.process_candidates(candidates, "Momentum")
+
+    def positions_job(self):
+        self.cycle_counter += 1
+        self.ticker_cache.new_cycle()
+        self.manage_active_positions()
+        print(f"[{time.strftime('%H:%M:%S')}] Siklus {self.cycle_counter} selesai.", end="\r")
+
+    def monitor_positions_job(self):
+        # Harga diambil langsung (bukan dari cache siklus) karena posisi yang jatuh tempo
+        # bisa jadi sedang dekat SL/TP1
+        self._checking_positions = True
+        try:
+            for position in self.position_monitor.due(self.active_positions[:]):
+                pair = position['pair']
+                try:
+                    ticker = self.indodax.fetch_ticker(pair)
+                    self.ticker_cache.put(pair, ticker)
+                    self._manage_position(position, ticker['last'])
+                except Exception as e:
+                    self.position_monitor.retry_soon(pair)
+                    _log_event('MANAGE_ERROR', pair, str(e))
+                    continue
+                self._reschedule_position(position, ticker['last'])
+            self.journal.sync()
+        finally:
+            self._checking_positions = False
+
+    def _reschedule_position(self, position, current_price):
+        monitor = getattr(self, 'position_monitor', None)
+        if monitor is None:
+            return
+        if position in self.active_positions:
+            monitor.schedule(position, current_price)
+        else:
+            monitor.forget(position['pair'])
+
+    def run_fixed_interval(self):
+        if FAST_STARTUP and self.active_positions:
+            # Lindungi posisi hasil restart sebelum cek BTC + scan siklus pertama
+            self.manage_active_positions()
+        self._send_pending_startup_reports()
+        while True:
+            started = time.perf_counter()
             try:
                 self.cycle_counter += 1
+                self.ticker_cache.new_cycle()
                 
                 market_is_healthy = not ENABLE_BTC_FILTER or (ENABLE_BTC_FILTER and self.is_market_healthy())
 
@@ -180,6 +659,7 @@ class ProfessionalBot:
                 if self.cycle_counter % STATUS_UPDATE_INTERVAL == 0:
                     self.send_status_update()
 
+                observe_job('cycle', time.perf_counter() - started, budget=60)
                 print(f"[{time.strftime('%H:%M:%S')}] Siklus {self.cycle_counter} selesai. Menunggu 60 detik...", end="\r")
                 time.sleep(60)
 
@@ -187,44 +667,158 @@ class ProfessionalBot:
                 self.handle_error(f"Error di loop utama: {e}")
                 time.sleep(60)
 
+    @METRICS.timed('cuanbot_engine_seconds', engine='momentum')
     def momentum_engine(self):
         print(f"  - Mesin Momentum: Memindai {len(self.idr_markets)} koin...")
+        if BULK_TICKER_SCAN:
+            try:
+                tickers = self._fetch_idr_tickers_bulk()
+                if getattr(self, 'ticker_cache', None) is not None:
+                    self.ticker_cache.update(tickers)
+                trending_coins = [pair for pair in self.idr_markets if self._is_trending(tickers.get(pair))]
+                print(f"  - Mesin Momentum: {len(tickers)} ticker (bulk), {len(trending_coins)} kandidat.")
+                return trending_coins
+            except Exception as e:
+                _log_event('BULK_SCAN_ERROR', '', f'fallback ke scan per-pair: {e}')
+
         trending_coins = []
         for pair in self.idr_markets:
+            self._yield_to_positions()
             try:
                 ticker = self.indodax.fetch_ticker(pair)
-                if ticker and ticker.get('percentage') is not None and ticker['percentage'] > 3:
+                if self._is_trending(ticker):
                     trending_coins.append(pair)
             except Exception:
                 pass
-            time.sleep(0.5)
         return trending_coins
 
+    def _fetch_idr_tickers_bulk(self):
+        # Satu request ticker_all untuk semua pair. Indodax tidak mengisi 'percentage',
+        # jadi perubahan 24 jam dilengkapi dari api/summaries (prices_24h) bila perlu.
+        tickers = self.indodax.fetch_tickers()
+        tickers = {sym: t for sym, t in (tickers or {}).items() if sym.endswith('/IDR')}
+        if not tickers:
+            raise ValueError('fetch_tickers mengembalikan data kosong')
+
+        if any(t.get('percentage') is None for t in tickers.values()):
+            self._fill_24h_change(tickers, self.indodax.publicGetApiSummaries())
+        return tickers
+
+    def _fill_24h_change(self, tickers, summaries):
+        prices_24h = (summaries or {}).get('prices_24h', {}) or {}
+        for sym, ticker in tickers.items():
+            if ticker.get('percentage') is not None:
+                continue
+            market = self.all_markets.get(sym) or {}
+            market_id = str(market.get('id', '')).replace('_', '')
+            try:
+                open_price = float(prices_24h.get(market_id) or 0)
+                last = float(ticker.get('last') or 0)
+            except (TypeError, ValueError):
+                continue
+            if open_price > 0 and last > 0:
+                ticker['open'] = open_price
+                ticker['percentage'] = (last - open_price) / open_price * 100
+
+    def _is_trending(self, ticker):
+        # Filter momentum: perubahan 24 jam + (opsional) volume IDR minimum dan spread maksimum
+        if not ticker or ticker.get('percentage') is None:
+            return False
+        if ticker['percentage'] <= MOMENTUM_MIN_PERCENTAGE:
+            return False
+        if MOMENTUM_MIN_VOLUME_IDR > 0:
+            quote_volume = ticker.get('quoteVolume')
+            if quote_volume is None and ticker.get('baseVolume') is not None and ticker.get('last'):
+                quote_volume = float(ticker['baseVolume']) * float(ticker['last'])
+            if not quote_volume or float(quote_volume) < MOMENTUM_MIN_VOLUME_IDR:
+                return False
+        if MOMENTUM_MAX_SPREAD_PERCENT > 0:
+            bid, ask = ticker.get('bid'), ticker.get('ask')
+            if not bid or not ask or float(ask) <= 0:
+                return False
+            spread_percent = (float(ask) - float(bid)) / float(ask) * 100
+            if spread_percent > MOMENTUM_MAX_SPREAD_PERCENT:
+                return False
+        return True
+
+    @METRICS.timed('cuanbot_engine_seconds', engine='process_candidates')
     def process_candidates(self, candidates, engine_type):
+        analyzer = getattr(self, 'parallel_analyzer', None)
+        if analyzer is not None and len(candidates) > 1:
+            return self._process_candidates_parallel(analyzer, candidates, engine_type)
         for pair in candidates:
-            if len(self.active_positions) >= MAX_OPEN_POSITIONS or any(p['pair'] == pair for p in self.active_positions):
+            self._yield_to_positions()
+            if self._can_open_position(pair):
+                self.analyze_and_trade(pair, engine_type)
+
+    def _process_candidates_parallel(self, analyzer, candidates, engine_type):
+        # Analisa per potongan di worker; eksekusi tetap berurutan di thread utama dengan
+        # batas posisi/sektor dicek ulang karena posisi bisa bertambah di tengah batch.
+        # Di antara potongan, posisi yang jatuh tempo dicek dulu.
+        pairs = [pair for pair in candidates if self._can_open_position(pair)]
+        chunk = max(1, POSITION_YIELD_PAIRS)
+        for start in range(0, len(pairs), chunk):
+            self._yield_to_positions()
+            batch = [pair for pair in pairs[start:start + chunk] if self._can_open_position(pair)]
+            try:
+                results = analyzer.analyze(batch)
+            except Exception as e:
+                # Mis. worker mati (BrokenProcessPool): pool dibuat ulang di batch berikutnya
+                analyzer.close()
+                _log_event('PARALLEL_ANALYSIS_ERROR', '', f'fallback ke analisa berurutan: {e}')
+                for pair in batch:
+                    self._yield_to_positions()
+                    if self._can_open_position(pair):
+                        self.analyze_and_trade(pair, engine_type)
                 continue
+            for pair, signal in results:
+                if signal and self._can_open_position(pair):
+                    self.execute_trade(pair, engine_type, *signal)
+
+    def _yield_to_positions(self):
+        # Scan sinkron bisa berjalan puluhan detik (token bucket); posisi yang jatuh tempo
+        # menurut PositionMonitor dicek di sela-sela pair agar tidak menunggu scan selesai
+        monitor = getattr(self, 'position_monitor', None)
+        if monitor is None or getattr(self, '_checking_positions', False):
+            return
+        if monitor.due(self.active_positions):
+            self.monitor_positions_job()
 
-            sector = SECTOR_MAPPING.get(pair, 'DEFAULT')
-            max_for_sector = MAX_POSITIONS_PER_SECTOR.get(sector, MAX_OPEN_POSITIONS)
-            current_sector_positions = sum(1 for p in self.active_positions if SECTOR_MAPPING.get(p['pair'], 'DEFAULT') == sector)
+    def _can_open_position(self, pair):
+        if len(self.active_positions) >= MAX_OPEN_POSITIONS or any(p['pair'] == pair for p in self.active_positions):
+            return False
 
-            if current_sector_positions >= max_for_sector:
-                print(f"  - [{pair}] Sinyal diabaikan. Batas posisi untuk sektor '{sector}' ({max_for_sector}) sudah tercapai.")
-                continue
+        sector = SECTOR_MAPPING.get(pair, 'DEFAULT')
+        max_for_sector = MAX_POSITIONS_PER_SECTOR.get(sector, MAX_OPEN_POSITIONS)
+        current_sector_positions = sum(1 for p in self.active_positions if SECTOR_MAPPING.get(p['pair'], 'DEFAULT') == sector)
 
-            self.analyze_and_trade(pair, engine_type)
+        if current_sector_positions >= max_for_sector:
+            print(f"  - [{pair}] Sinyal diabaikan. Batas posisi untuk sektor '{sector}' ({max_for_sector}) sudah tercapai.")
+            return False
+        return True
 
+    @METRICS.timed('cuanbot_engine_seconds', engine='analyze')
     def analyze_and_trade(self, pair, trade_type):
-        h1_data = self.get_data_with_indicators(pair, H1_TIMEFRAME)
-        if h1_data is None or h1_data.iloc[-1]['close'] < h1_data.iloc[-1][f'EMA_{H1_EMA_PERIOD}']:
+        h1_data = self.get_latest_indicators(pair, H1_TIMEFRAME, H1_TREND_PLAN)
+        if not self._h1_trend_ok(h1_data):
             return
 
-        m15_data = self.get_data_with_indicators(pair, M15_TIMEFRAME)
-        if m15_data is None or len(m15_data) < 10: return
+        m15_data = self.get_latest_indicators(pair, M15_TIMEFRAME, M15_SIGNAL_PLAN)
+        signal = self._evaluate_m15_signal(m15_data)
+        if signal:
+            self.execute_trade(pair, trade_type, *signal)
+
+    @staticmethod
+    def _h1_trend_ok(h1_data):
+        return bool(h1_data) and not (h1_data[-1]['close'] < h1_data[-1][f'EMA_{H1_EMA_PERIOD}'])
+
+    @classmethod
+    def _evaluate_m15_signal(cls, m15_data):
+        # Kembalikan (entry_price, atr_value) bila semua filter M15 terpenuhi, selain itu None
+        if not m15_data or len(m15_data) < 3 or m15_data[-1]['bars'] < 10: return None
         
-        last_m15 = m15_data.iloc[-2]
-        prev_m15 = m15_data.iloc[-3]
+        last_m15 = m15_data[-2]
+        prev_m15 = m15_data[-3]
 
         signal_crossover = prev_m15[f'EMA_{M15_EMA_FAST}'] < prev_m15[f'EMA_{M15_EMA_SLOW}'] and \
                            last_m15[f'EMA_{M15_EMA_FAST}'] > last_m15[f'EMA_{M15_EMA_SLOW}']
@@ -239,7 +833,14 @@ class ProfessionalBot:
                            (last_m15[stoch_rsi_k_col] > last_m15[stoch_rsi_d_col])
 
         if signal_crossover and signal_volume and signal_stoch_rsi:
-            self.execute_trade(pair, trade_type, m15_data.iloc[-1]['close'], last_m15[f'ATR_{ATR_PERIOD}'])
+            return m15_data[-1]['close'], cls._atr_value(last_m15)
+        return None
+
+    @staticmethod
+    def _atr_value(row):
+        # pandas_ta menamai kolom ATR (mamode rma) 'ATRr_<n>'; 'ATR_<n>' dipertahankan untuk kompatibilitas
+        value = row.get(f'ATRr_{ATR_PERIOD}')
+        return value if value is not None else row.get(f'ATR_{ATR_PERIOD}')
 
     def execute_trade(self, pair, trade_type, entry_price, atr_value):
         stop_loss_price = entry_price - (ATR_MULTIPLIER_FOR_SL * atr_value)
@@ -284,36 +885,44 @@ class ProfessionalBot:
             except Exception as e:
                 self.handle_error(f"Gagal membuat order Beli untuk {pair}: {e}")
                 return
+            finally:
+                self._invalidate_balance()
 
         new_position = {
             "pair": pair, "entry_price": entry_price, "amount": amount_to_buy,
             "sl_price": stop_loss_price, "tp1_price": take_profit_1_price,
-            "highest_price": entry_price, "tp1_hit": False, "type": trade_type
+            "highest_price": entry_price, "tp1_hit": False, "type": trade_type,
+            "atr": float(atr_value)
         }
         self.active_positions.append(new_position)
         _log_event('OPEN', pair, 'position_opened', new_position)
-        self._save_state()
+        self.journal.open(new_position)
         _log_event('NOTIFY', pair, 'posisi dibuka')
         self.send_telegram_message(f"[ok] **Posisi Dibuka**\nPair: `{pair}` (Mode: `{'Simulasi' if SIMULATION_MODE else '🔴 LIVE'}`)")
 
+    @METRICS.timed('cuanbot_engine_seconds', engine='positions')
     def manage_active_positions(self):
         for position in self.active_positions[:]:
             try:
-                current_price = self.indodax.fetch_ticker(position['pair'])['last']
-                if not position['tp1_hit'] and current_price >= position['tp1_price']:
-                    self.scale_out_position(position, current_price)
-                    continue
-                if current_price > position['highest_price']:
-                    position['highest_price'] = current_price
-                    new_sl = current_price * (1 - TRAILING_STOP_PERCENT)
-                    if new_sl > position['sl_price']:
-                        position['sl_price'] = new_sl
-                        self._save_state()
-                if current_price <= position['sl_price']:
-                    reason = "Stop Loss" if not position['tp1_hit'] else "Trailing Stop"
-                    self.close_position(position, reason, current_price, position['amount'])
+                current_price = self._ticker(position['pair'])['last']
+                self._manage_position(position, current_price)
             except Exception as e:
                 _log_event('MANAGE_ERROR', position.get('pair',''), str(e))
+        self.journal.sync()
+
+    def _manage_position(self, position, current_price):
+        if not position['tp1_hit'] and current_price >= position['tp1_price']:
+            self.scale_out_position(position, current_price)
+            return
+        if current_price > position['highest_price']:
+            position['highest_price'] = current_price
+            new_sl = current_price * (1 - TRAILING_STOP_PERCENT)
+            if new_sl > position['sl_price']:
+                position['sl_price'] = new_sl
+                self.journal.update(position, 'sl_price', 'highest_price')
+        if current_price <= position['sl_price']:
+            reason = "Stop Loss" if not position['tp1_hit'] else "Trailing Stop"
+            self.close_position(position, reason, current_price, position['amount'])
 
     def scale_out_position(self, position, current_price):
         amount_to_sell = self._safe_amount(position['pair'], position['amount'] / 2)
@@ -329,11 +938,14 @@ class ProfessionalBot:
             except Exception as e:
                 self.handle_error(f"Gagal menutup 50% posisi {position['pair']}: {e}")
                 return
+            finally:
+                self._invalidate_balance()
         position['amount'] /= 2
         position['sl_price'] = position['entry_price']
         position['tp1_hit'] = True
-        self._save_state()
-        _log_event('TP1', position['pair'], 'tp1_hit', {'exit_price': current_price, 'amount_sold': amount_to_sell})
+        self.journal.update(position, 'amount', 'sl_price', 'tp1_hit', durable=True)
+        _log_event('TP1', position['pair'], 'tp1_hit', {'exit_price': current_price, 'amount_sold': amount_to_sell,
+                                                       'entry_price': position['entry_price']})
         self.send_telegram_message(f"💰 **TP 1 Tercapai**\n\n"
                                    f"Pair: `{position['pair']}`\n"
                                    f"Menjual 50% posisi. SL dipindahkan ke breakeven.")
@@ -346,6 +958,8 @@ class ProfessionalBot:
             except Exception as e:
                 self.handle_error(f"Gagal menutup posisi {position['pair']}: {e}")
                 return
+            finally:
+                self._invalidate_balance()
         # --- SIMULASI: kredit saldo virtual saat close posisi ---
         if SIMULATION_MODE:
             proceeds = float(exit_price) * float(amount)
@@ -359,42 +973,114 @@ class ProfessionalBot:
                    f"Harga Keluar: `Rp {exit_price:,.2f}`\n"
                    f"Profit/Loss: `{pnl:.2f}%`")
         self.send_telegram_message(message)
-        _log_event('CLOSE', position['pair'], reason, {'exit_price': exit_price, 'amount': amount, 'pnl_percent': pnl})
+        _log_event('CLOSE', position['pair'], reason, {'exit_price': exit_price, 'amount': amount, 'pnl_percent': pnl,
+                                                       'entry_price': position['entry_price']})
         self.active_positions.remove(position)
-        self._save_state()
+        self.journal.close(position)
 
+    @METRICS.timed('cuanbot_engine_seconds', engine='btc_health')
     def is_market_healthy(self):
         try:
-            btc_data = self.get_data_with_indicators('BTC/IDR', '4h')
-            if btc_data is None: return False
-            return btc_data.iloc[-1]['close'] > btc_data.iloc[-1]['EMA_50']
+            return self._btc_healthy(self.get_latest_indicators('BTC/IDR', '4h', BTC_HEALTH_PLAN))
         except Exception:
             return False
 
-    def get_data_with_indicators(self, pair, timeframe):
+    @staticmethod
+    def _btc_healthy(btc_data):
+        if not btc_data: return False
+        return bool(btc_data[-1]['close'] > btc_data[-1]['EMA_50'])
+
+    def get_latest_indicators(self, pair, timeframe, plan=None):
+        # Baris indikator terakhir (bar closed terakhir + bar berjalan) sebagai list dict.
+        # Memakai IndicatorEngine bila aktif; selain itu hitung ulang DataFrame via pandas_ta.
+        # `plan` membatasi indikator yang dihitung (default: semua).
+        try:
+            candles = self._fetch_ohlcv(pair, timeframe, 100)
+        except Exception:
+            return None
+        return self._indicator_rows(pair, timeframe, candles, plan)
+
+    def _indicator_rows(self, pair, timeframe, candles, plan=None):
+        return self._rows_for(getattr(self, 'indicator_engine', None), pair, timeframe, candles, plan)
+
+    @classmethod
+    def _rows_for(cls, engine, pair, timeframe, candles, plan=None):
+        # Tanpa akses ke instance bot, jadi juga dipanggil dari proses worker (parallel_analysis.py)
+        if not candles:
+            return None
+        try:
+            if engine is not None:
+                return engine.update(pair, timeframe, candles, plan)
+            df = cls._indicator_frame(candles, plan)
+        except Exception:
+            return None
+        rows = df.tail(4).to_dict('records')
+        for row in rows:
+            row['bars'] = len(df)
+        return rows
+
+    def get_data_with_indicators(self, pair, timeframe, plan=None):
         try:
             limit = 100
-            ohlcv = self.indodax.fetch_ohlcv(pair, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df.ta.ema(length=H1_EMA_PERIOD, append=True)
-            df.ta.ema(length=M15_EMA_FAST, append=True)
-            df.ta.ema(length=M15_EMA_SLOW, append=True)
-            df.ta.atr(length=ATR_PERIOD, append=True)
-            df.ta.sma(length=VOLUME_AVG_PERIOD, close='volume', prefix='VOLUME', append=True)
-            df.ta.stochrsi(length=STOCH_RSI_PERIOD, append=True)
-            return df
+            ohlcv = self._fetch_ohlcv(pair, timeframe, limit)
+            return self._indicator_frame(ohlcv, plan)
         except Exception:
             return None
 
+    @staticmethod
+    def _indicator_frame(ohlcv, plan=None):
+        plan = plan or FULL_PLAN
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        for length in plan.ema_lengths:
+            df.ta.ema(length=length, append=True)
+        if plan.atr_length:
+            df.ta.atr(length=plan.atr_length, append=True)
+        if plan.volume_length:
+            df.ta.sma(length=plan.volume_length, close='volume', prefix='VOLUME', append=True)
+        if plan.stoch:
+            length, rsi_length, k, d = plan.stoch
+            df.ta.stochrsi(length=length, rsi_length=rsi_length, k=k, d=d, append=True)
+        return df
+
+    def _fetch_ohlcv(self, pair, timeframe, limit):
+        # RESAMPLE_TIMEFRAMES: H1/4h digabung dari bar M15 sehingga satu request M15 melayani semua timeframe
+        resample = self._resample_seconds(timeframe)
+        if resample:
+            candles = self._fetch_ohlcv(pair, M15_TIMEFRAME, resample_limit(limit, *resample))
+            return resample_ohlcv(candles, *resample, limit=limit)
+        # Pakai CandleStore bila aktif (hanya candle baru yang diambil), selain itu fetch penuh
+        store = getattr(self, 'candle_store', None)
+        if store is not None:
+            return store.get(pair, timeframe, limit=limit, max_age=CANDLE_REUSE_SECONDS if RESAMPLE_TIMEFRAMES else 0.0)
+        candles = self.indodax.fetch_ohlcv(pair, timeframe, limit=limit)
+        recorder = getattr(self, 'recorder', None)
+        if recorder is not None and candles:
+            recorder.record_candles(pair, timeframe, candles[:-1])
+        return candles
+
+    @staticmethod
+    def _resample_seconds(timeframe):
+        # (detik M15, detik timeframe) bila timeframe dibangun dari bar M15, selain itu None
+        if not RESAMPLE_TIMEFRAMES:
+            return None
+        base, target = timeframe_seconds(M15_TIMEFRAME), timeframe_seconds(timeframe)
+        return (base, target) if target > base and target % base == 0 else None
+
     def _init_indodax(self):
         try:
-            return ccxt.indodax({'apiKey': INDODAX_API_KEY, 'secret': INDODAX_API_SECRET})
+            exchange = ccxt.indodax(indodax_client_config())
+            return instrument_exchange(install_rate_limiter(exchange, RATE_LIMITER, ENDPOINT_WEIGHTS))
         except Exception as e:
             self.handle_error(f"Gagal koneksi ke Indodax: {e}")
             exit()
 
     def _fetch_all_markets(self):
         try:
+            if MARKETS_CACHE_FILE:
+                self.markets_cache = MarketsCache(self.indodax, MARKETS_CACHE_FILE, MARKETS_CACHE_TTL)
+                markets = self.markets_cache.load()
+                print(f"[ok] Berhasil memuat {len(markets)} total market ({self.markets_cache.source}).")
+                return markets
             markets = self.indodax.load_markets()
             print(f"[ok] Berhasil memuat {len(markets)} total market dari Indodax.")
             return markets
@@ -403,38 +1089,63 @@ class ProfessionalBot:
             return {}
     
     def _load_state(self):
-        if os.path.exists(STATE_FILE):
-            try:
-                with open(STATE_FILE, 'r') as f:
-                    content = f.read()
-                    if not content: return []
-                    return json.loads(content)
-            except json.JSONDecodeError:
-                return []
-        else:
-            self._save_state([])
-            return []
+        # Snapshot STATE_FILE + jurnal delta (position_journal.py); ekor jurnal yang terpotong dipangkas
+        self.journal = PositionJournal(STATE_FILE, STATE_FSYNC_INTERVAL, STATE_SNAPSHOT_EVERY)
+        positions = self.journal.load()
+        if self.journal.recovery_error:
+            self.handle_error(f"STATE_FILE rusak ({self.journal.recovery_error}), posisi dipulihkan dari jurnal saja")
+        if self.journal.stats['torn_bytes']:
+            _log_event('STATE_RECOVERY', '', 'ekor jurnal terpotong dipangkas', dict(self.journal.stats))
+        return positions
 
+    @METRICS.timed('cuanbot_engine_seconds', engine='save_state')
     def _save_state(self, positions=None):
-        with open(STATE_FILE, 'w') as f:
-            data_to_save = positions if positions is not None else self.active_positions
-            json.dump(data_to_save, f, indent=4)
+        # Snapshot penuh + kompaksi jurnal; perubahan posisi biasa cukup lewat self.journal
+        self.journal.snapshot(positions if positions is not None else self.active_positions)
     
-    def _virtual_equity_idr(self):
+    def _ticker(self, pair, tickers=None):
+        # Ticker dari snapshot yang sudah diambil (mis. oleh runtime async), lalu cache siklus,
+        # terakhir fetch langsung
+        if tickers is not None and pair in tickers:
+            ticker = tickers[pair]
+            if isinstance(ticker, Exception):
+                raise ticker
+            return ticker
+        cache = getattr(self, 'ticker_cache', None)
+        if cache is not None:
+            return cache.get(pair)
+        return self.indodax.fetch_ticker(pair)
+
+    def _balance(self, balance=None):
+        # Saldo yang sudah diambil (runtime async) -> BalanceCache -> fetch langsung
+        if balance is not None:
+            return balance
+        cache = getattr(self, 'balance_cache', None)
+        if cache is not None:
+            return cache.get()
+        return self.indodax.fetch_balance()
+
+    def _invalidate_balance(self):
+        cache = getattr(self, 'balance_cache', None)
+        if cache is not None:
+            cache.invalidate()
+
+    def _virtual_equity_idr(self, tickers=None):
         # Equity simulasi = saldo IDR virtual + nilai market semua posisi bot (mark-to-market)
             if not SIMULATION_MODE:
                 return None
             equity = float(getattr(self, 'virtual_idr', 0.0) or 0.0)
             for pos in self.active_positions:
                 try:
-                    last = float(self.indodax.fetch_ticker(pos['pair'])['last'])
+                    last = float(self._ticker(pos['pair'], tickers)['last'])
                     equity += float(pos['amount']) * last
                 except Exception:
                     pass
             return equity
 
     
-    def send_status_update(self):
+    @METRICS.timed('cuanbot_engine_seconds', engine='status')
+    def send_status_update(self, tickers=None, balance=None):
         if not self.active_positions:
             message = "[ok] **Laporan Status Bot**\n\nTidak ada posisi aktif yang dikelola bot."
             self.send_telegram_message(message)
@@ -442,13 +1153,13 @@ class ProfessionalBot:
         summary_message = "📊 **Laporan Status Posisi Bot**\n\n"
         # Baris status akun untuk laporan berkala
         if SIMULATION_MODE:
-            veq = self._virtual_equity_idr()
+            veq = self._virtual_equity_idr(tickers)
             summary_message += f"🏦 Status Akun (SIM): Virtual IDR `Rp {self.virtual_idr:,.0f}`\n"
             if veq is not None:
                 summary_message += f"🏦 Virtual Equity: `Rp {veq:,.0f}`\n\n"
         else:
             try:
-                bal = self.indodax.fetch_balance()
+                bal = self._balance(balance)
                 idr_free = float((bal.get('free', {}) or {}).get('IDR', 0) or 0)
                 idr_total = float((bal.get('total', {}) or {}).get('IDR', 0) or 0)
                 summary_message += f"🏦 Status Akun (LIVE): IDR free `Rp {idr_free:,.0f}` | IDR total `Rp {idr_total:,.0f}`\n\n"
@@ -456,7 +1167,7 @@ class ProfessionalBot:
                 summary_message += f"🏦 Status Akun (LIVE): gagal fetch_balance ({e})\n\n"
 
         if SIMULATION_MODE:
-            veq = self._virtual_equity_idr()
+            veq = self._virtual_equity_idr(tickers)
             summary_message += f"💼 Virtual IDR: `Rp {self.virtual_idr:,.0f}`\n"
             if veq is not None:
                 summary_message += f"📈 Virtual Equity: `Rp {veq:,.0f}`\n\n"
@@ -464,7 +1175,7 @@ class ProfessionalBot:
         total_pnl_idr = 0
         for pos in self.active_positions:
             try:
-                current_price = self.indodax.fetch_ticker(pos['pair'])['last']
+                current_price = self._ticker(pos['pair'], tickers)['last']
                 pnl_percent = ((current_price - pos['entry_price']) / pos['entry_price']) * 100
                 pnl_idr = (current_price - pos['entry_price']) * pos['amount']
                 if pos['tp1_hit']:
@@ -480,10 +1191,10 @@ class ProfessionalBot:
         summary_message += f"*Total Floating PNL (Bot): Rp {total_pnl_idr:,.0f}*"
         self.send_telegram_message(summary_message)
     
-    def send_manual_portfolio_update(self):
+    def send_manual_portfolio_update(self, balances=None, tickers=None):
         try:
             message = "📋 **Laporan Snapshot Portfolio Manual**\n_(Posisi yang tidak dikelola bot)_\n\n"
-            balances = self.indodax.fetch_balance()
+            balances = self._balance(balances)
             bot_assets = [p['pair'].split('/')[0] for p in self.active_positions]
             manual_assets = []
             total_manual_value_idr = 0
@@ -509,7 +1220,7 @@ class ProfessionalBot:
                                 pass
                         else:
                             try:
-                                ticker = self.indodax.fetch_ticker(pair)
+                                ticker = self._ticker(pair, tickers)
                                 current_price = ticker['last']
                                 value_idr = balance * current_price
                                 total_manual_value_idr += value_idr
@@ -558,7 +1269,7 @@ class ProfessionalBot:
                     self.send_telegram_message(msg)
                     _log_event('ACCOUNT_STATUS', '', 'sim_account_status', {'virtual_idr': self.virtual_idr, 'virtual_equity': veq})
                 else:
-                    bal = self.indodax.fetch_balance()
+                    bal = self._balance()
                     idr_free = float((bal.get('free', {}) or {}).get('IDR', 0) or 0)
                     idr_total = float((bal.get('total', {}) or {}).get('IDR', 0) or 0)
                     msg = f"🏦 Status Akun (LIVE): IDR free={idr_free:,.0f} | IDR total={idr_total:,.0f}"
@@ -569,24 +1280,28 @@ class ProfessionalBot:
 
     
     def send_telegram_message(self, message):
-            # Selalu tampilkan ke terminal juga (biar kelihatan saat bot dijalankan)
-            try:
-                print(message)
-            except Exception:
-                pass
+            # Selalu tampilkan ke terminal juga (biar kelihatan saat bot dijalankan), lewat antrian konsol
+            console.info(message)
 
             # Jika telegram tidak diset, cukup berhenti di sini
-            if not getattr(self, 'telegram_enabled', False):
+            if not getattr(self, 'telegram_enabled', False) or TELEGRAM_OUTBOX is None:
                 return
 
-            url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-            payload = {'chat_id': TELEGRAM_CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
-            try:
-                requests.post(url, json=payload)
-            except Exception as e:
-                print(f" - Gagal mengirim notifikasi Telegram: {e}")
+            # Non-blocking: dikirim thread outbox (gabung burst, retry, backoff 429)
+            TELEGRAM_OUTBOX.send(message)
+
+    def handle_error(self, error_message):
+        print(f"\n[error] ERROR: {error_message}")
+        _log_event('ERROR', '', error_message)
+        self.send_telegram_message(f"❌ **ERROR KRITIS PADA BOT**\n`{error_message}`")
 
 
 if __name__ == "__main__":
-    bot = ProfessionalBot()
-    bot.run()
+    if ASYNC_RUNTIME:
+        import asyncio
+        from async_runtime import AsyncBotRuntime
+        bot = ProfessionalBot(startup_reports=False)
+        asyncio.run(AsyncBotRuntime(bot, max_concurrency=ASYNC_MAX_CONCURRENCY).run())
+    else:
+        bot = ProfessionalBot()
+        bot.run()
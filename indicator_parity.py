@@ -0,0 +1,205 @@
+"""indicator_parity.py
+Cek paritas IndicatorEngine terhadap pandas_ta, dan batch_signals.py terhadap
+evaluasi per pair.
+
+Engine dijalankan seperti di bot live: satu instance hangat, jendela
+`--window` bar (default 100 = limit fetch bot) bergeser satu bar per langkah.
+Tiap langkah, baris yang dikembalikan engine dibandingkan dengan
+`ProfessionalBot._indicator_frame` (pandas_ta, jalur
+USE_INCREMENTAL_INDICATORS=False) atas jendela yang sama: 4 baris terakhir,
+semua kolom FULL_PLAN, dengan np.allclose(rtol, atol).
+
+StochRSI tidak dibandingkan pada bar yang rentang RSI-nya (max - min dalam
+jendela stoch) < STOCH_MIN_SPAN: di situ stoch = selisih pembulatan / rentang
+(mis. harga datar pada koin sepi), sehingga nilainya acak di kedua
+implementasi. Jumlah bar yang dilewati ikut dilaporkan.
+
+Paritas batch: pada setiap langkah, jendela semua pair ditumpuk dan
+dievaluasi oleh `h1_trend` / `m15_signals` (jalur BATCH_SIGNALS) lalu
+dibandingkan dengan `_h1_trend_ok` / `_evaluate_m15_signal` dari baris
+IndicatorEngine yang hangat (jalur default). Keputusan harus sama; harga
+entry dan ATR dibandingkan dengan np.allclose. Keputusan yang bergantung
+pada seri (|a - b| <= TIE_RTOL * |b|, mis. close = EMA pada harga datar)
+atau StochRSI yang tidak terdefinisi baik dilewati dan dihitung.
+
+Data: rekaman MarketRecorder (`--recorded market_data`) atau random walk
+sintetis (deterministik per `--seed`). Exit code 1 bila ada kolom di luar
+toleransi atau keputusan yang berbeda.
+
+Pemakaian:
+    python indicator_parity.py --seed 7 --bars 1000
+    python indicator_parity.py --recorded market_data --timeframe 15m --pairs BTC/IDR,ETH/IDR
+"""
+
+import argparse
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+from batch_signals import h1_trend, m15_signals, stack_candles
+from indicators import IndicatorEngine, IndicatorPlan
+from scheduler import timeframe_seconds
+
+RTOL = 1e-9
+ATOL = 1e-6
+STOCH_MIN_SPAN = 1e-3
+TIE_RTOL = 1e-9
+ROWS = 4  # sama dengan df.tail(4) di _rows_for
+
+
+def synthetic_candles(bars: int, seed: int = 0, timeframe_ms: int = 900_000) -> List[List[float]]:
+    """Random walk deterministik [timestamp_ms, open, high, low, close, volume], dengan satu periode harga datar."""
+    rng = np.random.default_rng(seed)
+    close = 1e8 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    flat = int(rng.integers(0, max(1, bars - 20)))
+    close[flat:flat + 20] = close[flat]
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, bars))
+    volume = rng.lognormal(10, 1, bars)
+    timestamp = np.arange(bars) * timeframe_ms
+    return np.column_stack([timestamp, open_, high, low, close, volume]).tolist()
+
+
+def load_candles(recorded: Optional[str], timeframe: str, pairs: Sequence[str], bars: int,
+                 seed: int, synthetic_pairs: int = 8) -> Dict[str, List[List[float]]]:
+    if not recorded:
+        timeframe_ms = timeframe_seconds(timeframe) * 1000
+        return {f'SYN{i}/IDR': synthetic_candles(bars, seed + i, timeframe_ms) for i in range(synthetic_pairs)}
+    from market_recorder import MarketRecorder
+    data = MarketRecorder(recorded).load_ohlcv(timeframe, list(pairs) or None)
+    return {pair: candles[-bars:].tolist() for pair, candles in data.items()}
+
+
+def stoch_mask(candles: Sequence[Sequence[float]], plan: IndicatorPlan) -> np.ndarray:
+    """True untuk ROWS baris terakhir yang StochRSI k/d-nya terdefinisi baik (rentang RSI >= STOCH_MIN_SPAN)."""
+    length, rsi_length, k, d = plan.stoch
+    rsi = ta.rsi(pd.Series([float(c[4]) for c in candles]), length=rsi_length)
+    rolling = rsi.rolling(length)
+    wide = (rolling.max() - rolling.min()).fillna(np.inf).to_numpy() >= STOCH_MIN_SPAN
+    # k memakai stoch k bar terakhir, d memakai k sebanyak d bar terakhir
+    ok = pd.Series(wide).rolling(k + d - 1, min_periods=1).min().astype(bool).to_numpy()
+    return ok[-ROWS:]
+
+
+def compare(pair: str, candles: List[List[float]], window: int, plan: IndicatorPlan, frame,
+            report: Dict[str, dict]) -> None:
+    """Putar jendela bergeser lewat engine hangat, bandingkan dengan `frame(candles, plan)` (pandas_ta)."""
+    engine = IndicatorEngine(plan)
+    for end in range(min(window, len(candles)), len(candles) + 1):
+        chunk = candles[max(0, end - window):end]
+        rows = engine.update(pair, 'parity', chunk, plan)
+        expected = frame(chunk, plan).tail(ROWS).to_dict('records')
+        mask = stoch_mask(chunk, plan) if plan.stoch else None
+        for column in expected[-1]:
+            if column in ('timestamp', 'open', 'high', 'low', 'close', 'volume'):
+                continue
+            got = np.array([row[column] for row in rows], dtype=float)
+            want = np.array([row[column] for row in expected], dtype=float)
+            entry = _entry(report, column)
+            if column.startswith('STOCHRSI'):
+                entry['skipped'] += int((~mask).sum())
+                got, want = got[mask], want[mask]
+            entry['checked'] += len(want)
+            both = ~(np.isnan(got) | np.isnan(want))
+            if both.any():
+                entry['max_abs'] = max(entry['max_abs'], float(np.max(np.abs(got[both] - want[both]))))
+            if not np.allclose(got, want, rtol=RTOL, atol=ATOL, equal_nan=True):
+                entry['failures'].append((pair, int(chunk[-1][0])))
+
+
+def _entry(report: Dict[str, dict], name: str) -> dict:
+    return report.setdefault(name, {'checked': 0, 'skipped': 0, 'max_abs': 0.0, 'failures': []})
+
+
+def _tie(a: float, b: float) -> bool:
+    return abs(a - b) <= TIE_RTOL * abs(b)
+
+
+def _windows(candles: Dict[str, List[List[float]]], offset: int, window: int) -> Dict[str, List[List[float]]]:
+    # Jendela tiap pair berakhir `offset` bar sebelum data terakhirnya (pair pendek bisa kosong)
+    return {pair: data[max(0, len(data) - offset - window):max(0, len(data) - offset)]
+            for pair, data in candles.items()}
+
+
+def compare_batch(h1: Dict[str, List[List[float]]], m15: Dict[str, List[List[float]]], window: int, bot,
+                  params, report: Dict[str, dict]) -> None:
+    """Keputusan batch_signals vs `_h1_trend_ok` / `_evaluate_m15_signal` dari engine hangat, per jendela bergeser."""
+    bot_cls = bot.ProfessionalBot
+    engine = IndicatorEngine(bot.FULL_PLAN)
+    ema_h1, ema_fast, ema_slow = f'EMA_{bot.H1_EMA_PERIOD}', f'EMA_{bot.M15_EMA_FAST}', f'EMA_{bot.M15_EMA_SLOW}'
+
+    entry = _entry(report, 'batch h1_trend')
+    steps = max((len(data) for data in h1.values()), default=0) - window + 1
+    for offset in range(steps - 1, -1, -1):
+        windows = _windows(h1, offset, window)
+        pairs, stack = stack_candles(windows)
+        for pair, batch_ok in zip(pairs, h1_trend(stack, params)):
+            rows = bot_cls._rows_for(engine, pair, bot.H1_TIMEFRAME, windows[pair], bot.H1_TREND_PLAN)
+            if rows and _tie(rows[-1]['close'], rows[-1][ema_h1]):
+                entry['skipped'] += 1
+                continue
+            entry['checked'] += 1
+            if bool(batch_ok) != bot_cls._h1_trend_ok(rows):
+                entry['failures'].append((pair, int(windows[pair][-1][0])))
+
+    entry = _entry(report, 'batch m15_signal')
+    steps = max((len(data) for data in m15.values()), default=0) - window + 1
+    for offset in range(steps - 1, -1, -1):
+        windows = _windows(m15, offset, window)
+        result = m15_signals(*stack_candles(windows), params)
+        for i, pair in enumerate(result.pairs):
+            rows = bot_cls._rows_for(engine, pair, bot.M15_TIMEFRAME, windows[pair], bot.M15_SIGNAL_PLAN)
+            if rows and len(rows) >= 3:
+                stoch_ok = stoch_mask(windows[pair], bot.M15_SIGNAL_PLAN)[-3:-1].all() if len(rows) == ROWS else True
+                if not stoch_ok or any(_tie(row[ema_fast], row[ema_slow]) for row in rows[-3:-1]):
+                    entry['skipped'] += 1
+                    continue
+            entry['checked'] += 1
+            expected = bot_cls._evaluate_m15_signal(rows)
+            if bool(result.signal[i]) != (expected is not None):
+                entry['failures'].append((pair, int(windows[pair][-1][0])))
+            elif expected is not None:
+                got = np.array([result.entry_price[i], result.atr[i]])
+                entry['max_abs'] = max(entry['max_abs'], float(np.max(np.abs(got - np.array(expected)))))
+                if not np.allclose(got, expected, rtol=RTOL, atol=ATOL):
+                    entry['failures'].append((pair, int(windows[pair][-1][0])))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Cek paritas IndicatorEngine (hangat) vs pandas_ta per jendela fetch.')
+    parser.add_argument('--recorded', default='', help='folder rekaman MarketRecorder (default: data sintetis)')
+    parser.add_argument('--timeframe', default='15m', help='timeframe M15 (cek pandas_ta + sinyal batch)')
+    parser.add_argument('--h1-timeframe', default='1h', help='timeframe tren H1 untuk cek batch')
+    parser.add_argument('--pairs', default='', help='daftar pair dipisah koma')
+    parser.add_argument('--bars', type=int, default=600, help='bar per pair yang diputar')
+    parser.add_argument('--window', type=int, default=100, help='panjang jendela per langkah (limit fetch bot)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    import hybrid_bot_v7_patched as bot
+    from parallel_analysis import ParallelAnalyzer
+
+    pairs = [p.strip() for p in args.pairs.split(',') if p.strip()]
+    data = load_candles(args.recorded, args.timeframe, pairs, args.bars, args.seed)
+    h1 = load_candles(args.recorded, args.h1_timeframe, pairs, args.bars, args.seed + 1000)
+    report: Dict[str, dict] = {}
+    for pair, candles in data.items():
+        compare(pair, candles, args.window, bot.FULL_PLAN, bot.ProfessionalBot._indicator_frame, report)
+    compare_batch(h1, data, args.window, bot, ParallelAnalyzer._batch_params(bot), report)
+
+    failed = False
+    for column, entry in report.items():
+        status = 'OK' if not entry['failures'] else f"GAGAL ({len(entry['failures'])} jendela, mis. {entry['failures'][0]})"
+        print(f"{column:<22} dicek {entry['checked']:>7,} | dilewati {entry['skipped']:>5,} | "
+              f"maks selisih {entry['max_abs']:.3e} | {status}")
+        failed = failed or bool(entry['failures'])
+    print(f"Pair: {len(data)} ({len(h1)} dengan {args.h1_timeframe}) | jendela {args.window} bar | "
+          f"rtol {RTOL} atol {ATOL}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""indicators.py
+Mesin indikator inkremental untuk hybrid_bot_v7_patched.py.
+
+IndicatorEngine menyimpan bar closed per (pair, timeframe) beserta prefix
+rekursif tiap indikator, sehingga setiap bar yang baru close cukup diproses
+sekali (O(1) per bar), tanpa membangun ulang DataFrame dan menghitung ulang
+seluruh riwayat.
+
+Nilai yang dikembalikan update() sama dengan pandas_ta yang dihitung dari
+`candles` yang diberikan saja (jendela fetch, mis. 100 bar), sama seperti
+`_indicator_frame` dan batch_signals.py: EMA di-seed ulang dari awal jendela,
+bukan membawa riwayat sejak engine pertama melihat pair. Rumus (default
+pandas_ta) untuk jendela mulai bar s, dievaluasi di bar t:
+- EMA      : seed SMA x[s..s+L-1], lalu ewm(adjust=False).
+             = a^k * seed + (1-a) * (Q[t] - a^k * Q[s+L-1]),  a = 1 - 2/(L+1),
+             k = t-(s+L-1), dengan prefix Q[t] = a*Q[t-1] + x[t].
+- ATR      : RMA (ewm alpha=1/n, adjust=True, min_periods=n) dari True Range;
+             TR bar s tidak ada (tanpa close sebelumnya di jendela).
+             = (P[t] - d^(t-s) * P[s]) / sum(d^0..d^(t-s-1)),  d = 1 - 1/n.
+- SMA      : rolling mean dengan min_periods=n.
+- StochRSI : RSI (RMA, rumus prefix sama dengan ATR) -> stoch rolling
+             min/max -> SMA k -> SMA d.
+Prefix Q/P adalah rekursi kontraktif (tidak membesar), jadi selisih di atas
+tidak menumpuk error walau engine berjalan lama; periksa dengan
+`python indicator_parity.py`.
+
+Indikator yang dihitung ditentukan oleh IndicatorPlan per lokasi pemakaian
+(mis. tren H1 hanya butuh EMA50), sehingga tidak ada indikator yang dihitung
+lalu dibuang.
+
+Bar terakhir pada data candle dianggap masih berjalan (belum close). Nilainya
+dihitung sementara dan tidak pernah di-commit, sama seperti perilaku
+`iloc[-1]` pada DataFrame versi lama.
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from strategy_params import EPS
+
+NAN = float('nan')
+
+
+@dataclass(frozen=True)
+class IndicatorPlan:
+    """Daftar indikator yang dibutuhkan satu lokasi pemakaian."""
+    name: str
+    ema_lengths: Tuple[int, ...] = ()
+    atr_length: Optional[int] = None
+    volume_length: Optional[int] = None
+    stoch: Optional[Tuple[int, int, int, int]] = None  # (length, rsi_length, k, d)
+
+    @classmethod
+    def full(cls, ema_lengths: Sequence[int] = (50, 13, 21), atr_length: int = 14,
+             volume_length: int = 20, stoch: Tuple[int, int, int, int] = (14, 14, 3, 3)) -> 'IndicatorPlan':
+        return cls('full', tuple(dict.fromkeys(ema_lengths)), atr_length, volume_length, stoch)
+
+
+class _Sma:
+    def __init__(self, length: int):
+        self.length = length
+        self._window: deque = deque(maxlen=length)
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        self._window.append(x)
+        if len(self._window) < self.length or any(math.isnan(v) for v in self._window):
+            self.value = NAN
+        else:
+            self.value = sum(self._window) / self.length
+        return self.value
+
+
+class IndicatorState:
+    """Bar closed tersimpan + prefix rekursif indikator untuk satu (pair, timeframe, plan)."""
+
+    def __init__(self, plan: IndicatorPlan):
+        self.ema_lengths = plan.ema_lengths
+        self.ema_decay = tuple(1.0 - 2.0 / (n + 1) for n in plan.ema_lengths)
+        self.atr_length = plan.atr_length
+        self.atr_decay = 1.0 - 1.0 / plan.atr_length if plan.atr_length else 0.0
+        self.volume_length = plan.volume_length
+        self.stoch = plan.stoch
+        self.stoch_suffix = '_'.join(str(x) for x in plan.stoch) if plan.stoch else ''
+        self.rsi_decay = 1.0 - 1.0 / plan.stoch[1] if plan.stoch else 0.0
+        self.candles: List[Tuple[float, ...]] = []   # (timestamp, open, high, low, close, volume)
+        self.ema_prefix: List[Tuple[float, ...]] = []  # Q per panjang EMA
+        self.tr_prefix: List[float] = []
+        self.gain_prefix: List[float] = []
+        self.loss_prefix: List[float] = []
+
+    @property
+    def last_ts(self):
+        return self.candles[-1][0] if self.candles else None
+
+    def __len__(self) -> int:
+        return len(self.candles)
+
+    def append(self, candle: Sequence[float]) -> None:
+        ts, o, h, l, c, v = candle[:6]
+        c, h, l = float(c), float(h), float(l)
+        bar = (ts, float(o), h, l, c, float(v or 0))
+        if self.candles:
+            prev_close = self.candles[-1][4]
+            tr = max(h - l, abs(h - prev_close), abs(l - prev_close))
+            diff = c - prev_close
+            ema_prev, tr_prev = self.ema_prefix[-1], self.tr_prefix[-1]
+            gain_prev, loss_prev = self.gain_prefix[-1], self.loss_prefix[-1]
+        else:
+            tr = diff = 0.0  # bar pertama tanpa TR / diff: tidak menambah prefix
+            ema_prev = (0.0,) * len(self.ema_decay)
+            tr_prev = gain_prev = loss_prev = 0.0
+        self.candles.append(bar)
+        self.ema_prefix.append(tuple(a * q + c for a, q in zip(self.ema_decay, ema_prev)))
+        self.tr_prefix.append(self.atr_decay * tr_prev + tr)
+        self.gain_prefix.append(self.rsi_decay * gain_prev + max(diff, 0.0))
+        self.loss_prefix.append(self.rsi_decay * loss_prev + min(diff, 0.0))
+
+    def pop(self) -> None:
+        for series in (self.candles, self.ema_prefix, self.tr_prefix, self.gain_prefix, self.loss_prefix):
+            series.pop()
+
+    def trim(self, keep: int) -> None:
+        """Buang bar lama; prefix tetap valid karena sudah memuat kontribusi bar yang dibuang."""
+        cut = len(self.candles) - keep
+        if cut > 0:
+            for series in (self.candles, self.ema_prefix, self.tr_prefix, self.gain_prefix, self.loss_prefix):
+                del series[:cut]
+
+    def rows(self, start: int, positions: Sequence[int]) -> List[Dict[str, float]]:
+        """Baris indikator di `positions` untuk jendela yang mulai di indeks `start`."""
+        bars = len(self.candles) - start
+        seeds = [sum(bar[4] for bar in self.candles[start:start + n]) / n if bars >= n else NAN
+                 for n in self.ema_lengths]
+        stoch = self._stoch_rsi(start, positions[0], positions[-1]) if self.stoch else {}
+        rows = []
+        for t in positions:
+            ts, o, h, l, c, v = self.candles[t]
+            row = {'timestamp': ts, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for j, n in enumerate(self.ema_lengths):
+                row[f'EMA_{n}'] = self._ema(j, n, seeds[j], start, t)
+            if self.atr_length:
+                row[f'ATRr_{self.atr_length}'] = self._rma(self.tr_prefix, self.atr_decay, self.atr_length,
+                                                           start, t)
+            if self.volume_length:
+                n = self.volume_length
+                row[f'VOLUME_SMA_{n}'] = (sum(bar[5] for bar in self.candles[t - n + 1:t + 1]) / n
+                                          if t - start + 1 >= n else NAN)
+            if self.stoch:
+                k, d = stoch[t]
+                row[f'STOCHRSIk_{self.stoch_suffix}'] = k
+                row[f'STOCHRSId_{self.stoch_suffix}'] = d
+            row['bars'] = bars
+            rows.append(row)
+        return rows
+
+    def _ema(self, j: int, n: int, seed: float, start: int, t: int) -> float:
+        seed_end = start + n - 1
+        if t < seed_end:
+            return NAN
+        a = self.ema_decay[j]
+        weight = a ** (t - seed_end)
+        tail = self.ema_prefix[t][j] - weight * self.ema_prefix[seed_end][j]
+        return weight * seed + (1.0 - a) * tail
+
+    @staticmethod
+    def _rma(prefix: List[float], decay: float, length: int, start: int, t: int) -> float:
+        # Nilai valid (TR / diff) di jendela: bar start+1..t
+        count = t - start
+        if count < length:
+            return NAN
+        weight = decay ** count
+        return (prefix[t] - weight * prefix[start]) / ((1.0 - weight) / (1.0 - decay))
+
+    def _rsi(self, start: int, t: int) -> float:
+        length = self.stoch[1]
+        gain = self._rma(self.gain_prefix, self.rsi_decay, length, start, t)
+        loss = abs(self._rma(self.loss_prefix, self.rsi_decay, length, start, t))
+        return 100.0 * gain / (gain + loss) if (gain + loss) else NAN
+
+    def _stoch_rsi(self, start: int, first: int, last: int) -> Dict[int, Tuple[float, float]]:
+        length, _, k, d = self.stoch
+        lo = max(start, first - (length - 1) - (k - 1) - (d - 1))
+        window: deque = deque(maxlen=length)
+        sma_k, sma_d = _Sma(k), _Sma(d)
+        out = {}
+        for t in range(lo, last + 1):
+            rsi = self._rsi(start, t)
+            window.append(rsi)
+            if len(window) < length or any(math.isnan(v) for v in window):
+                stoch = NAN
+            else:
+                lowest, highest = min(window), max(window)
+                stoch = 100.0 * (rsi - lowest) / ((highest - lowest) or EPS)
+            value_k = sma_k.update(stoch)
+            out[t] = (value_k, sma_d.update(value_k))
+        return out
+
+
+class IndicatorEngine:
+    """Indikator inkremental per (pair, timeframe, plan) atas jendela candle yang diberikan.
+
+    `max_bars` membatasi bar tersimpan per key (minimal sepanjang jendela terakhir);
+    `history` = jumlah baris closed yang dikembalikan sebelum bar berjalan.
+    """
+
+    def __init__(self, default_plan: Optional[IndicatorPlan] = None, history: int = 3, max_bars: int = 128):
+        self.default_plan = default_plan or IndicatorPlan.full()
+        self.history = history
+        self.max_bars = max_bars
+        self._states: Dict[Tuple[str, str, IndicatorPlan], IndicatorState] = {}
+        self.stats = {'bars_processed': 0, 'resets': 0}
+
+    def update(self, pair: str, timeframe: str, candles: Sequence[Sequence[float]],
+               plan: Optional[IndicatorPlan] = None) -> List[Dict[str, float]]:
+        """Proses bar closed yang baru, kembalikan `history` baris closed terakhir + bar berjalan.
+
+        `candles` urut waktu naik; elemen terakhir dianggap bar yang masih berjalan.
+        Nilai dihitung atas jendela `candles` (sama dengan pandas_ta pada candle yang sama).
+        """
+        if not candles:
+            return []
+        plan = plan or self.default_plan
+        key = (pair, timeframe, plan)
+        closed, forming = candles[:-1], candles[-1]
+        state = self._states.get(key)
+
+        start = self._resume_index(state, closed)
+        if start is None:
+            state = IndicatorState(plan)
+            self._states[key] = state
+            self.stats['resets'] += 1
+            start = 0
+
+        for candle in closed[start:]:
+            state.append(candle)
+            self.stats['bars_processed'] += 1
+
+        window_start = len(state) - len(closed)
+        state.append(forming)
+        try:
+            last = len(state) - 1
+            rows = state.rows(window_start, range(max(window_start, last - self.history), last + 1))
+        finally:
+            state.pop()
+        keep = max(self.max_bars, len(closed))
+        if len(state) > 2 * keep:
+            state.trim(keep)
+        return rows
+
+    def backlog(self, pair: str, timeframe: str, candles: Sequence[Sequence[float]],
+                plan: Optional[IndicatorPlan] = None) -> int:
+        """Jumlah bar closed yang akan diproses update() untuk `candles` (semua bila harus hitung ulang)."""
+        if not candles:
+            return 0
+        closed = candles[:-1]
+        start = self._resume_index(self._states.get((pair, timeframe, plan or self.default_plan)), closed)
+        return len(closed) - (start or 0)
+
+    def extract(self, pair: str, timeframe: str, plan: Optional[IndicatorPlan] = None) -> 'IndicatorEngine':
+        """Engine baru berisi state satu (pair, timeframe, plan) saja, untuk dikirim ke proses worker."""
+        plan = plan or self.default_plan
+        key = (pair, timeframe, plan)
+        part = IndicatorEngine(self.default_plan, self.history, self.max_bars)
+        if key in self._states:
+            part._states[key] = self._states[key]
+        return part
+
+    def merge(self, part: 'IndicatorEngine') -> None:
+        """Ambil kembali state (dan statistik) yang sudah diperbarui worker, lihat extract()."""
+        self._states.update(part._states)
+        for name, value in part.stats.items():
+            self.stats[name] = self.stats.get(name, 0) + value
+
+    def reset(self, pair: Optional[str] = None, timeframe: Optional[str] = None) -> None:
+        for key in list(self._states):
+            if (pair is None or key[0] == pair) and (timeframe is None or key[1] == timeframe):
+                del self._states[key]
+
+    @staticmethod
+    def _resume_index(state: Optional[IndicatorState], closed: Sequence[Sequence[float]]) -> Optional[int]:
+        # Lanjutkan dari bar setelah last_ts. Hitung ulang bila last_ts tidak ada di data (gap / data baru)
+        # atau bar tersimpan tidak mencakup awal jendela.
+        if state is None or state.last_ts is None:
+            return None
+        for i in range(len(closed) - 1, -1, -1):
+            ts = closed[i][0]
+            if ts == state.last_ts:
+                first = len(state) - (i + 1)
+                return i + 1 if first >= 0 and state.candles[first][0] == closed[0][0] else None
+            if ts < state.last_ts:
+                return None
+        return None
@@ -0,0 +1,234 @@
+"""log_pipeline.py
+Logging terstruktur di thread latar untuk hybrid_bot_v7_patched.py.
+
+Jalur trading hanya membayar satu `put_nowait` ke antrian terbatas:
+QueueLogHandler.emit() tidak memformat apa pun. Thread penulis mengambil
+record per batch, memformatnya (JSON lines untuk file log, teks biasa untuk
+konsol) lalu menulis ke sink sekaligus. Bila antrian penuh (disk lambat,
+burst log), record dibuang dan dihitung di `stats['dropped']`, bukan membuat
+thread trading menunggu.
+
+Format file (satu objek JSON per baris):
+    {"ts": 1760000000.123, "time": "2025-10-09T08:53:20", "level": "INFO",
+     "event": "OPEN", "pair": "BTC/IDR", "message": "...", "data": {...}}
+`event`/`pair`/`data` diisi dari `extra` (lihat `_log_event`); record logging
+biasa hanya punya `message`.
+
+Rotasi (RotatingFileSink):
+- ukuran: file aktif melewati `max_bytes`;
+- waktu: melewati batas interval `rotate_interval` detik (sejajar epoch/UTC,
+  mis. 86400 = tiap 00:00 UTC), dicek juga saat start dari mtime file lama.
+File lama diganti nama menjadi `<path>.<YYYYmmdd-HHMMSS>`, di-gzip (`.gz`) di
+thread penulis, dan hanya `backup_count` file terbaru yang disimpan.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from typing import List, Optional
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+        }
+        event = getattr(record, 'event', None)
+        if event is not None:
+            entry['event'] = event
+            entry['pair'] = getattr(record, 'pair', '')
+            entry['message'] = getattr(record, 'event_message', '')
+            data = getattr(record, 'data', None)
+            if data:
+                entry['data'] = data
+        else:
+            entry['message'] = record.getMessage()
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class StreamSink:
+    """Tulis ke stdout (dibaca saat menulis, jadi ikut redirect_stdout)."""
+
+    def write(self, lines: List[str]) -> None:
+        stream = sys.stdout
+        stream.write(''.join(line + '\n' for line in lines))
+        stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class RotatingFileSink:
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, rotate_interval: float = 86400.0,
+                 backup_count: int = 14, compress: bool = True):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.rotate_interval = float(rotate_interval)
+        self.backup_count = int(backup_count)
+        self.compress = compress
+        self.rotations = 0
+        self._file = None
+        self._size = 0
+        self._rollover_at = float('inf')
+
+    def _open(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        # File lama dari run sebelumnya: batas rotasi dihitung dari waktu tulis terakhirnya
+        started = os.path.getmtime(self.path) if self._size else time.time()
+        self._rollover_at = self._next_rollover(started)
+
+    def _next_rollover(self, now: float) -> float:
+        if self.rotate_interval <= 0:
+            return float('inf')
+        return (now // self.rotate_interval + 1) * self.rotate_interval
+
+    def write(self, lines: List[str]) -> None:
+        if self._file is None:
+            self._open()
+        if time.time() >= self._rollover_at and self._size:
+            self.rotate()
+        for line in lines:
+            data = line + '\n'
+            if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+                self.rotate()
+            self._file.write(data)
+            self._size += len(data)
+        self._file.flush()
+
+    def rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+            suffix = 1
+            while os.path.exists(target) or os.path.exists(target + '.gz'):
+                target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+                suffix += 1
+            os.replace(self.path, target)
+            if self.compress:
+                with open(target, 'rb') as src, gzip.open(target + '.gz', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(target)
+            self.rotations += 1
+            self._prune()
+        self._open()
+        self._rollover_at = self._next_rollover(time.time())
+
+    def _prune(self) -> None:
+        if self.backup_count <= 0:
+            return
+        backups = sorted(glob.glob(glob.escape(self.path) + '.[0-9]*'), key=os.path.getmtime)
+        for old in backups[:-self.backup_count]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class QueueLogHandler(logging.Handler):
+    """Handler logging non-blocking: emit() hanya put_nowait, format + tulis di thread latar."""
+
+    def __init__(self, sink, max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 0.5,
+                 name: str = 'log-writer'):
+        super().__init__()
+        self.set_name(name)
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread: Optional[threading.Thread] = threading.Thread(target=self._run, name=name, daemon=True)
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'errors': 0}
+        self._thread.start()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Tanpa lock handler: queue sudah thread-safe
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return
+        self.stats['queued'] += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Tunggu sampai antrian yang ada sekarang selesai ditulis (mis. sebelum exit/test)."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(5.0)
+            self._thread = None
+        super().close()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            records, markers = [], []
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    records.append(item)
+                if stop or len(records) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if records:
+                self._write(records)
+            for marker in markers:
+                marker.set()
+        self.sink.close()
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.stats['errors'] += 1
+        try:
+            self.sink.write(lines)
+            self.stats['written'] += len(lines)
+        except Exception:
+            self.stats['errors'] += 1
@@ -0,0 +1,331 @@
+"""market_data.py
+Cache data pasar untuk hybrid_bot_v7_patched.py.
+
+TickerCache menyimpan snapshot ticker per siklus (TTL pendek) sehingga ticker
+satu pair cukup diambil sekali per siklus oleh manajemen posisi, equity
+simulasi dan laporan status.
+
+CandleStore menyimpan OHLCV per (pair, timeframe) di memori selama bot berjalan.
+Setelah pengambilan pertama, hanya candle yang lebih baru dari candle terakhir
+yang diminta ke exchange (parameter `since`), lalu digabung:
+- dedupe berdasarkan timestamp,
+- bila candle terakhir di buffer sudah lebih tua dari `limit` bar (pair lama
+  tidak diminta, mis. keluar-masuk daftar momentum), buffer diisi ulang penuh
+  (`limit`), karena ccxt indodax hanya menyimpan 1000 bar *pertama* setelah
+  `since` sehingga ujung buffer bisa tertinggal di bar lama;
+- hasil inkremental harus menyambung ke buffer (bar pertama tidak lebih dari
+  satu timeframe setelah candle terakhir), bila tidak buffer diisi ulang penuh,
+- candle terakhir yang masih berjalan (belum close) selalu ditimpa data terbaru,
+- riwayat dibatasi ring buffer (deque maxlen), diperbesar bila `limit` yang
+  diminta lebih panjang (mis. bar 15m untuk resample H1/4h).
+Dengan `max_age`, buffer yang baru diambil kurang dari `max_age` detik lalu
+dipakai langsung tanpa request (mis. tren H1 hasil resample lalu sinyal M15
+untuk pair yang sama dalam satu scan).
+
+resample_ohlcv() membangun candle timeframe lebih besar (1h, 4h) dari candle
+15m: bucket sejajar kelipatan timeframe sejak epoch (UTC, sama seperti candle
+exchange), bucket pertama yang tidak lengkap dibuang, dan bucket terakhir yang
+berisi bar 15m berjalan menjadi bar berjalan timeframe besar.
+
+MarketsCache menyimpan hasil load_markets() ke file JSON dengan TTL sehingga
+bot yang di-restart bisa langsung bekerja tanpa menunggu daftar market.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from scheduler import timeframe_seconds
+
+
+class CandleStore:
+    """Cache OHLCV inkremental per (pair, timeframe)."""
+
+    def __init__(self, exchange, max_candles: int = 500, recorder=None):
+        self.exchange = exchange
+        self.max_candles = int(max_candles)
+        self.recorder = recorder
+        self._candles: Dict[Tuple[str, str], deque] = {}
+        self._seeded_limit: Dict[Tuple[str, str], int] = {}
+        self._fetched_at: Dict[Tuple[str, str], float] = {}
+        self.stats = {'full_fetch': 0, 'incremental_fetch': 0, 'reused': 0, 'reseeded': 0, 'candles_received': 0}
+
+    def get(self, pair: str, timeframe: str, limit: int = 100, max_age: float = 0.0) -> List[list]:
+        """Kembalikan maksimal `limit` candle terakhir (urut waktu naik)."""
+        cached = self._fresh(pair, timeframe, limit, max_age)
+        if cached is not None:
+            return cached
+        full, kwargs = self._request(pair, timeframe, limit)
+        rows = self.exchange.fetch_ohlcv(pair, timeframe, **kwargs)
+        result = self._store(pair, timeframe, limit, full, rows)
+        if result is None:
+            rows = self.exchange.fetch_ohlcv(pair, timeframe, limit=max(limit, 1))
+            result = self._store(pair, timeframe, limit, True, rows)
+        return result
+
+    async def aget(self, pair: str, timeframe: str, limit: int = 100, exchange=None,
+                   max_age: float = 0.0) -> List[list]:
+        """Versi async dari get() untuk exchange ccxt.async_support."""
+        cached = self._fresh(pair, timeframe, limit, max_age)
+        if cached is not None:
+            return cached
+        exchange = exchange or self.exchange
+        full, kwargs = self._request(pair, timeframe, limit)
+        rows = await exchange.fetch_ohlcv(pair, timeframe, **kwargs)
+        result = self._store(pair, timeframe, limit, full, rows)
+        if result is None:
+            rows = await exchange.fetch_ohlcv(pair, timeframe, limit=max(limit, 1))
+            result = self._store(pair, timeframe, limit, True, rows)
+        return result
+
+    def _fresh(self, pair: str, timeframe: str, limit: int, max_age: float) -> Optional[List[list]]:
+        key = (pair, timeframe)
+        if not max_age or not self._candles.get(key) or limit > self._seeded_limit.get(key, 0):
+            return None
+        if time.monotonic() - self._fetched_at.get(key, float('-inf')) >= max_age:
+            return None
+        self.stats['reused'] += 1
+        return list(self._candles[key])[-limit:]
+
+    def _request(self, pair: str, timeframe: str, limit: int) -> Tuple[bool, dict]:
+        key = (pair, timeframe)
+        buf = self._candles.get(key)
+        if not buf or limit > self._seeded_limit.get(key, 0):
+            return True, {'limit': max(limit, 1)}
+        # Celah lebih panjang dari jendela yang diminta: isi ulang lebih murah dan ccxt tidak memotongnya
+        missed = (time.time() * 1000 - buf[-1][0]) / (timeframe_seconds(timeframe) * 1000)
+        if missed > limit:
+            self.stats['reseeded'] += 1
+            return True, {'limit': max(limit, 1)}
+        # Minta ulang mulai dari candle terakhir: bar yang masih berjalan ikut diperbarui.
+        return False, {'since': buf[-1][0]}
+
+    def _store(self, pair: str, timeframe: str, limit: int, full: bool,
+               rows: List[list]) -> Optional[List[list]]:
+        """Gabungkan hasil fetch ke buffer; None bila hasil inkremental tidak menyambung (perlu isi ulang)."""
+        key = (pair, timeframe)
+        if not full and not self._connects(self._candles[key], rows or [], timeframe):
+            self.stats['reseeded'] += 1
+            return None
+        if full:
+            self.stats['full_fetch'] += 1
+            maxlen = max(self.max_candles, limit)
+            self._candles[key] = deque(maxlen=maxlen)
+            self._seeded_limit[key] = min(limit, maxlen)
+        else:
+            self.stats['incremental_fetch'] += 1
+        buf = self._candles[key]
+        self._fetched_at[key] = time.monotonic()
+
+        self.stats['candles_received'] += len(rows or [])
+        self._merge(buf, rows or [])
+        if self.recorder is not None and len(buf) > 1:
+            # Semua kecuali bar terakhir (masih berjalan) sudah close
+            self.recorder.record_candles(pair, timeframe, list(buf)[:-1])
+        if limit >= len(buf):
+            return list(buf)
+        return list(buf)[-limit:]
+
+    def last_timestamp(self, pair: str, timeframe: str) -> Optional[int]:
+        buf = self._candles.get((pair, timeframe))
+        return buf[-1][0] if buf else None
+
+    def invalidate(self, pair: Optional[str] = None, timeframe: Optional[str] = None) -> None:
+        for key in list(self._candles):
+            if (pair is None or key[0] == pair) and (timeframe is None or key[1] == timeframe):
+                del self._candles[key]
+                self._seeded_limit.pop(key, None)
+                self._fetched_at.pop(key, None)
+
+    @staticmethod
+    def _connects(buf: deque, rows: List[list], timeframe: str) -> bool:
+        # Bar pertama yang lebih baru dari isi buffer harus tepat setelah candle terakhir
+        newer = [r[0] for r in rows if r and r[0] is not None and r[0] > buf[-1][0]]
+        return not newer or min(newer) <= buf[-1][0] + timeframe_seconds(timeframe) * 1000
+
+    @staticmethod
+    def _merge(buf: deque, rows: List[list]) -> None:
+        valid = [r for r in rows if r and r[0] is not None]
+        for row in sorted(valid, key=lambda r: r[0]):
+            if not buf or row[0] > buf[-1][0]:
+                buf.append(list(row))
+            elif row[0] == buf[-1][0]:
+                buf[-1] = list(row)
+            # Timestamp lebih lama dari candle terakhir sudah ada di buffer: abaikan (dedupe).
+
+
+def resample_ohlcv(candles: List[list], base_seconds: int, target_seconds: int,
+                   limit: Optional[int] = None) -> List[list]:
+    """Gabungkan candle `base_seconds` (urut waktu naik) menjadi candle `target_seconds`.
+
+    open = open bar pertama, high/low = max/min, close = close bar terakhir,
+    volume = jumlah. Bucket pertama dibuang bila riwayat dimulai di tengah bucket
+    (open/high/low/volume-nya belum lengkap). Bar terakhir hasil resample tetap
+    dianggap bar berjalan, sama seperti data candle dari exchange.
+    """
+    if target_seconds % base_seconds:
+        raise ValueError(f'{target_seconds}s bukan kelipatan {base_seconds}s')
+    target_ms = target_seconds * 1000
+    out: List[list] = []
+    for ts, o, h, l, c, v in (row[:6] for row in candles):
+        start = int(ts) - int(ts) % target_ms
+        if out and out[-1][0] == start:
+            bar = out[-1]
+            bar[2] = max(bar[2], h)
+            bar[3] = min(bar[3], l)
+            bar[4] = c
+            bar[5] = (bar[5] or 0) + (v or 0)
+        elif not out and start != ts:
+            continue  # bucket pertama terpotong
+        else:
+            out.append([start, o, h, l, c, v])
+    if limit is not None:
+        out = out[-limit:]
+    return out
+
+
+def resample_limit(limit: int, base_seconds: int, target_seconds: int) -> int:
+    """Jumlah candle dasar agar resample menghasilkan `limit` bar (termasuk bucket pertama terpotong)."""
+    return (limit + 1) * (target_seconds // base_seconds)
+
+
+class TickerCache:
+    """Snapshot ticker per siklus dengan TTL pendek dan counter hit/miss."""
+
+    def __init__(self, exchange, ttl: float = 15.0, recorder=None):
+        self.exchange = exchange
+        self.ttl = float(ttl)
+        self.recorder = recorder
+        self._entries: Dict[str, Tuple[float, dict]] = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, pair: str) -> dict:
+        ticker = self.peek(pair)
+        if ticker is not None:
+            self.stats['hits'] += 1
+            return ticker
+        self.stats['misses'] += 1
+        ticker = self.exchange.fetch_ticker(pair)
+        self.put(pair, ticker)
+        return ticker
+
+    def peek(self, pair: str) -> Optional[dict]:
+        entry = self._entries.get(pair)
+        if entry and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+        return None
+
+    def put(self, pair: str, ticker: dict) -> None:
+        if self._keep(pair, ticker) and self.recorder is not None:
+            self.recorder.record_tickers({pair: ticker})
+
+    def update(self, tickers: Dict[str, dict]) -> None:
+        kept = {pair: ticker for pair, ticker in (tickers or {}).items()
+                if isinstance(ticker, dict) and self._keep(pair, ticker)}
+        if kept and self.recorder is not None:
+            self.recorder.record_tickers(kept)
+
+    def _keep(self, pair: str, ticker: dict) -> bool:
+        if ticker and ticker.get('last') is not None:
+            self._entries[pair] = (time.monotonic(), ticker)
+            return True
+        return False
+
+    def new_cycle(self) -> None:
+        self._entries.clear()
+
+    def hit_rate(self) -> Optional[float]:
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else None
+
+
+class BalanceCache:
+    """Cache fetch_balance dengan TTL; di-invalidate setiap kali order dikirim."""
+
+    def __init__(self, exchange, ttl: float = 60.0):
+        self.exchange = exchange
+        self.ttl = float(ttl)
+        self._balance: Optional[dict] = None
+        self._fetched_at = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self) -> dict:
+        balance = self.peek()
+        if balance is not None:
+            self.stats['hits'] += 1
+            return balance
+        self.stats['misses'] += 1
+        balance = self.exchange.fetch_balance()
+        self.put(balance)
+        return balance
+
+    def peek(self) -> Optional[dict]:
+        if self._balance is not None and time.monotonic() - self._fetched_at <= self.ttl:
+            return self._balance
+        return None
+
+    def put(self, balance: dict) -> None:
+        self._balance = balance
+        self._fetched_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        if self._balance is not None:
+            self.stats['invalidations'] += 1
+        self._balance = None
+
+
+class MarketsCache:
+    """Metadata market (load_markets) di disk dengan TTL, agar start ulang tidak menunggu exchange.
+
+    load() memakai file bila umurnya <= ttl (set_markets ke exchange, tanpa request);
+    selain itu load_markets() lalu file ditulis ulang (tmp + os.replace). Bila exchange
+    gagal, file kedaluwarsa tetap dipakai sebagai cadangan. `source` mencatat asal data
+    terakhir: 'cache', 'exchange' atau 'stale'.
+    """
+
+    def __init__(self, exchange, path: str, ttl: float = 21600.0):
+        self.exchange = exchange
+        self.path = path
+        self.ttl = float(ttl)
+        self.source: Optional[str] = None
+        self.stats = {'hits': 0, 'misses': 0, 'write_errors': 0}
+
+    def load(self) -> dict:
+        cached = self._read()
+        if cached is not None and time.time() - cached.get('saved_at', 0) <= self.ttl:
+            self.stats['hits'] += 1
+            return self._use(cached, 'cache')
+        self.stats['misses'] += 1
+        try:
+            markets = self.exchange.load_markets(reload=True)
+        except Exception:
+            if cached is None:
+                raise
+            return self._use(cached, 'stale')
+        self.source = 'exchange'
+        self._write(markets, getattr(self.exchange, 'currencies', None))
+        return markets
+
+    def _use(self, cached: dict, source: str) -> dict:
+        self.source = source
+        return self.exchange.set_markets(cached['markets'], cached.get('currencies'))
+
+    def _read(self) -> Optional[dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) and data.get('markets') else None
+
+    def _write(self, markets: dict, currencies: Optional[dict]) -> None:
+        tmp = f'{self.path}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'markets': markets, 'currencies': currencies},
+                          f, separators=(',', ':'), default=str)
+            os.replace(tmp, self.path)
+        except (OSError, TypeError, ValueError):
+            self.stats['write_errors'] += 1
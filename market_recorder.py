@@ -0,0 +1,199 @@
+"""market_recorder.py
+Perekam data pasar (ticker & candle closed) ke store kolom append-only.
+
+Setiap record ditulis sebagai baris biner ber-dtype tetap (NumPy structured
+array) ke file partisi:
+
+    <root>/tickers/<BASE_QUOTE>/<YYYY-MM-DD>.bin           (partisi harian)
+    <root>/candles/<timeframe>/<BASE_QUOTE>/<YYYY-MM>.bin   (partisi bulanan)
+
+File hanya di-append, tidak pernah ditulis ulang. Pembacaan memakai
+np.memmap read-only tanpa parsing atau copy: satu bulan candle 15m satu pair
+adalah satu file, jadi read_candles() untuk rentang dalam satu bulan
+mengembalikan memmap langsung. Rentang lintas partisi digabung (copy).
+Record terakhir yang terpotong (proses mati saat menulis) diabaikan saat
+dibaca dan dipangkas sebelum append berikutnya.
+
+Candle hanya direkam bila timestamp-nya lebih baru dari candle terakhir yang
+sudah tersimpan, jadi pengambilan ulang bar yang sama tidak membuat duplikat.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'),
+])
+TICKER_DTYPE = np.dtype([
+    ('timestamp', '<i8'), ('last', '<f8'), ('bid', '<f8'), ('ask', '<f8'), ('high', '<f8'), ('low', '<f8'),
+    ('base_volume', '<f8'), ('quote_volume', '<f8'), ('percentage', '<f8'),
+])
+# Kolom TICKER_DTYPE setelah timestamp, dalam nama field ticker ccxt
+_TICKER_KEYS = ('last', 'bid', 'ask', 'high', 'low', 'baseVolume', 'quoteVolume', 'percentage')
+
+
+def _pair_dir(pair: str) -> str:
+    return pair.replace('/', '_')
+
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def _month(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m')
+
+
+def _num(value) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class MarketRecorder:
+    """Rekam ticker & candle closed; baca kembali sebagai memmap."""
+
+    def __init__(self, root: str = 'market_data'):
+        self.root = root
+        self._lock = threading.Lock()
+        self._last_candle: Dict[Tuple[str, str], int] = {}
+        self.stats = {'tickers': 0, 'candles': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------ tulis
+    def record_tickers(self, tickers: Dict[str, dict]) -> int:
+        rows: Dict[str, List[tuple]] = {}
+        now = int(time.time() * 1000)
+        for pair, ticker in (tickers or {}).items():
+            if not isinstance(ticker, dict) or ticker.get('last') is None:
+                continue
+            # Timestamp = waktu diterima bot, jadi urut naik per file (dipakai replay & searchsorted)
+            rows.setdefault(pair, []).append((now,) + tuple(_num(ticker.get(key)) for key in _TICKER_KEYS))
+        written = 0
+        with self._lock:
+            for pair, items in rows.items():
+                try:
+                    for day, part in self._partition(items, _day):
+                        self._append(os.path.join(self.root, 'tickers', _pair_dir(pair), f'{day}.bin'),
+                                     np.array(part, dtype=TICKER_DTYPE))
+                except OSError:
+                    # Perekaman tidak boleh menghentikan bot (mis. disk penuh)
+                    self.stats['errors'] += 1
+                    continue
+                written += len(items)
+            self.stats['tickers'] += written
+        return written
+
+    def record_candles(self, pair: str, timeframe: str, candles: Iterable[Sequence[float]]) -> int:
+        """Simpan candle closed yang lebih baru dari candle terakhir tersimpan."""
+        with self._lock:
+            last = self._last_recorded(pair, timeframe)
+            rows = sorted((tuple(c[:6]) for c in candles if c and c[0] is not None and c[0] > last),
+                          key=lambda r: r[0])
+            rows = [r for i, r in enumerate(rows) if i == 0 or r[0] != rows[i - 1][0]]
+            if not rows:
+                return 0
+            try:
+                for month, part in self._partition(rows, _month):
+                    path = os.path.join(self.root, 'candles', timeframe, _pair_dir(pair), f'{month}.bin')
+                    self._append(path, np.array([(int(r[0]),) + tuple(_num(x) for x in r[1:]) for r in part],
+                                                dtype=CANDLE_DTYPE))
+            except OSError:
+                self.stats['errors'] += 1
+                return 0
+            self._last_candle[(pair, timeframe)] = int(rows[-1][0])
+            self.stats['candles'] += len(rows)
+            return len(rows)
+
+    @staticmethod
+    def _partition(rows: List[tuple], key) -> Iterable[Tuple[str, List[tuple]]]:
+        parts: Dict[str, List[tuple]] = {}
+        for row in rows:
+            parts.setdefault(key(int(row[0])), []).append(row)
+        return parts.items()
+
+    @staticmethod
+    def _append(path: str, records: np.ndarray) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            size = f.tell()
+            torn = size % records.dtype.itemsize
+            if torn:
+                f.truncate(size - torn)
+                f.seek(size - torn)
+            f.write(records.tobytes())
+
+    def _last_recorded(self, pair: str, timeframe: str) -> int:
+        key = (pair, timeframe)
+        if key not in self._last_candle:
+            parts = self.partitions('candles', pair, timeframe)
+            last = -1
+            for path in reversed(parts):
+                data = _memmap(path, CANDLE_DTYPE)
+                if len(data):
+                    last = int(data['timestamp'][-1])
+                    break
+            self._last_candle[key] = last
+        return self._last_candle[key]
+
+    # ------------------------------------------------------------------ baca
+    def partitions(self, kind: str, pair: str, timeframe: Optional[str] = None) -> List[str]:
+        base = os.path.join(self.root, kind, *([timeframe] if timeframe else []), _pair_dir(pair))
+        if not os.path.isdir(base):
+            return []
+        return [os.path.join(base, name) for name in sorted(os.listdir(base)) if name.endswith('.bin')]
+
+    def read_candles(self, pair: str, timeframe: str, start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None) -> np.ndarray:
+        """Structured array CANDLE_DTYPE dengan start_ms <= timestamp < end_ms."""
+        return self._read(self.partitions('candles', pair, timeframe), CANDLE_DTYPE, _month, start_ms, end_ms)
+
+    def read_tickers(self, pair: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> np.ndarray:
+        return self._read(self.partitions('tickers', pair), TICKER_DTYPE, _day, start_ms, end_ms)
+
+    @staticmethod
+    def _read(paths: List[str], dtype: np.dtype, period, start_ms, end_ms) -> np.ndarray:
+        lo = period(start_ms) if start_ms is not None else ''
+        hi = period(end_ms - 1) if end_ms is not None else '~'
+        chunks = []
+        for path in paths:
+            name = os.path.basename(path)[:-4]
+            if not (lo <= name <= hi):
+                continue
+            data = _memmap(path, dtype)
+            ts = data['timestamp']
+            i = np.searchsorted(ts, start_ms, side='left') if start_ms is not None else 0
+            j = np.searchsorted(ts, end_ms, side='left') if end_ms is not None else len(data)
+            if j > i:
+                chunks.append(data[i:j])
+        if not chunks:
+            return np.empty(0, dtype=dtype)
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def pairs(self, kind: str = 'candles', timeframe: Optional[str] = None) -> List[str]:
+        base = os.path.join(self.root, kind, *([timeframe] if timeframe else []))
+        if not os.path.isdir(base):
+            return []
+        return sorted(name.replace('_', '/', 1) for name in os.listdir(base))
+
+    def load_ohlcv(self, timeframe: str = '15m', pairs: Optional[Sequence[str]] = None,
+                   start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Format backtest.py: {pair: array (n, 6) [timestamp, open, high, low, close, volume]}."""
+        data = {}
+        for pair in pairs or self.pairs('candles', timeframe):
+            candles = self.read_candles(pair, timeframe, start_ms, end_ms)
+            if len(candles):
+                data[pair] = np.column_stack([candles[name].astype(np.float64) for name in CANDLE_DTYPE.names])
+        return data
+
+
+def _memmap(path: str, dtype: np.dtype) -> np.ndarray:
+    count = os.path.getsize(path) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
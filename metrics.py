@@ -0,0 +1,353 @@
+"""metrics.py
+Instrumentasi ringan (counter, gauge, histogram) + ekspor format Prometheus.
+
+Semua metrik disimpan di satu registry per proses (METRICS). Pencatatan di
+jalur panas hanya berupa lookup dict + penjumlahan di bawah satu lock,
+jadi aman dibiarkan aktif terus. Nilai yang sudah ada di objek lain
+(statistik cache, token bucket, jumlah posisi) tidak disalin tiap kejadian,
+melainkan dibaca lewat collector saat metrik di-scrape.
+
+Ekspor (opsional, lihat METRICS_PORT / METRICS_FILE):
+- MetricsServer → endpoint HTTP lokal `/metrics` (format teks Prometheus).
+- MetricsFileWriter → tulis file yang sama secara berkala (atomic replace),
+  cocok untuk textfile collector node_exporter atau dibaca manual.
+"""
+
+import asyncio
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Katalog metrik bot: nama -> (tipe, deskripsi)
+CATALOG = {
+    'cuanbot_job_seconds': ('histogram', 'Durasi job scheduler / siklus bot (detik).'),
+    'cuanbot_job_overruns_total': ('counter', 'Job yang berjalan lebih lama dari intervalnya.'),
+    'cuanbot_job_last_seconds': ('gauge', 'Durasi eksekusi terakhir per job (detik).'),
+    'cuanbot_engine_seconds': ('histogram', 'Waktu per mesin/tahap (scan, analisa, posisi, laporan).'),
+    'cuanbot_exchange_request_seconds': ('histogram', 'Latensi request HTTP ke exchange per endpoint (tanpa antre rate limit).'),
+    'cuanbot_exchange_errors_total': ('counter', 'Request exchange yang gagal per endpoint dan jenis error.'),
+    'cuanbot_telegram_send_seconds': ('histogram', 'Latensi pengiriman pesan Telegram.'),
+    'cuanbot_telegram_errors_total': ('counter', 'Pengiriman Telegram yang gagal.'),
+    'cuanbot_telegram_messages_total': ('counter', 'Pesan outbox Telegram per hasil (queued/sent/coalesced/retries/...).'),
+    'cuanbot_telegram_queue_length': ('gauge', 'Pesan Telegram yang belum terkirim.'),
+    'cuanbot_log_records_total': ('counter', 'Record log per sink dan hasil (written/dropped/errors).'),
+    'cuanbot_cache_requests_total': ('counter', 'Akses cache per cache dan hasil (hit/miss).'),
+    'cuanbot_cache_hit_ratio': ('gauge', 'Rasio hit cache sejak start.'),
+    'cuanbot_rate_limit_requests_total': ('counter', 'Request yang melewati token bucket.'),
+    'cuanbot_rate_limit_waits_total': ('counter', 'Request yang harus menunggu token bucket.'),
+    'cuanbot_rate_limit_wait_seconds_total': ('counter', 'Total waktu tunggu token bucket (detik).'),
+    'cuanbot_open_positions': ('gauge', 'Jumlah posisi aktif yang dikelola bot.'),
+    'cuanbot_virtual_idr': ('gauge', 'Saldo IDR virtual (mode simulasi).'),
+    'cuanbot_start_time_seconds': ('gauge', 'Waktu start proses (unix).'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    escaped = (k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in items)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, catalog: Optional[dict] = None):
+        self.buckets = tuple(buckets)
+        self.catalog = dict(CATALOG if catalog is None else catalog)
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._collectors: Dict[str, Callable[[], object]] = {}
+
+    # ------------------------------------------------------------------ catat
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _labels(labels) if labels else ()
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels) if labels else ()
+        with self._lock:
+            self._values.setdefault(name, {})[key] = float(value)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels) if labels else ()
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(len(self.buckets) + 1)
+            hist.counts[index] += 1
+            hist.sum += value
+            hist.count += 1
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator: catat durasi fungsi (sync atau async) ke histogram `name`."""
+        def decorate(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.time(name, **labels):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def collect(self, name: str, fn: Callable[[], object]) -> None:
+        """Nilai `name` dibaca dari fn() saat render: angka, atau dict {((label, nilai), ...): nilai}.
+
+        Mendaftar ulang nama yang sama mengganti collector lama (mis. bot dibuat ulang).
+        """
+        self._collectors[name] = fn
+
+    # ------------------------------------------------------------------ render
+    def _collected(self) -> Dict[str, Dict[Labels, float]]:
+        out: Dict[str, Dict[Labels, float]] = {}
+        for name, fn in list(self._collectors.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue  # collector rusak tidak boleh membuat endpoint gagal
+            if value is None:
+                continue
+            series = out.setdefault(name, {})
+            if isinstance(value, dict):
+                for labels, v in value.items():
+                    if v is None:
+                        continue
+                    series[tuple(labels)] = float(v)
+            else:
+                series[()] = float(value)
+        return out
+
+    def render(self) -> str:
+        collected = self._collected()
+        with self._lock:
+            values = {name: dict(series) for name, series in self._values.items()}
+            histograms = {name: {k: (list(h.counts), h.sum, h.count) for k, h in series.items()}
+                          for name, series in self._histograms.items()}
+        for name, series in collected.items():
+            values.setdefault(name, {}).update(series)
+
+        lines = []
+        for name in sorted(set(values) | set(histograms)):
+            kind, help_text = self.catalog.get(name, ('histogram' if name in histograms else 'untyped', ''))
+            if help_text:
+                lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(values.get(name, {}).items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for labels, (counts, total, count) in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{_format_labels(labels, ("le", _format_value(bound)))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+
+
+def observe_job(name: str, seconds: float, budget: Optional[float] = None, registry: MetricsRegistry = METRICS) -> None:
+    """Catat durasi job/siklus; hitung overrun bila melewati `budget` (interval job)."""
+    registry.observe('cuanbot_job_seconds', seconds, job=name)
+    registry.set('cuanbot_job_last_seconds', seconds, job=name)
+    if budget and seconds > budget:
+        registry.inc('cuanbot_job_overruns_total', job=name)
+
+
+# ------------------------------------------------------------------ exchange
+def endpoint_label(url: str, body=None) -> str:
+    """Path endpoint tanpa parameter pair, mis. 'api/ticker', 'tradingview/history_v2', 'tapi/trade'."""
+    path = urlparse(url).path.strip('/')
+    if path.endswith('tapi'):
+        method = ''
+        if body:
+            text = body.decode() if isinstance(body, bytes) else str(body)
+            method = (parse_qs(text).get('method') or [''])[0]
+        return f'tapi/{method}' if method else 'tapi'
+    if path.startswith('api/ticker/'):
+        return 'api/ticker'
+    return path
+
+
+def instrument_exchange(exchange, registry: MetricsRegistry = METRICS):
+    """Catat latensi & error setiap request HTTP instance ccxt (sync atau async_support)."""
+    fetch = exchange.fetch
+
+    if asyncio.iscoroutinefunction(type(exchange).fetch):
+        async def instrumented_fetch(url, method='GET', headers=None, body=None):
+            endpoint = endpoint_label(url, body)
+            started = time.perf_counter()
+            try:
+                return await fetch(url, method, headers, body)
+            except Exception as e:
+                registry.inc('cuanbot_exchange_errors_total', endpoint=endpoint, error=type(e).__name__)
+                raise
+            finally:
+                registry.observe('cuanbot_exchange_request_seconds', time.perf_counter() - started, endpoint=endpoint)
+    else:
+        def instrumented_fetch(url, method='GET', headers=None, body=None):
+            endpoint = endpoint_label(url, body)
+            started = time.perf_counter()
+            try:
+                return fetch(url, method, headers, body)
+            except Exception as e:
+                registry.inc('cuanbot_exchange_errors_total', endpoint=endpoint, error=type(e).__name__)
+                raise
+            finally:
+                registry.observe('cuanbot_exchange_request_seconds', time.perf_counter() - started, endpoint=endpoint)
+    exchange.fetch = instrumented_fetch
+    return exchange
+
+
+# Statistik cache yang dihitung sebagai "hit" / "miss" (CandleStore: ambil inkremental / penuh)
+_CACHE_RESULTS = {'hits': 'hit', 'misses': 'miss', 'incremental_fetch': 'hit', 'full_fetch': 'miss'}
+
+
+def register_cache_metrics(registry: MetricsRegistry = METRICS, **caches) -> None:
+    """Collector hit/miss + rasio hit untuk objek ber-`stats` (TickerCache, BalanceCache, CandleStore)."""
+    caches = {name: cache for name, cache in caches.items() if cache is not None}
+
+    def counts():
+        out = {}
+        for name, cache in caches.items():
+            for key, result in _CACHE_RESULTS.items():
+                if key in cache.stats:
+                    out[(('cache', name), ('result', result))] = cache.stats[key]
+        return out
+
+    def ratios():
+        out = {}
+        for (cache, result), value in counts().items():
+            hit, total = out.get((cache,), (0, 0))
+            out[(cache,)] = (hit + (value if result[1] == 'hit' else 0), total + value)
+        return {labels: hit / total for labels, (hit, total) in out.items() if total}
+
+    registry.collect('cuanbot_cache_requests_total', counts)
+    registry.collect('cuanbot_cache_hit_ratio', ratios)
+
+
+def register_rate_limit_metrics(bucket, registry: MetricsRegistry = METRICS) -> None:
+    registry.collect('cuanbot_rate_limit_requests_total', lambda: bucket.stats['requests'])
+    registry.collect('cuanbot_rate_limit_waits_total', lambda: bucket.stats['waits'])
+    registry.collect('cuanbot_rate_limit_wait_seconds_total', lambda: bucket.stats['wait_seconds'])
+
+
+# ------------------------------------------------------------------ ekspor
+class MetricsServer:
+    """Endpoint HTTP `/metrics` di thread latar."""
+
+    def __init__(self, registry: MetricsRegistry = METRICS, host: str = '127.0.0.1', port: int = 9108):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if urlparse(self.path).path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-http', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/metrics'
+
+    def start(self) -> 'MetricsServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MetricsFileWriter:
+    """Tulis render() ke `path` tiap `interval` detik (file sementara + os.replace)."""
+
+    def __init__(self, path: str, registry: MetricsRegistry = METRICS, interval: float = 15.0):
+        self.path = path
+        self.registry = registry
+        self.interval = max(1.0, float(interval))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='metrics-file', daemon=True)
+
+    def start(self) -> 'MetricsFileWriter':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.write()
+
+    def write(self) -> None:
+        tmp = f'{self.path}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(self.registry.render())
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # metrik tidak boleh menghentikan bot
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
@@ -0,0 +1,202 @@
+"""optimize.py
+Parameter sweep + walk-forward untuk strategi hybrid_bot_v7 di atas backtest.py.
+
+- Ruang parameter: grid nilai per field BacktestParams/BotConfig
+  (mis. `atr_multiplier_for_sl=1.5,2,2.5`); `--random N` mengambil N
+  kombinasi acak dari grid yang sama.
+- Setiap kombinasi di-backtest di seluruh riwayat oleh worker ProcessPool
+  (semua core). Array candle semua pair dimuat sekali ke SharedMemory;
+  worker hanya memetakan view NumPy read-only, tidak ada DataFrame yang
+  di-pickle per task.
+- Walk-forward: riwayat dibagi `--folds`+1 segmen waktu berurutan. Fold i
+  memilih kombinasi terbaik di segmen i (in-sample) lalu mencatat hasilnya
+  di segmen i+1 (out-of-sample). Trade dibagi ke segmen menurut waktu entry,
+  jadi indikator tidak perlu warm-up ulang di tiap batas segmen.
+- Tabel peringkat diurutkan menurut hasil out-of-sample yang sungguhan: untuk tiap
+  kombinasi, `wf_oos_<metric>` = rata-rata hasil di segmen i+1 pada fold-fold
+  di mana kombinasi itu terpilih di segmen i. Kombinasi yang tidak pernah
+  terpilih tidak punya angka OOS (NaN) dan diurutkan di bawah, menurut hasil
+  seluruh riwayat (in-sample).
+
+Pemakaian:
+    python optimize.py data_ohlcv/ --grid atr_multiplier_for_sl=1.5,2,2.5 \\
+        --grid take_profit_1_rr=1,1.5,2 --folds 4 --output optimize_results.csv
+"""
+
+import argparse
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import BacktestParams, BacktestResult, load_ohlcv, run_backtest
+
+PARAM_FIELDS = {f.name: f.type for f in fields(BacktestParams)}
+
+# State worker (diisi _init_worker di tiap proses)
+_WORKER: Dict[str, object] = {}
+
+
+class SharedCandles:
+    """Semua array candle (n, 6) digabung dalam satu blok SharedMemory + indeks per pair."""
+
+    def __init__(self, data: Dict[str, np.ndarray]):
+        total = sum(len(c) for c in data.values())
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, total * 6 * 8))
+        block = np.ndarray((total, 6), dtype=np.float64, buffer=self.shm.buf)
+        self.index: List[Tuple[str, int, int]] = []
+        start = 0
+        for pair, candles in data.items():
+            block[start:start + len(candles)] = candles
+            self.index.append((pair, start, start + len(candles)))
+            start += len(candles)
+        self.shape = (total, 6)
+
+    def handle(self):
+        return self.shm.name, self.shape, self.index
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _init_worker(handle, timeframe, portfolio):
+    name, shape, index = handle
+    shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+    _WORKER.update(shm=shm, timeframe=timeframe, portfolio=portfolio,
+                   data={pair: block[start:end] for pair, start, end in index})
+
+
+def _run_task(params: BacktestParams) -> Tuple[BacktestParams, List]:
+    result = run_backtest(_WORKER['data'], params, _WORKER['timeframe'], _WORKER['portfolio'])
+    return params, result.trades
+
+
+def parse_grid(items: Sequence[str]) -> Dict[str, list]:
+    grid = {}
+    for item in items:
+        name, _, raw = item.partition('=')
+        name = name.strip()
+        if name not in PARAM_FIELDS:
+            raise ValueError(f"Parameter tidak dikenal: {name}")
+        cast = int if PARAM_FIELDS[name] is int else float
+        grid[name] = [cast(v) for v in raw.split(',') if v.strip()]
+    return grid
+
+
+def build_candidates(base: BacktestParams, grid: Dict[str, list], samples: int = 0,
+                     seed: Optional[int] = None) -> List[BacktestParams]:
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    combos = [c for c in combos
+              if c.get('m15_ema_fast', base.m15_ema_fast) < c.get('m15_ema_slow', base.m15_ema_slow)]
+    if samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    return [replace(base, **c) for c in combos]
+
+
+def segment_bounds(data: Dict[str, np.ndarray], segments: int) -> np.ndarray:
+    start = min(c[0, 0] for c in data.values() if len(c))
+    end = max(c[-1, 0] for c in data.values() if len(c)) + 1
+    return np.linspace(start, end, segments + 1)
+
+
+def segment_metrics(params: BacktestParams, trades: List, bounds: np.ndarray) -> List[Dict[str, float]]:
+    entry = np.array([t.entry_time for t in trades], dtype=float)
+    seg = np.searchsorted(bounds, entry, side='right') - 1
+    return [BacktestResult(params, [t for t, s in zip(trades, seg) if s == i]).summary()
+            for i in range(len(bounds) - 1)]
+
+
+def optimize(data: Dict[str, np.ndarray], candidates: List[BacktestParams], timeframe: str = '15m',
+             portfolio: Optional[dict] = None, folds: int = 4, metric: str = 'total_pnl_idr',
+             workers: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Kembalikan (tabel peringkat semua kombinasi, ringkasan walk-forward per fold)."""
+    bounds = segment_bounds(data, folds + 1)
+    varied = [n for n in PARAM_FIELDS if len({getattr(p, n) for p in candidates}) > 1]
+    shared = SharedCandles(data)
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(shared.handle(), timeframe, portfolio)) as pool:
+            results = list(pool.map(_run_task, candidates, chunksize=1))
+    finally:
+        shared.close()
+
+    per_segment = [segment_metrics(params, trades, bounds) for params, trades in results]
+
+    # Walk-forward: fold i memilih di segmen i, dinilai di segmen i+1 (setelah jendela training)
+    walk, selected = [], {}
+    for fold in range(folds):
+        best = max(range(len(results)), key=lambda i: per_segment[i][fold][metric])
+        params = results[best][0]
+        selected.setdefault(best, []).append(fold)
+        walk.append({'fold': fold + 1, **{n: getattr(params, n) for n in varied},
+                     'is_' + metric: per_segment[best][fold][metric],
+                     'oos_' + metric: per_segment[best][fold + 1][metric],
+                     'oos_trades': per_segment[best][fold + 1]['trades']})
+
+    rows = []
+    for i, (params, trades) in enumerate(results):
+        total = BacktestResult(params, trades).summary()
+        row = {n: getattr(params, n) for n in varied}
+        row.update({k: total[k] for k in ('trades', 'win_rate', 'total_pnl_idr', 'profit_factor', 'max_drawdown_idr')})
+        row[metric] = total[metric]  # seluruh riwayat = in-sample
+        picked = selected.get(i, [])
+        row['wf_folds_selected'] = len(picked)
+        row['wf_is_' + metric] = float(np.mean([per_segment[i][f][metric] for f in picked])) if picked else np.nan
+        row['wf_oos_' + metric] = float(np.mean([per_segment[i][f + 1][metric] for f in picked])) if picked else np.nan
+        rows.append(row)
+    table = (pd.DataFrame(rows)
+             .sort_values(['wf_oos_' + metric, metric], ascending=False, na_position='last')
+             .reset_index(drop=True))
+    table.index += 1
+    return table, pd.DataFrame(walk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parameter sweep / walk-forward strategi hybrid_bot_v7.')
+    parser.add_argument('data_dir', help='folder berisi <BASE>_<QUOTE>_<timeframe>.csv')
+    parser.add_argument('--recorded', action='store_true', help='data_dir adalah folder rekaman MarketRecorder')
+    parser.add_argument('--timeframe', default='15m')
+    parser.add_argument('--pairs', default='', help='daftar pair dipisah koma (default semua file)')
+    parser.add_argument('--grid', action='append', default=[], help="nama=v1,v2,... (boleh diulang)")
+    parser.add_argument('--random', type=int, default=0, help='jumlah kombinasi acak dari grid (0 = seluruh grid)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--folds', type=int, default=4)
+    parser.add_argument('--metric', default='total_pnl_idr', choices=['total_pnl_idr', 'profit_factor', 'win_rate', 'avg_return_pct'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fee-percent', type=float, default=0.0)
+    parser.add_argument('--no-portfolio-limits', action='store_true')
+    parser.add_argument('--output', default='optimize_results.csv')
+    args = parser.parse_args(argv)
+
+    from hybrid_bot_v7_patched import CONFIG
+    base = BacktestParams.from_config(CONFIG, fee_percent=args.fee_percent)
+    portfolio = None if args.no_portfolio_limits else {
+        'max_open_positions': CONFIG.max_open_positions,
+        'sector_mapping': CONFIG.sector_mapping,
+        'max_positions_per_sector': CONFIG.max_positions_per_sector,
+    }
+    pairs = [p.strip() for p in args.pairs.split(',') if p.strip()]
+    data = load_ohlcv(args.data_dir, args.timeframe, pairs or None, args.recorded)
+    candidates = build_candidates(base, parse_grid(args.grid), args.random, args.seed)
+    print(f"Pair: {len(data)} | Kombinasi: {len(candidates)} | Fold: {args.folds}")
+
+    table, walk = optimize(data, candidates, args.timeframe, portfolio, args.folds, args.metric, args.workers)
+    table.to_csv(args.output, index_label='rank')
+    print(table.head(20).to_string())
+    print("\nWalk-forward:")
+    print(walk.to_string(index=False))
+    print(f"\nTabel lengkap disimpan ke {args.output}")
+
+
+if __name__ == '__main__':
+    main()
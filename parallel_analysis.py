@@ -0,0 +1,138 @@
+"""parallel_analysis.py
+Analisa kandidat paralel untuk ProfessionalBot.process_candidates (PARALLEL_ANALYSIS=True).
+
+Alur satu batch kandidat:
+1. Candle H1 semua kandidat diambil bersamaan (thread pool, tetap lewat
+   CandleStore dan RATE_LIMITER bot).
+2. Indikator + filter tren H1 dihitung di ProcessPool, jadi pekerjaan
+   pandas_ta tidak lagi memegang GIL proses utama.
+3. Candle M15 diambil bersamaan hanya untuk pair yang lolos tren H1, lalu
+   sinyal M15 dievaluasi di ProcessPool.
+4. Hasil dikembalikan sesuai urutan kandidat; eksekusi order dan perubahan
+   state tetap di thread utama (process_candidates).
+
+Jumlah request per pair sama dengan analisa berurutan. Bila IndicatorEngine
+aktif, state inkremental (pair, timeframe) ikut dikirim ke worker dan hasilnya
+digabung kembali, sehingga nilai indikator identik dengan jalur berurutan.
+Pair yang state-nya sudah hangat (hanya beberapa bar baru) dihitung langsung
+di proses utama: biayanya lebih kecil dari pickling ke worker. Dengan satu
+worker (mis. mesin 1 core) semua evaluasi juga dijalankan langsung.
+Dengan BATCH_SIGNALS=True evaluasi tidak memakai worker sama sekali: candle
+semua kandidat ditumpuk dan dievaluasi sekaligus oleh batch_signals.py di
+proses utama. IndicatorEngine tidak di-update untuk pair tersebut; nilainya
+tetap sama karena engine selalu menghitung atas jendela candle yang diberikan.
+Worker dibuat dengan konteks 'spawn' (aman walau proses utama punya thread
+lain, mis. endpoint metrics) dan dipakai ulang selama bot berjalan.
+"""
+
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from batch_signals import h1_trend, m15_signals, stack_candles
+from metrics import METRICS
+from strategy_params import StrategyParams
+
+# Maksimum bar baru yang masih dihitung di proses utama bila IndicatorEngine aktif
+INLINE_BACKLOG = 8
+
+
+def _evaluate_pair(task):
+    bot_cls, pair, timeframe, candles, plan, engine, evaluator = task
+    rows = bot_cls._rows_for(engine, pair, timeframe, candles, plan)
+    return getattr(bot_cls, evaluator)(rows), engine
+
+
+class ParallelAnalyzer:
+    def __init__(self, bot, workers: int = 0, fetch_concurrency: int = 8, vectorized: bool = False):
+        self.bot = bot
+        # Worker hanya bisa memuat kelas yang bisa di-import (bukan subclass lokal, mis. di replay/benchmark)
+        self.bot_cls = next(cls for cls in type(bot).__mro__ if '<locals>' not in cls.__qualname__)
+        self.workers = workers or os.cpu_count() or 1
+        self.fetch_concurrency = max(1, int(fetch_concurrency))
+        self.vectorized = vectorized
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {'batches': 0, 'pairs': 0, 'signals': 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def analyze(self, pairs: Sequence[str]) -> List[Tuple[str, Optional[tuple]]]:
+        """[(pair, (entry_price, atr) atau None)] sesuai urutan `pairs`."""
+        s = self._settings()
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return []
+        with METRICS.time('cuanbot_engine_seconds', engine='parallel_analysis'):
+            h1 = self._fetch(pairs, s.H1_TIMEFRAME)
+            if self.vectorized:
+                params = self._batch_params(s)
+                trend = dict(zip(h1, h1_trend(stack_candles(h1)[1], params)))
+            else:
+                trend = self._evaluate(h1, s.H1_TIMEFRAME, s.H1_TREND_PLAN, '_h1_trend_ok')
+            trending = [pair for pair in pairs if trend.get(pair)]
+            m15 = self._fetch(trending, s.M15_TIMEFRAME)
+            if self.vectorized:
+                signals = dict(m15_signals(*stack_candles(m15), params).signals()) if m15 else {}
+            else:
+                signals = self._evaluate(m15, s.M15_TIMEFRAME, s.M15_SIGNAL_PLAN, '_evaluate_m15_signal')
+        self.stats['batches'] += 1
+        self.stats['pairs'] += len(pairs)
+        self.stats['signals'] += sum(1 for v in signals.values() if v)
+        return [(pair, signals.get(pair)) for pair in pairs]
+
+    def _settings(self):
+        # Modul bot bisa berjalan sebagai __main__, jadi konstanta diambil dari modul kelasnya
+        return sys.modules[self.bot_cls.__module__]
+
+    @staticmethod
+    def _batch_params(s) -> StrategyParams:
+        # Dari konstanta modul (bukan CONFIG) agar override benchmark/replay ikut terpakai
+        return StrategyParams(h1_ema_period=s.H1_EMA_PERIOD, m15_ema_fast=s.M15_EMA_FAST,
+                              m15_ema_slow=s.M15_EMA_SLOW, volume_avg_period=s.VOLUME_AVG_PERIOD,
+                              atr_period=s.ATR_PERIOD, stoch_rsi_period=s.STOCH_RSI_PERIOD)
+
+    def _fetch(self, pairs: Sequence[str], timeframe: str) -> Dict[str, Optional[list]]:
+        if not pairs:
+            return {}
+
+        def fetch(pair):
+            try:
+                return self.bot._fetch_ohlcv(pair, timeframe, 100)
+            except Exception:
+                return None  # sama seperti get_latest_indicators: pair dilewati
+
+        with ThreadPoolExecutor(max_workers=min(self.fetch_concurrency, len(pairs)),
+                                thread_name_prefix='ohlcv') as threads:
+            return dict(zip(pairs, threads.map(fetch, pairs)))
+
+    def _evaluate(self, candles: Dict[str, Optional[list]], timeframe: str, plan, evaluator: str) -> Dict[str, object]:
+        engine = getattr(self.bot, 'indicator_engine', None)
+        evaluate = getattr(self.bot_cls, evaluator)
+        results, tasks = {}, []
+        for pair, data in candles.items():
+            if not data:
+                continue
+            if self.workers < 2 or (engine is not None and engine.backlog(pair, timeframe, data, plan) <= INLINE_BACKLOG):
+                results[pair] = evaluate(self.bot_cls._rows_for(engine, pair, timeframe, data, plan))
+                continue
+            part = engine.extract(pair, timeframe, plan) if engine is not None else None
+            tasks.append((self.bot_cls, pair, timeframe, data, plan, part, evaluator))
+        if not tasks:
+            return results
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        for task, (result, part) in zip(tasks, self._executor().map(_evaluate_pair, tasks, chunksize=chunksize)):
+            if part is not None:
+                engine.merge(part)
+            results[task[1]] = result
+        return results
@@ -0,0 +1,221 @@
+"""position_journal.py
+Jurnal posisi append-only (write-ahead) untuk hybrid_bot_v7_patched.py.
+
+Setiap perubahan posisi ditulis sebagai satu baris delta ringkas ke
+`<STATE_FILE>.journal`, jadi biaya tulis per update konstan berapa pun jumlah
+posisi terbuka:
+
+    <crc32 hex> {"op":"open","pair":"BTC/IDR","pos":{...}}
+    <crc32 hex> {"op":"set","pair":"BTC/IDR","f":{"sl_price":...,"highest_price":...}}
+    <crc32 hex> {"op":"close","pair":"BTC/IDR"}
+
+Delta selalu berisi nilai absolut (bukan selisih), sehingga memutar ulang
+jurnal di atas snapshot yang sudah memuat sebagian record hasilnya tetap sama.
+
+Durabilitas:
+- Baris langsung diteruskan ke OS (flush), jadi aman bila proses mati.
+- fsync dibatch: record `open`/`close`/TP1 (terkait order) di-fsync saat itu
+  juga, update trailing stop paling lambat setelah `fsync_interval` detik
+  atau saat sync() dipanggil (akhir siklus cek posisi).
+
+Kompaksi: setelah `snapshot_every` record, posisi ditulis penuh ke STATE_FILE
+(file sementara + fsync + os.replace, format list JSON yang sama dengan versi
+lama) lalu jurnal dikosongkan.
+
+Pemulihan (load): snapshot dibaca, lalu record jurnal diputar ulang sampai
+baris terakhir yang utuh (diakhiri newline dan CRC cocok). Ekor yang terpotong
+dipangkas, lalu hasilnya langsung dikompaksi, sehingga pemulihan yang terputus
+di tengah bisa diulang dengan hasil yang sama.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+def journal_path(state_file: str) -> str:
+    return state_file + '.journal'
+
+
+def _encode(record: dict) -> bytes:
+    payload = json.dumps(record, separators=(',', ':'), default=float).encode('utf-8')
+    return b'%08x %s\n' % (zlib.crc32(payload), payload)
+
+
+def _decode(line: bytes) -> Optional[dict]:
+    if not line.endswith(b'\n') or len(line) < 10 or line[8:9] != b' ':
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def _apply(positions: Dict[str, dict], record: dict) -> None:
+    op, pair = record.get('op'), record.get('pair')
+    if op == 'open':
+        positions[pair] = dict(record['pos'])
+    elif op == 'set' and pair in positions:
+        positions[pair].update(record['f'])
+    elif op == 'close':
+        positions.pop(pair, None)
+
+
+def _read_snapshot(state_file: str) -> Tuple[Dict[str, dict], Optional[str]]:
+    if not os.path.exists(state_file):
+        return {}, None
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+        data = json.loads(content) if content else []
+        if not isinstance(data, list):
+            return {}, 'snapshot bukan list'
+    except (OSError, ValueError) as e:
+        return {}, str(e)
+    return {p['pair']: p for p in data if isinstance(p, dict) and 'pair' in p}, None
+
+
+def _read_journal(path: str, positions: Dict[str, dict]) -> Tuple[int, int, int]:
+    """Putar ulang record utuh ke `positions`; kembalikan (record, offset valid, byte ekor rusak)."""
+    if not os.path.exists(path):
+        return 0, 0, 0
+    records = good = 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    for line in data.splitlines(keepends=True):
+        record = _decode(line)
+        if record is None:
+            break  # record setelah baris rusak tidak bisa dipercaya urutannya
+        _apply(positions, record)
+        records += 1
+        good += len(line)
+    return records, good, len(data) - good
+
+
+def read_positions(state_file: str) -> List[dict]:
+    """Posisi terkini (snapshot + jurnal) tanpa mengubah file, mis. untuk UI."""
+    positions, error = _read_snapshot(state_file)
+    if error:
+        raise ValueError(f'STATE_FILE rusak: {error}')
+    _read_journal(journal_path(state_file), positions)
+    return list(positions.values())
+
+
+class PositionJournal:
+    def __init__(self, state_file: str, fsync_interval: float = 1.0, snapshot_every: int = 1000):
+        self.state_file = state_file
+        self.path = journal_path(state_file)
+        self.fsync_interval = float(fsync_interval)
+        self.snapshot_every = max(1, int(snapshot_every))
+        self._positions: Dict[str, dict] = {}
+        self._file = None
+        self._records = 0
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {'records': 0, 'fsyncs': 0, 'snapshots': 0, 'replayed': 0, 'torn_bytes': 0}
+        self.recovery_error: Optional[str] = None
+
+    def load(self) -> List[dict]:
+        """Pulihkan posisi dari snapshot + jurnal, lalu kompaksi. Dipanggil sekali saat start."""
+        with self._lock:
+            positions, error = _read_snapshot(self.state_file)
+            if error:
+                # Snapshot lama (ditulis non-atomik) rusak: simpan salinannya, lanjut dari jurnal
+                self.recovery_error = error
+                os.replace(self.state_file, f'{self.state_file}.corrupt-{int(time.time())}')
+            records, _, torn = _read_journal(self.path, positions)
+            self.stats['replayed'] = records
+            self.stats['torn_bytes'] = torn
+            self._positions = positions
+            self._compact()
+            return [dict(p) for p in positions.values()]
+
+    def open(self, position: dict) -> None:
+        self._append({'op': 'open', 'pair': position['pair'], 'pos': position}, durable=True)
+
+    def update(self, position: dict, *fields: str, durable: bool = False) -> None:
+        self._append({'op': 'set', 'pair': position['pair'], 'f': {k: position[k] for k in fields}}, durable)
+
+    def close(self, position: dict) -> None:
+        self._append({'op': 'close', 'pair': position['pair']}, durable=True)
+
+    def _append(self, record: dict, durable: bool) -> None:
+        line = _encode(record)
+        with self._lock:
+            _apply(self._positions, record)
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            self._file.write(line)
+            self._file.flush()
+            self._dirty = True
+            self._records += 1
+            self.stats['records'] += 1
+            if durable or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._fsync()
+            if self._records >= self.snapshot_every:
+                self._compact()
+
+    def sync(self) -> None:
+        """fsync record yang belum di-fsync (batch update trailing stop)."""
+        with self._lock:
+            if self._dirty:
+                self._fsync()
+
+    def snapshot(self, positions: Optional[List[dict]] = None) -> None:
+        """Tulis snapshot penuh sekarang dan kosongkan jurnal (opsional ganti isi posisi)."""
+        with self._lock:
+            if positions is not None:
+                self._positions = {p['pair']: dict(p) for p in positions}
+            self._compact()
+
+    def shutdown(self) -> None:
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _fsync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self.stats['fsyncs'] += 1
+
+    def _compact(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.state_file))
+        tmp = f'{self.state_file}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(list(self._positions.values()), f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_file)
+        _fsync_dir(directory)
+        # Jurnal baru dikosongkan setelah snapshot aman di disk; crash di antaranya hanya
+        # memutar ulang record yang sudah termuat di snapshot (hasil sama)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, 'wb')
+        os.fsync(self._file.fileno())
+        self._records = 0
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self.stats['snapshots'] += 1
+
+
+def _fsync_dir(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # mis. Windows: direktori tidak bisa dibuka untuk fsync
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
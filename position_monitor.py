@@ -0,0 +1,72 @@
+"""position_monitor.py
+Jadwal cek harga adaptif per posisi untuk hybrid_bot_v7_patched.py.
+
+Jarak harga ke trigger terdekat (sl_price, atau tp1_price bila TP1 belum
+tercapai) diukur dalam satuan ATR. Posisi yang dekat trigger dicek tiap
+beberapa detik, posisi yang jauh jarang dicek:
+
+    interval = min + (max - min) * clamp(jarak_atr / far_atr, 0, 1) ** 2
+
+Total cek per menit dibatasi `budget_per_minute`; bila jumlah 60/interval
+semua posisi melebihi budget, semua interval diperbesar dengan faktor yang
+sama (urutan prioritas tetap). Default 5 = loop lama dengan 5 posisi, satu
+fetch_ticker per posisi per 60 detik (bot menghitungnya dari
+MAX_OPEN_POSITIONS dan POSITION_CHECK_INTERVAL).
+"""
+
+import time
+from typing import Dict, List, Optional
+
+
+class PositionMonitor:
+    def __init__(self, min_interval: float = 3.0, max_interval: float = 120.0,
+                 far_atr: float = 4.0, budget_per_minute: float = 5.0,
+                 clock=None):
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.far_atr = float(far_atr)
+        self.budget_per_minute = float(budget_per_minute)
+        self.clock = clock or time.monotonic
+        self._raw_interval: Dict[str, float] = {}
+        self._next_check: Dict[str, float] = {}
+
+    def due(self, positions: List[dict]) -> List[dict]:
+        """Posisi yang waktunya dicek sekarang (posisi baru selalu langsung dicek)."""
+        now = self.clock()
+        open_pairs = {p['pair'] for p in positions}
+        for pair in list(self._next_check):
+            if pair not in open_pairs:
+                self.forget(pair)
+        return [p for p in positions if self._next_check.get(p['pair'], 0.0) <= now]
+
+    def schedule(self, position: dict, price: float, atr: Optional[float] = None) -> float:
+        """Jadwalkan cek berikutnya dari harga terakhir, kembalikan interval (detik)."""
+        pair = position['pair']
+        self._raw_interval[pair] = self._interval_for(position, price, atr)
+        interval = self._raw_interval[pair] * self._budget_factor()
+        self._next_check[pair] = self.clock() + interval
+        return interval
+
+    def retry_soon(self, pair: str) -> None:
+        self._next_check[pair] = self.clock() + self.min_interval
+
+    def forget(self, pair: str) -> None:
+        self._raw_interval.pop(pair, None)
+        self._next_check.pop(pair, None)
+
+    def _interval_for(self, position: dict, price: float, atr: Optional[float]) -> float:
+        atr = atr or position.get('atr') or 0.0
+        if atr <= 0:
+            # Posisi lama tanpa ATR: perkiraan 2% harga
+            atr = float(price) * 0.02
+        distance = float(price) - float(position['sl_price'])
+        if not position.get('tp1_hit'):
+            distance = min(distance, float(position['tp1_price']) - float(price))
+        ratio = min(1.0, max(0.0, distance / atr / self.far_atr))
+        return self.min_interval + (self.max_interval - self.min_interval) * ratio ** 2
+
+    def _budget_factor(self) -> float:
+        load = sum(60.0 / i for i in self._raw_interval.values() if i > 0)
+        if self.budget_per_minute <= 0 or load <= self.budget_per_minute:
+            return 1.0
+        return load / self.budget_per_minute
@@ -0,0 +1,149 @@
+"""rate_limiter.py
+Token bucket bersama untuk semua panggilan API Indodax.
+
+Satu budget request dipakai oleh bot (sync maupun async) dan UI. Bila
+`path` diisi, state bucket disimpan di file lokal yang dikunci (flock /
+msvcrt), sehingga proses bot dan proses ui_hybrid_bot.py berbagi budget
+yang sama. Tanpa `path`, bucket hanya berlaku di dalam satu proses.
+
+Bobot per endpoint memakai tabel `cost` milik ccxt (Indodax: public 5,
+private 4, rateLimit 50 ms -> 20 unit/detik), dan bisa ditimpa per path
+lewat `endpoint_weights`. Limiter dipasang dengan mengganti `throttle`
+milik instance ccxt, jadi setiap request HTTP (termasuk endpoint implisit
+seperti publicGetApiSummaries) melewati bucket ini.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class TokenBucket:
+    """Token bucket dengan reservasi: token boleh minus, pemanggil menunggu sampai lunas."""
+
+    def __init__(self, rate: float, capacity: float, path: Optional[str] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.path = path
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self.stats = {'requests': 0, 'weight': 0.0, 'waits': 0, 'wait_seconds': 0.0}
+
+    def reserve(self, weight: float = 1.0) -> float:
+        """Ambil `weight` token, kembalikan lama (detik) yang harus ditunggu sebelum request."""
+        with self._lock:
+            if self.path:
+                wait = self._reserve_shared(weight)
+            else:
+                self._tokens, self._updated = self._take(self._tokens, self._updated, weight)
+                wait = max(0.0, -self._tokens / self.rate)
+            self.stats['requests'] += 1
+            self.stats['weight'] += weight
+            if wait > 0:
+                self.stats['waits'] += 1
+                self.stats['wait_seconds'] += wait
+            return wait
+
+    def acquire(self, weight: float = 1.0) -> float:
+        wait = self.reserve(weight)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, weight: float = 1.0) -> float:
+        wait = self.reserve(weight)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def _take(self, tokens: float, updated: float, weight: float):
+        now = time.time()
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        return tokens - weight, now
+
+    def _reserve_shared(self, weight: float) -> float:
+        with open(self.path, 'a+', encoding='utf-8') as f:
+            _lock_file(f)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or '{}')
+                except ValueError:
+                    state = {}
+                tokens, updated = self._take(float(state.get('tokens', self.capacity)),
+                                             float(state.get('updated', time.time())), weight)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({'tokens': tokens, 'updated': updated}))
+                f.flush()
+            finally:
+                _unlock_file(f)
+        return max(0.0, -tokens / self.rate)
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(0.01)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def install_rate_limiter(exchange, bucket: TokenBucket, endpoint_weights: Optional[Dict[str, float]] = None):
+    """Arahkan throttle ccxt (sync atau async_support) ke `bucket`."""
+    exchange.enableRateLimit = True
+    if endpoint_weights:
+        default_cost = exchange.calculate_rate_limiter_cost
+
+        def calculate_rate_limiter_cost(api, method, path, params, config={}):
+            if path in endpoint_weights:
+                return endpoint_weights[path]
+            return default_cost(api, method, path, params, config)
+
+        exchange.calculate_rate_limiter_cost = calculate_rate_limiter_cost
+
+    if asyncio.iscoroutinefunction(type(exchange).throttle):
+        async def throttle(cost=None):
+            await bucket.acquire_async(1 if cost is None else cost)
+    else:
+        def throttle(cost=None):
+            bucket.acquire(1 if cost is None else cost)
+    exchange.throttle = throttle
+    return exchange
+
+
+def parse_endpoint_weights(raw: str) -> Dict[str, float]:
+    """Format env: 'api/ticker_all=10,tradingview/history_v2=8'."""
+    weights = {}
+    for item in (raw or '').split(','):
+        if '=' not in item:
+            continue
+        path, value = item.split('=', 1)
+        try:
+            weights[path.strip()] = float(value)
+        except ValueError:
+            continue
+    return weights
+
@@ -0,0 +1,378 @@
+"""replay.py
+Replay deterministik ProfessionalBot dari data rekaman MarketRecorder.
+
+- ReplayExchange menyediakan antarmuka ccxt yang dipakai bot
+  (load_markets, fetch_ticker(s), fetch_ohlcv, fetch_balance, fetch_time,
+  publicGetApiSummaries, order) dari file rekaman, tanpa jaringan.
+  Data yang dikembalikan hanya yang sudah "terjadi" menurut jam virtual:
+  candle closed s/d waktu sekarang + bar berjalan yang dibangun dari candle
+  closed di dalamnya dan harga terakhir. Timeframe yang tidak direkam
+  (mis. 1h/4h) di-resample dari timeframe dasar.
+- VirtualClock menggantikan time.time / time.monotonic / time.sleep selama
+  replay: sleep hanya memajukan jam, jadi loop ProfessionalBot.run() yang
+  tidak diubah bisa memutar satu minggu data dalam hitungan detik. CPU yang
+  dipakai antar sleep dicatat per bangun (wake) untuk mengukur biaya siklus.
+
+Replay selalu berjalan sebagai SIMULATION_MODE, tanpa Telegram, dengan file
+state & log sendiri.
+
+Pemakaian:
+    python replay.py --data market_data --start 2026-10-01 --days 7
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from market_recorder import MarketRecorder
+from position_journal import journal_path
+from scheduler import timeframe_seconds
+
+_REAL_TIME = time.time
+_REAL_MONOTONIC = time.monotonic
+_REAL_SLEEP = time.sleep
+
+
+class ReplayFinished(BaseException):
+    """Dilempar VirtualClock saat data habis.
+
+    Turunan BaseException (seperti KeyboardInterrupt) supaya tidak tertangkap
+    `except Exception` di loop utama bot dan benar-benar menghentikan run().
+    """
+
+
+class VirtualClock:
+    def __init__(self, start: float, end: Optional[float] = None):
+        self.now = float(start)
+        self.end = end
+        self.cpu_per_wake: List[float] = []
+        self._cpu_mark = time.process_time()
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        cpu = time.process_time()
+        self.cpu_per_wake.append(cpu - self._cpu_mark)
+        self.now += max(0.0, float(seconds))
+        if self.end is not None and self.now >= self.end:
+            raise ReplayFinished()
+        self._cpu_mark = time.process_time()
+
+    @contextlib.contextmanager
+    def installed(self):
+        time.time, time.monotonic, time.sleep = self.time, self.monotonic, self.sleep
+        try:
+            yield self
+        finally:
+            time.time, time.monotonic, time.sleep = _REAL_TIME, _REAL_MONOTONIC, _REAL_SLEEP
+
+
+class ReplayExchange:
+    """Pengganti ccxt.indodax yang membaca rekaman MarketRecorder menurut jam virtual."""
+
+    ticker_max_age_ms = 15 * 60 * 1000  # ticker rekaman lebih tua dari ini diganti harga candle
+
+    def __init__(self, recorder: MarketRecorder, clock: VirtualClock, base_timeframe: str = '15m',
+                 pairs: Optional[List[str]] = None, initial_balance: Optional[Dict[str, float]] = None):
+        self.recorder = recorder
+        self.clock = clock
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_seconds(base_timeframe) * 1000
+        self.pairs = pairs or recorder.pairs('candles', base_timeframe)
+        self.balance = dict(initial_balance or {'IDR': 0.0})
+        self.markets: Dict[str, dict] = {}
+        self.orders: List[dict] = []
+        self.stats: Dict[str, int] = {}
+        self._base = {p: recorder.read_candles(p, base_timeframe) for p in self.pairs}
+        self._tickers = {p: recorder.read_tickers(p) for p in self.pairs}
+        self._resampled: Dict[tuple, np.ndarray] = {}
+
+    def _count(self, name: str) -> None:
+        self.stats[name] = self.stats.get(name, 0) + 1
+
+    def _now_ms(self) -> int:
+        return int(self.clock.now * 1000)
+
+    # ------------------------------------------------------------------ market
+    def load_markets(self, reload: bool = False) -> Dict[str, dict]:
+        self._count('load_markets')
+        if not self.markets:
+            for pair in self.pairs:
+                base, quote = pair.split('/')
+                self.markets[pair] = {
+                    'id': f'{base.lower()}_{quote.lower()}', 'symbol': pair, 'base': base, 'quote': quote,
+                    'active': True, 'precision': {'amount': 8, 'price': 0},
+                    'limits': {'amount': {'min': None}, 'cost': {'min': None}},
+                }
+        return self.markets
+
+    def market(self, pair: str) -> dict:
+        return (self.markets or self.load_markets())[pair]
+
+    def amount_to_precision(self, pair: str, amount: float) -> str:
+        return f'{float(amount):.8f}'
+
+    def price_to_precision(self, pair: str, price: float) -> str:
+        return str(float(price))
+
+    def fetch_time(self) -> int:
+        return self._now_ms()
+
+    # ------------------------------------------------------------------ harga
+    def _price(self, pair: str, now_ms: int) -> Optional[float]:
+        ticker = self._recorded_ticker(pair, now_ms)
+        if ticker is not None:
+            return float(ticker['last'])
+        base = self._base.get(pair)
+        if base is None or not len(base):
+            return None
+        i = np.searchsorted(base['timestamp'], now_ms - self.base_ms, side='right') - 1
+        return float(base['close'][i]) if i >= 0 else None
+
+    def _recorded_ticker(self, pair: str, now_ms: int):
+        records = self._tickers.get(pair)
+        if records is None or not len(records):
+            return None
+        i = np.searchsorted(records['timestamp'], now_ms, side='right') - 1
+        if i < 0 or now_ms - records['timestamp'][i] > self.ticker_max_age_ms:
+            return None
+        return records[i]
+
+    def _ticker(self, pair: str, now_ms: int) -> dict:
+        price = self._price(pair, now_ms)
+        if price is None:
+            raise ValueError(f'Tidak ada data rekaman untuk {pair} pada {now_ms}')
+        ticker = {'symbol': pair, 'timestamp': now_ms, 'last': price, 'close': price,
+                  'bid': None, 'ask': None, 'baseVolume': None, 'quoteVolume': None, 'percentage': None}
+        recorded = self._recorded_ticker(pair, now_ms)
+        if recorded is not None:
+            for key, field in (('bid', 'bid'), ('ask', 'ask'), ('high', 'high'), ('low', 'low'),
+                               ('baseVolume', 'base_volume'), ('quoteVolume', 'quote_volume'),
+                               ('percentage', 'percentage')):
+                value = float(recorded[field])
+                ticker[key] = None if np.isnan(value) else value
+        if ticker['percentage'] is None:
+            open_24h = self._price(pair, now_ms - 86_400_000)
+            if open_24h:
+                ticker['open'] = open_24h
+                ticker['percentage'] = (price - open_24h) / open_24h * 100
+        return ticker
+
+    def fetch_ticker(self, pair: str) -> dict:
+        self._count('fetch_ticker')
+        return self._ticker(pair, self._now_ms())
+
+    def fetch_tickers(self, symbols: Optional[List[str]] = None) -> Dict[str, dict]:
+        self._count('fetch_tickers')
+        now_ms = self._now_ms()
+        tickers = {}
+        for pair in symbols or self.pairs:
+            try:
+                tickers[pair] = self._ticker(pair, now_ms)
+            except ValueError:
+                continue
+        return tickers
+
+    def publicGetApiSummaries(self, params=None) -> dict:
+        self._count('publicGetApiSummaries')
+        now_ms = self._now_ms()
+        prices_24h = {}
+        for pair in self.pairs:
+            price = self._price(pair, now_ms - 86_400_000)
+            if price:
+                prices_24h[self.market(pair)['id'].replace('_', '')] = price
+        return {'tickers': {}, 'prices_24h': prices_24h}
+
+    # ------------------------------------------------------------------ candle
+    def _candles(self, pair: str, timeframe: str) -> np.ndarray:
+        if timeframe == self.base_timeframe:
+            return self._base.get(pair, np.empty(0))
+        key = (pair, timeframe)
+        if key not in self._resampled:
+            recorded = self.recorder.read_candles(pair, timeframe)
+            self._resampled[key] = recorded if len(recorded) else _resample(self._base[pair], timeframe_seconds(timeframe) * 1000)
+        return self._resampled[key]
+
+    def fetch_ohlcv(self, pair: str, timeframe: str = '15m', since: Optional[int] = None,
+                    limit: Optional[int] = None, params=None) -> List[list]:
+        self._count('fetch_ohlcv')
+        now_ms = self._now_ms()
+        tf_ms = timeframe_seconds(timeframe) * 1000
+        candles = self._candles(pair, timeframe)
+        end = np.searchsorted(candles['timestamp'], now_ms - tf_ms, side='right') if len(candles) else 0
+        start = np.searchsorted(candles['timestamp'], since, side='left') if since is not None else 0
+        rows = [list(map(float, row)) for row in candles[start:end].tolist()]
+        for row in rows:
+            row[0] = int(row[0])
+        forming = self._forming_bar(pair, now_ms, tf_ms)
+        if forming is not None and (since is None or forming[0] >= since):
+            rows.append(forming)
+        if limit:
+            rows = rows[:limit] if since is not None else rows[-limit:]
+        return rows
+
+    def _forming_bar(self, pair: str, now_ms: int, tf_ms: int) -> Optional[list]:
+        # Bar berjalan hanya dari candle dasar yang sudah close di dalamnya + harga terakhir (tanpa data masa depan)
+        price = self._price(pair, now_ms)
+        if price is None:
+            return None
+        start = now_ms // tf_ms * tf_ms
+        base = self._base.get(pair)
+        inside = base[(base['timestamp'] >= start) & (base['timestamp'] + self.base_ms <= now_ms)] if base is not None else []
+        if len(inside):
+            return [start, float(inside['open'][0]), max(float(inside['high'].max()), price),
+                    min(float(inside['low'].min()), price), price, float(inside['volume'].sum())]
+        return [start, price, price, price, price, 0.0]
+
+    # ------------------------------------------------------------------ akun
+    def fetch_balance(self, params=None) -> dict:
+        self._count('fetch_balance')
+        balance = {'free': dict(self.balance), 'used': {c: 0.0 for c in self.balance}, 'total': dict(self.balance)}
+        for currency, amount in self.balance.items():
+            balance[currency] = {'free': amount, 'used': 0.0, 'total': amount}
+        return balance
+
+    def _fill(self, pair: str, side: str, amount: float, price: float) -> dict:
+        base, quote = pair.split('/')
+        sign = 1 if side == 'buy' else -1
+        self.balance[base] = self.balance.get(base, 0.0) + sign * amount
+        self.balance[quote] = self.balance.get(quote, 0.0) - sign * amount * price
+        order = {'id': str(len(self.orders) + 1), 'symbol': pair, 'side': side, 'amount': amount,
+                 'price': price, 'filled': amount, 'status': 'closed', 'timestamp': self._now_ms()}
+        self.orders.append(order)
+        return order
+
+    def create_limit_buy_order(self, pair: str, amount: float, price: float, params=None) -> dict:
+        self._count('create_order')
+        return self._fill(pair, 'buy', float(amount), float(price))
+
+    def create_market_sell_order(self, pair: str, amount: float, params=None) -> dict:
+        self._count('create_order')
+        return self._fill(pair, 'sell', float(amount), self._price(pair, self._now_ms()))
+
+
+def _resample(base: np.ndarray, tf_ms: int) -> np.ndarray:
+    """Candle timeframe lebih besar dari candle dasar (hanya bucket yang lengkap sampai bar terakhir)."""
+    if not len(base):
+        return base
+    bucket = base['timestamp'] // tf_ms
+    starts = np.flatnonzero(np.diff(bucket, prepend=bucket[0] - 1) != 0)
+    out = np.empty(len(starts), dtype=base.dtype)
+    out['timestamp'] = bucket[starts] * tf_ms
+    out['open'] = base['open'][starts]
+    out['high'] = np.maximum.reduceat(base['high'], starts)
+    out['low'] = np.minimum.reduceat(base['low'], starts)
+    out['close'] = base['close'][np.append(starts[1:], len(base)) - 1]
+    out['volume'] = np.add.reduceat(base['volume'], starts)
+    return out
+
+
+class _EventCounter(logging.Handler):
+    """Tangkap _log_event bot (OPEN/TP1/CLOSE/...) beserta waktu virtual."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+        self.events: List[tuple] = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        self.events.append((self.clock.now, message.split(' - ', 1)[0], message))
+
+
+def run_replay(data_dir: str, start: Optional[float] = None, days: float = 7.0, base_timeframe: str = '15m',
+               state_file: str = 'replay_positions.json', quiet: bool = True) -> dict:
+    import hybrid_bot_v7_patched as bot_module
+
+    recorder = MarketRecorder(data_dir)
+    pairs = recorder.pairs('candles', base_timeframe)
+    if not pairs:
+        raise ValueError(f'Tidak ada candle {base_timeframe} di {data_dir}')
+    if start is None:
+        # Default: mulai setelah 100 bar pertama agar indikator sudah terbentuk
+        first = min(int(recorder.read_candles(p, base_timeframe)['timestamp'][0]) for p in pairs)
+        start = first / 1000 + 100 * timeframe_seconds(base_timeframe)
+    clock = VirtualClock(start, start + days * 86400)
+
+    # Replay selalu simulasi, tanpa Telegram, dengan state & log terpisah dari bot live
+    for name, value in (('SIMULATION_MODE', True), ('STATE_FILE', state_file), ('RECORD_MARKET_DATA', False),
+                        ('EVENT_DB', ''), ('MARKETS_CACHE_FILE', ''), ('FAST_STARTUP', False),
+                        ('TELEGRAM_TOKEN', None), ('TELEGRAM_CHAT_ID', None)):
+        setattr(bot_module, name, value)
+    for path in (state_file, journal_path(state_file)):
+        if os.path.exists(path):
+            os.remove(path)
+    events = _EventCounter(clock)
+    logger = bot_module.logger
+    saved_handlers, logger.handlers = logger.handlers, [events]
+
+    exchange = ReplayExchange(recorder, clock, base_timeframe, pairs,
+                              initial_balance={'IDR': bot_module.VIRTUAL_INITIAL_IDR})
+
+    class ReplayBot(bot_module.ProfessionalBot):
+        def _init_indodax(self):
+            return exchange
+
+    wall = _REAL_TIME()
+    bot = None
+    try:
+        with contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            stack.callback(bot_module.flush_logs)
+            stack.enter_context(clock.installed())
+            bot = ReplayBot()
+            bot.run()
+    except ReplayFinished:
+        pass
+    finally:
+        logger.handlers = saved_handlers
+
+    cpu = np.array(clock.cpu_per_wake) * 1000
+    counts: Dict[str, int] = {}
+    for _, kind, _ in events.events:
+        counts[kind] = counts.get(kind, 0) + 1
+    return {
+        'pairs': len(pairs),
+        'start': datetime.fromtimestamp(start, tz=timezone.utc).isoformat(),
+        'simulated_days': days,
+        'wall_seconds': _REAL_TIME() - wall,
+        'wakes': len(cpu),
+        'cpu_ms_mean': float(cpu.mean()) if len(cpu) else 0.0,
+        'cpu_ms_p95': float(np.percentile(cpu, 95)) if len(cpu) else 0.0,
+        'cpu_ms_max': float(cpu.max()) if len(cpu) else 0.0,
+        'api_calls': dict(exchange.stats),
+        'events': counts,
+        'open_positions': len(bot.active_positions) if bot is not None else 0,
+        'virtual_idr': bot.virtual_idr if bot is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay deterministik ProfessionalBot dari rekaman MarketRecorder.')
+    parser.add_argument('--data', default='market_data', help='folder rekaman (MARKET_DATA_DIR)')
+    parser.add_argument('--start', default='', help='tanggal mulai UTC, mis. 2026-10-01 (default: awal data + 100 bar)')
+    parser.add_argument('--days', type=float, default=7.0)
+    parser.add_argument('--timeframe', default='15m', help='timeframe dasar yang direkam')
+    parser.add_argument('--state-file', default='replay_positions.json')
+    parser.add_argument('--verbose', action='store_true', help='tampilkan output terminal bot')
+    args = parser.parse_args(argv)
+
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc).timestamp() if args.start else None
+    result = run_replay(args.data, start, args.days, args.timeframe, args.state_file, quiet=not args.verbose)
+    for key, value in result.items():
+        print(f"  {key:<16} {value}")
+
+
+if __name__ == '__main__':
+    main()
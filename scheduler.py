@@ -0,0 +1,113 @@
+"""scheduler.py
+Scheduler job berbasis waktu exchange untuk hybrid_bot_v7_patched.py.
+
+Menggantikan loop `time.sleep(60)` tetap:
+- Job `align=True` berjalan tepat setelah batas candle (mis. tiap close bar
+  15m) ditambah `delay` beberapa detik agar candle sudah final di exchange.
+- Job biasa berjalan tiap `interval` detik dihitung dari jadwal sebelumnya,
+  jadi durasi job tidak menambah jeda.
+- Job `once=True` berjalan satu kali lalu dihapus (mis. laporan awal).
+- Jam lokal disinkronkan ke `fetch_time()` exchange (offset disimpan).
+
+Scheduler tidak menjalankan job sendiri; runner sync (ProfessionalBot) dan
+runner async (AsyncBotRuntime) memakai due_jobs() + seconds_until_next().
+"""
+
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from metrics import observe_job
+
+
+@dataclass
+class Job:
+    name: str
+    fn: Callable
+    interval: float
+    align: bool = False
+    delay: float = 0.0
+    next_run: float = 0.0
+    once: bool = False
+    runs: int = 0
+    last_duration: float = field(default=0.0)
+
+
+class CandleScheduler:
+    def __init__(self, exchange=None, clock: Optional[Callable[[], float]] = None):
+        self.exchange = exchange
+        # Dibaca saat konstruksi (bukan default argumen) agar jam virtual replay.py ikut terpakai
+        self.clock = clock or time.time
+        self.offset = 0.0
+        self.jobs: List[Job] = []
+
+    def now(self) -> float:
+        """Waktu exchange (detik epoch) = jam lokal + offset hasil sync_clock()."""
+        return self.clock() + self.offset
+
+    def sync_clock(self) -> Optional[float]:
+        # Offset dihitung terhadap titik tengah round trip fetch_time
+        if self.exchange is None:
+            return None
+        try:
+            before = self.clock()
+            server_ms = self.exchange.fetch_time()
+            after = self.clock()
+        except Exception:
+            return None
+        if not server_ms:
+            return None
+        self.offset = server_ms / 1000.0 - (before + after) / 2.0
+        return self.offset
+
+    def add_job(self, name: str, fn: Callable, interval: float, align: bool = False,
+                delay: float = 0.0, run_now: bool = False, once: bool = False) -> Job:
+        job = Job(name=name, fn=fn, interval=float(interval), align=align, delay=float(delay), once=once)
+        job.next_run = self.now() if run_now else self._next_time(job, self.now())
+        self.jobs.append(job)
+        return job
+
+    def due_jobs(self) -> List[Job]:
+        """Job yang sudah jatuh tempo (urut pendaftaran), sekaligus dijadwalkan ulang (job once dihapus)."""
+        now = self.now()
+        due = [job for job in self.jobs if job.next_run <= now]
+        for job in due:
+            job.runs += 1
+            if job.once:
+                self.jobs.remove(job)
+            else:
+                job.next_run = self._next_time(job, max(now, job.next_run))
+        return due
+
+    def seconds_until_next(self) -> float:
+        if not self.jobs:
+            return 60.0
+        return max(0.0, min(job.next_run for job in self.jobs) - self.now())
+
+    def run_job(self, job: Job, on_error: Optional[Callable[[str], None]] = None):
+        started = time.perf_counter()
+        try:
+            return job.fn()
+        except Exception as e:
+            if on_error:
+                on_error(f"Error di job '{job.name}': {e}")
+        finally:
+            job.last_duration = time.perf_counter() - started
+            observe_job(job.name, job.last_duration, budget=job.interval)
+
+    @staticmethod
+    def _next_time(job: Job, after: float) -> float:
+        if job.align:
+            boundary = math.floor((after - job.delay) / job.interval) * job.interval + job.interval
+            return boundary + job.delay
+        if job.next_run:
+            # Loncati jadwal yang terlewat (mis. job sebelumnya lama) tanpa menumpuk eksekusi
+            missed = max(0, math.floor((after - job.next_run) / job.interval))
+            return job.next_run + (missed + 1) * job.interval
+        return after + job.interval
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    units = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
@@ -0,0 +1,34 @@
+"""strategy_params.py
+Parameter strategi bersama untuk bot live (parallel_analysis.py,
+batch_signals.py) dan alat riset (backtest.py, optimize.py).
+
+Modul ini sengaja hanya bergantung pada stdlib, sehingga runtime trading
+tidak ikut mengimpor backtester (pandas, argparse, dsb.).
+"""
+
+from dataclasses import dataclass, fields
+
+EPS = 2.220446049250313e-16
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """Parameter strategi (nama sama dengan field BotConfig)."""
+    modal_per_coin_idr: float = 10500
+    atr_multiplier_for_sl: float = 2.0
+    take_profit_1_rr: float = 1.5
+    trailing_stop_percent: float = 0.05
+    h1_ema_period: int = 50
+    m15_ema_fast: int = 13
+    m15_ema_slow: int = 21
+    volume_avg_period: int = 20
+    atr_period: int = 14
+    stoch_rsi_period: int = 14
+    momentum_min_percentage: float = 3.0  # 0 = tanpa filter momentum 24h
+    fee_percent: float = 0.0              # biaya per sisi transaksi, dalam persen
+
+    @classmethod
+    def from_config(cls, config, **overrides) -> 'StrategyParams':
+        values = {f.name: getattr(config, f.name) for f in fields(cls) if hasattr(config, f.name)}
+        values.update(overrides)
+        return cls(**values)
@@ -0,0 +1,232 @@
+"""telegram_outbox.py
+Pengiriman notifikasi Telegram di thread latar untuk hybrid_bot_v7_patched.py.
+
+send() hanya memasukkan pesan ke antrian terbatas, jadi jalur trading
+(mis. stop loss di manage_active_positions) tidak pernah menunggu API
+Telegram. Thread pengirim:
+- memakai satu requests.Session (koneksi keep-alive) dengan timeout
+  (connect, read);
+- menggabungkan pesan yang datang dalam `coalesce_window` detik untuk chat
+  yang sama menjadi satu kiriman (dipisah baris kosong);
+- memecah teks yang melebihi batas 4096 karakter Telegram di batas baris;
+- menjaga jarak minimal `min_interval` detik antar kiriman per chat, dan
+  saat mendapat HTTP 429 menunggu `retry_after` dari Telegram sebelum
+  mencoba lagi (hanya chat itu yang tertahan);
+- mengulang error jaringan / 5xx dengan backoff eksponensial sampai
+  `max_retries`, lalu pesan dibuang dan dihitung di `stats['failed']`;
+- bila Markdown ditolak (400 "can't parse entities", mis. entitas terpotong
+  saat pesan dipecah), kirim ulang sebagai teks biasa.
+Antrian penuh → pesan dibuang dan dihitung di `stats['dropped']`.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import requests
+
+from metrics import METRICS
+
+MAX_MESSAGE_LENGTH = 4096
+API_URL = 'https://api.telegram.org'
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Pecah teks menjadi potongan <= limit, sebisa mungkin di batas baris."""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def coalesce(messages: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Gabungkan pesan berurutan selama muat dalam satu kiriman; pesan terlalu panjang dipecah."""
+    out: List[str] = []
+    for message in messages:
+        for chunk in split_message(message, limit):
+            if out and len(out[-1]) + 2 + len(chunk) <= limit:
+                out[-1] += '\n\n' + chunk
+            else:
+                out.append(chunk)
+    return out
+
+
+class TelegramOutbox:
+    def __init__(self, token: str, chat_id: str, timeout: float = 10.0, coalesce_window: float = 1.0,
+                 min_interval: float = 1.0, max_retries: int = 5, max_queue: int = 1000,
+                 api_url: str = API_URL, session: Optional[requests.Session] = None):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.timeout = (min(3.05, float(timeout)), float(timeout))
+        self.coalesce_window = float(coalesce_window)
+        self.min_interval = float(min_interval)
+        self.max_retries = int(max_retries)
+        self.session = session or requests.Session()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._pending: Dict[str, Deque[Tuple[str, int]]] = {}   # chat -> (teks, percobaan)
+        self._next_send: Dict[str, float] = {}                   # chat -> monotonic boleh kirim
+        self._inflight = 0
+        self._idle = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'queued': 0, 'sent': 0, 'coalesced': 0, 'retries': 0, 'rate_limited': 0,
+                      'failed': 0, 'dropped': 0}
+
+    def start(self) -> 'TelegramOutbox':
+        self._thread = threading.Thread(target=self._run, name='telegram-outbox', daemon=True)
+        self._thread.start()
+        return self
+
+    def send(self, text: str, chat_id: Optional[str] = None) -> bool:
+        """Masukkan pesan ke antrian (tidak pernah blocking); False bila antrian penuh."""
+        with self._idle:
+            self._inflight += 1
+        try:
+            self._queue.put_nowait((str(chat_id or self.chat_id), text))
+        except queue.Full:
+            self._done(1)
+            self.stats['dropped'] += 1
+            return False
+        self.stats['queued'] += 1
+        return True
+
+    def backlog(self) -> int:
+        """Jumlah pesan yang belum terkirim / gagal permanen."""
+        return self._inflight
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Tunggu sampai semua pesan terkirim (atau gagal permanen)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._queue.put(None)
+        self._thread.join(1.0)
+        self._thread = None
+        self.session.close()
+
+    def _done(self, count: int) -> None:
+        with self._idle:
+            self._inflight -= count
+            self._idle.notify_all()
+
+    # ------------------------------------------------------------------ thread pengirim
+    def _run(self) -> None:
+        while True:
+            if not self._collect():
+                return
+            now = time.monotonic()
+            for chat, pending in list(self._pending.items()):
+                if pending and now >= self._next_send.get(chat, 0.0):
+                    self._send_next(chat, pending)
+                if not pending:
+                    del self._pending[chat]
+
+    def _collect(self) -> bool:
+        """Ambil pesan baru ke _pending; tunggu sampai jendela coalesce / jadwal kirim berikutnya."""
+        now = time.monotonic()
+        if self._pending:
+            wait = max(0.0, min(self._next_send.get(chat, 0.0) for chat in self._pending) - now)
+        else:
+            wait = None
+        try:
+            item = self._queue.get(timeout=wait)
+        except queue.Empty:
+            return True
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            if item is None:
+                return False
+            chat, text = item
+            self._enqueue(chat, text)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return True
+
+    def _enqueue(self, chat: str, text: str) -> None:
+        pending = self._pending.setdefault(chat, deque())
+        if pending and pending[-1][1] == 0:
+            merged = coalesce([pending[-1][0], text])
+            if len(merged) == 1:
+                # Digabung: satu pesan antrian selesai tanpa kiriman sendiri
+                pending[-1] = (merged[0], 0)
+                self.stats['coalesced'] += 1
+                self._done(1)
+                return
+        chunks = split_message(text)
+        pending.extend((chunk, 0) for chunk in chunks)
+        if len(chunks) > 1:
+            with self._idle:
+                self._inflight += len(chunks) - 1
+        elif not chunks:
+            self._done(1)
+
+    def _send_next(self, chat: str, pending: Deque[Tuple[str, int]]) -> None:
+        text, attempt = pending[0]
+        status, retry_after = self._post(chat, text)
+        now = time.monotonic()
+        self._next_send[chat] = now + self.min_interval
+        if status == 'ok':
+            pending.popleft()
+            self.stats['sent'] += 1
+            self._done(1)
+            return
+        if status == 'rate_limited':
+            # 429 tidak dihitung sebagai percobaan gagal: Telegram memberi tahu kapan boleh kirim lagi
+            self.stats['rate_limited'] += 1
+            self._next_send[chat] = now + max(retry_after, self.min_interval)
+            return
+        METRICS.inc('cuanbot_telegram_errors_total')
+        if status == 'retry' and attempt < self.max_retries:
+            self.stats['retries'] += 1
+            pending[0] = (text, attempt + 1)
+            self._next_send[chat] = now + min(60.0, 2.0 ** attempt)
+            return
+        pending.popleft()
+        self.stats['failed'] += 1
+        self._done(1)
+
+    def _post(self, chat: str, text: str) -> Tuple[str, float]:
+        """('ok' | 'rate_limited' | 'retry' | 'failed', retry_after)."""
+        payload = {'chat_id': chat, 'text': text, 'parse_mode': 'Markdown'}
+        for _ in range(2):
+            try:
+                with METRICS.time('cuanbot_telegram_send_seconds'):
+                    response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException:
+                return 'retry', 0.0
+            if response.status_code == 200:
+                return 'ok', 0.0
+            if response.status_code == 429:
+                return 'rate_limited', self._retry_after(response)
+            if response.status_code >= 500:
+                return 'retry', 0.0
+            if response.status_code == 400 and 'parse_mode' in payload and 'parse entities' in response.text:
+                payload.pop('parse_mode')
+                continue
+            return 'failed', 0.0
+        return 'failed', 0.0
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            try:
+                return float(response.headers.get('Retry-After', 1))
+            except (TypeError, ValueError):
+                return 1.0
@@ -33,6 +33,8 @@ import sys
 from datetime import datetime, timedelta, timezone
 
 import hybrid_bot_v7_patched as bot
+from event_store import realized_pnl
+from position_journal import read_positions
 
 from dotenv import load_dotenv
 
@@ -174,29 +176,34 @@ def cleanup_on_exit():
 
 def build_indodax_client():
     # UI membuat client sendiri (monitoring) agar tidak memanggil __init__ bot.
+    # Throttle memakai RATE_LIMITER bot (berbagi file budget dengan proses bot).
     import ccxt
-    return ccxt.indodax({'apiKey': bot.INDODAX_API_KEY, 'secret': bot.INDODAX_API_SECRET})
+    ex = ccxt.indodax(bot.indodax_client_config())
+    return bot.instrument_exchange(bot.install_rate_limiter(ex, bot.RATE_LIMITER, bot.ENDPOINT_WEIGHTS))
 
 
 def load_positions_state():
+    # Snapshot + jurnal delta bot (position_journal.py), hanya dibaca
     path = getattr(bot, 'STATE_FILE', 'active_positions.json')
-    if not os.path.exists(path):
-        return [], None
     try:
-        import json
-        raw = open(path, 'r', encoding='utf-8').read().strip()
-        if not raw:
-            return [], None
-        data = json.loads(raw)
-        if isinstance(data, list):
-            return data, None
-        return [], 'STATE_FILE bukan list'
+        return read_positions(path), None
     except Exception as e:
         return [], str(e)
 
 
-def fetch_account_snapshot(ex, markets=None, top_n=15):
-    bal, err = safe_call(ex.fetch_balance)
+def load_realized_pnl(days=30):
+    # Dari EVENT_DB bot (SQLite, dibaca read-only); None bila belum ada event
+    path = getattr(bot, 'EVENT_DB', '')
+    if not path or not os.path.exists(path):
+        return None, None
+    try:
+        return realized_pnl(path, days=days), None
+    except Exception as e:
+        return None, str(e)
+
+
+def fetch_account_snapshot(ex, markets=None, top_n=15, fetch_balance=None):
+    bal, err = safe_call(fetch_balance or ex.fetch_balance)
     if err:
         return None, err
 
@@ -336,14 +343,14 @@ def fetch_btc_health(ex):
         return None, str(e)
 
 
-def check_indodax_connection(ex):
+def check_indodax_connection(ex, fetch_balance=None):
     # 1) Public check
     t, err = safe_call(ex.fetch_time)
     if err:
         return {"public_ok": False, "private_ok": False, "msg": f"Public FAIL: {err}"}
 
     # 2) Private check (auth)
-    b, err = safe_call(ex.fetch_balance)
+    b, err = safe_call(fetch_balance or ex.fetch_balance)
     if err:
         return {"public_ok": True, "private_ok": False, "msg": f"Private FAIL: {err}"}
 
@@ -360,13 +367,17 @@ def render(start_ts):
     markets, _ = safe_call(ex.load_markets)
     markets = markets or {}
 
+    # Satu fetch_balance per render, dipakai snapshot akun dan cek koneksi private
+    balances = bot.BalanceCache(ex, ttl=max(refresh_s, 5))
+
     positions, pos_err = load_positions_state()
-    acct, acct_err = fetch_account_snapshot(ex, markets=markets, top_n=top_assets)
+    realized, realized_err = load_realized_pnl(30)
+    acct, acct_err = fetch_account_snapshot(ex, markets=markets, top_n=top_assets, fetch_balance=balances.get)
     pstat = compute_positions_status(ex, positions)
     btc_ok, btc_err = fetch_btc_health(ex)
 
     uptime = int(time.time() - start_ts)
-    conn = check_indodax_connection(ex)
+    conn = check_indodax_connection(ex, fetch_balance=balances.get)
 
     clear_screen()
     print('     ╔[==  CuanBot v.1  ==]╗')
@@ -409,6 +420,18 @@ def render(start_ts):
             print(f"- {x['pair']:<10} last={last_s:<12} pnl={pnl_idr:<12} ({pnl_pct}) tp1={tp1hit}")
             if x['err']:
                 print(f"  err: {x['err']}")
+
+    if realized_err:
+        print(f"Event DB error     : {realized_err}")
+    elif realized:
+        closed = sum(r['closed'] for r in realized)
+        wins = sum(r['wins'] for r in realized)
+        print('')
+        print(f"Realized PnL 30 hari: {human_int(sum(r['pnl_idr'] for r in realized))} IDR "
+              f"({closed} posisi ditutup, win {wins}/{closed})")
+        for r in realized[:5]:
+            avg = f"{r['avg_pnl_percent']:+.2f}%" if r['avg_pnl_percent'] is not None else '-'
+            print(f"- {r['pair']:<10} pnl={human_int(r['pnl_idr']):<12} closed={r['closed']:<4} avg={avg}")
     print('')
 
     print('== Status Akun Indodax ==')